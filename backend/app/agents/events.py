@@ -0,0 +1,92 @@
+"""Buffered writer for `agent_task_events`.
+
+The runtime emits several events per iteration (model_call_*, tool_*,
+...). Writing each one synchronously put a Supabase round-trip on the
+agent's critical path. `TaskEventSink` instead buffers a task's events
+and writes them as one multi-row insert once `max_batch` events are
+pending or `flush_interval` seconds have passed — and always on `close()`,
+which the runtime calls when the task completes or fails.
+
+Event writes are best-effort: a failed flush is logged and dropped, never
+raised into the agent loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core import store
+from app.core.logging import get_logger
+
+log = get_logger(__name__)
+
+EVENT_BATCH_SIZE = 20
+EVENT_FLUSH_SECONDS = 1.0
+
+
+class TaskEventSink:
+    def __init__(
+        self,
+        task_id: str,
+        user_id: Optional[str],
+        get_client: Callable[[], Awaitable[Any]],
+        *,
+        max_batch: int = EVENT_BATCH_SIZE,
+        flush_interval: float = EVENT_FLUSH_SECONDS,
+    ):
+        self.task_id = task_id
+        self.user_id = user_id
+        self._get_client = get_client
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._buffer: List[Dict[str, Any]] = []
+        # Serializes writes so batches land in emit order.
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def emit(self, event_type: str, payload: Optional[dict] = None) -> None:
+        """Queue an event. Never blocks on I/O."""
+        self._buffer.append(
+            {
+                "task_id": self.task_id,
+                "user_id": self.user_id,
+                "event_type": event_type,
+                "payload": payload or {},
+            }
+        )
+        if len(self._buffer) >= self.max_batch:
+            self._flush_in_background()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self._flush_in_background)
+
+    def _flush_in_background(self) -> None:
+        task = asyncio.ensure_future(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self) -> None:
+        """Write everything buffered so far as a single insert."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+
+        rows, self._buffer = self._buffer, []
+        async with self._lock:
+            try:
+                await store.insert_task_events(await self._get_client(), rows)
+            except Exception:
+                log.exception(
+                    "task_events_flush_failed",
+                    extra={"task_id": self.task_id, "dropped": len(rows)},
+                )
+
+    async def close(self) -> None:
+        """Flush remaining events and wait for in-flight writes."""
+        await self.flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
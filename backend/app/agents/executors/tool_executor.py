@@ -1,16 +1,94 @@
-from typing import Dict, Any
+import json
+from typing import Dict, Any, FrozenSet, Tuple
 from app.agents.registry import AgentType
 
 
+# Tools that only read upstream state. Within one task their results are
+# memoized by (tool name, canonical input); every agent's tools talk to one
+# integration, so any other tool that succeeds is treated as a write to it
+# and clears the memo.
+READ_ONLY_TOOLS: Dict[AgentType, FrozenSet[str]] = {
+    AgentType.BOOKKEEPER: frozenset(
+        {
+            "get_transactions",
+            "get_accounts",
+            "get_vendors",
+            "get_customers",
+            "get_account_balance",
+        }
+    ),
+    AgentType.INBOX_COMMANDER: frozenset(
+        {"get_emails", "get_email_by_id", "triage_inbox", "get_followups_due"}
+    ),
+    AgentType.APPOINTMENT: frozenset(
+        {
+            "get_upcoming_events",
+            "get_event_by_id",
+            "find_available_slots",
+            "get_todays_schedule",
+            "check_conflicts",
+            "get_no_show_risks",
+        }
+    ),
+    AgentType.HIRE_WELL: frozenset(
+        {"get_candidate_emails", "get_pipeline_status", "get_candidates_needing_followup"}
+    ),
+    AgentType.CUSTOMER_CARE: frozenset({"get_tickets", "get_ticket_by_id", "get_pending_tickets"}),
+    AgentType.SOCIAL_PILOT: frozenset({"get_scheduled_posts", "get_comments", "get_analytics"}),
+    AgentType.REPUTATION_SHIELD: frozenset({"monitor_reviews", "get_crisis_alerts"}),
+}
+
+
 class ToolExecutor:
     """Handles tool execution routing for all agents"""
 
     def __init__(self, agent_type: AgentType, tools: Dict[str, Any]):
         self.agent_type = agent_type
         self.tools = tools
+        self.read_only_tools = READ_ONLY_TOOLS.get(agent_type, frozenset())
+        self._memo: Dict[Tuple[str, str], Any] = {}
+        # Bumped whenever the memo is cleared. Tools run concurrently, so a read
+        # is only memoized if no write finished while it was running.
+        self._memo_generation = 0
+
+    def _memo_key(self, tool_name: str, tool_input: Dict[str, Any]) -> Tuple[str, str]:
+        return tool_name, json.dumps(tool_input or {}, sort_keys=True, default=str)
+
+    def recall(self, tool_name: str, tool_input: Dict[str, Any]) -> Tuple[bool, Any]:
+        """(True, result) if this read-only call is already memoized for the task."""
+        if tool_name not in self.read_only_tools:
+            return False, None
+        key = self._memo_key(tool_name, tool_input)
+        if key in self._memo:
+            return True, self._memo[key]
+        return False, None
+
+    def clear_memo(self) -> None:
+        self._memo.clear()
+        self._memo_generation += 1
 
     async def execute(self, tool_name: str, tool_input: Dict[str, Any]) -> Any:
-        """Route and execute a tool call"""
+        """Route and execute a tool call, memoizing read-only results"""
+        hit, result = self.recall(tool_name, tool_input)
+        if hit:
+            return result
+
+        if tool_name not in self.read_only_tools:
+            try:
+                return await self._route(tool_name, tool_input)
+            finally:
+                # Even a failed write may have changed data partway through.
+                self.clear_memo()
+
+        generation = self._memo_generation
+        result = await self._route(tool_name, tool_input)
+        failed = isinstance(result, dict) and "error" in result
+        if not failed and generation == self._memo_generation:
+            self._memo[self._memo_key(tool_name, tool_input)] = result
+        return result
+
+    async def _route(self, tool_name: str, tool_input: Dict[str, Any]) -> Any:
+        """Route a tool call to the agent's tools"""
         executor_map = {
             AgentType.BOOKKEEPER: self._execute_bookkeeper,
             AgentType.INBOX_COMMANDER: self._execute_inbox,
@@ -40,10 +118,15 @@ class ToolExecutor:
         tool_map = {
             "get_transactions": qb_tools.get_transactions,
             "categorize_transaction": qb_tools.categorize_transaction,
+            "categorize_transactions_bulk": qb_tools.categorize_transactions_bulk,
+            "apply_approved_categorizations": qb_tools.apply_approved_categorizations,
             "get_accounts": qb_tools.get_accounts,
+            "get_vendors": qb_tools.get_vendors,
+            "get_customers": qb_tools.get_customers,
             "get_account_balance": qb_tools.get_account_balance,
             "create_expense_report": qb_tools.create_expense_report,
             "flag_for_review": qb_tools.flag_for_review,
+            "flag_transactions_bulk": qb_tools.flag_transactions_bulk,
         }
 
         tool_fn = tool_map.get(tool_name)
@@ -67,6 +150,7 @@ class ToolExecutor:
             "apply_label": gmail_tools.apply_label,
             "mark_as_read": gmail_tools.mark_as_read,
             "archive_email": gmail_tools.archive_email,
+            "bulk_modify": gmail_tools.bulk_modify,
             "get_followups_due": lambda: gmail_tools.get_followups_due(),
         }
 
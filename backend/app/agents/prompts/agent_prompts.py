@@ -1,11 +1,12 @@
-from typing import Dict
+from functools import cache
+from typing import Dict, Optional
 from datetime import datetime, timezone
 from app.agents.registry import AgentType, AGENT_REGISTRY
 
 
 # Bump this when you change any agent prompt. Recorded on every task so
 # you can attribute behavioral regressions to a specific prompt revision.
-PROMPT_VERSION = "2026-05-17.1"
+PROMPT_VERSION = "2026-10-17.1"
 
 
 AGENT_PROMPTS: Dict[AgentType, str] = {
@@ -187,8 +188,13 @@ InventoryIQ-specific guidelines:
 }
 
 
-def build_system_prompt(agent_type: AgentType) -> str:
-    """Build the complete system prompt for an agent"""
+@cache
+def _static_prompt(agent_type: AgentType, prompt_version: str) -> str:
+    """Everything except the clock, built once per (agent, PROMPT_VERSION).
+
+    `prompt_version` is only a cache key: bumping it never serves a stale
+    entry built from the previous prompt text.
+    """
     agent_info = AGENT_REGISTRY.get(agent_type, {})
 
     base_prompt = f"""You are {agent_info.get("name", "AI Agent")}, an AI agent specialized in {agent_info.get("description", "business automation")}
@@ -202,11 +208,24 @@ Guidelines:
 3. Provide clear, concise summaries of completed actions
 4. If you encounter errors, explain them in plain language and suggest solutions
 5. Never make assumptions about data - always verify with the available tools
-
-Current date/time (UTC): {datetime.now(timezone.utc).isoformat()}
 """
 
     if agent_type in AGENT_PROMPTS:
         base_prompt += f"\n{AGENT_PROMPTS[agent_type]}"
 
     return base_prompt
+
+
+def build_system_prompt(agent_type: AgentType, now: Optional[datetime] = None) -> str:
+    """Build the complete system prompt for an agent.
+
+    The clock is truncated to the hour and appended last, so the prompt is
+    byte-identical for an hour at a time and the static prefix never
+    changes — which is what provider-side prompt caching keys on.
+    """
+    now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    return (
+        _static_prompt(agent_type, PROMPT_VERSION)
+        + f"\nCurrent date/hour (UTC): {hour.strftime('%Y-%m-%dT%H:00Z')}\n"
+    )
@@ -64,6 +64,8 @@ AGENT_REGISTRY: Dict[AgentType, Dict[str, Any]] = {
         "required_integrations": ["gmail"],
         "status": "available",
         "tasks": ["triage_inbox", "draft_response", "schedule_followup", "extract_action_items"],
+        # Fans out to many independent Gmail reads per turn.
+        "max_tool_concurrency": 8,
     },
     AgentType.HIRE_WELL: {
         "name": "HireWellAI",
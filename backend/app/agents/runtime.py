@@ -1,15 +1,18 @@
 from typing import Any, Dict, Optional
 import anthropic
+import asyncio
 import time
 
 from app.core.config import settings
-from app.core.database import get_supabase
+from app.core import store
+from app.core.database import get_async_supabase
 from app.core.logging import get_logger
 from app.core.budget import TokenBudget, BudgetExceeded
 from app.agents.registry import AgentType, AGENT_REGISTRY
 from app.agents.prompts.agent_prompts import build_system_prompt, PROMPT_VERSION
-from app.agents.schemas import get_tools_schema
+from app.agents.schemas import get_tools_schema, get_tools_schema_hash
 from app.agents.executors.tool_executor import ToolExecutor
+from app.agents.events import TaskEventSink
 
 # Tool imports
 from app.agents.tools.quickbooks import QuickBooksTools
@@ -45,6 +48,57 @@ TOOLS_REGISTRY: Dict[AgentType, tuple] = {
 }
 
 
+# Anthropic prompt-caching breakpoint. Cache prefixes run tools -> system ->
+# messages, so marking the last tool and the system block caches both.
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def cacheable_system(prompt: str) -> list[dict]:
+    return [{"type": "text", "text": prompt, "cache_control": CACHE_CONTROL}]
+
+
+def cacheable_tools(tools: list[dict]) -> list[dict]:
+    """Copy of `tools` with a cache breakpoint on the last schema."""
+    if not tools:
+        return tools
+    return [*tools[:-1], {**tools[-1], "cache_control": CACHE_CONTROL}]
+
+
+# Streaming emits partial text in chunks of at least this many characters
+# rather than one event per token delta.
+STREAM_TEXT_CHUNK_CHARS = 200
+
+
+_anthropic_client: Optional[anthropic.AsyncAnthropic] = None
+
+
+def get_anthropic_client() -> anthropic.AsyncAnthropic:
+    """Process-wide async Anthropic client.
+
+    Every runtime in the process shares one client (and therefore one
+    HTTP connection pool), so model round-trips never block the event
+    loop and concurrent tasks reuse warm connections.
+    """
+    global _anthropic_client
+    if _anthropic_client is None:
+        _anthropic_client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+    return _anthropic_client
+
+
+async def close_anthropic_client() -> None:
+    """Close the shared client's connection pool. Safe to call when unused."""
+    global _anthropic_client
+    if _anthropic_client is not None:
+        await _anthropic_client.close()
+        _anthropic_client = None
+
+
+def _cancel_all(tasks: Dict[str, asyncio.Task]) -> None:
+    for pending in tasks.values():
+        pending.cancel()
+    tasks.clear()
+
+
 class AgentRuntime:
     def __init__(
         self,
@@ -54,11 +108,13 @@ class AgentRuntime:
         model: Optional[str] = None,
         max_iterations: Optional[int] = None,
         max_tokens_per_task: Optional[int] = None,
+        max_tool_concurrency: Optional[int] = None,
+        streaming: Optional[bool] = None,
     ):
         self.agent_type = agent_type
         self.user_id = user_id
         self.agent_info = AGENT_REGISTRY.get(agent_type, {})
-        self.client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.client = get_anthropic_client()
         self.tools = self._initialize_tools()
         self.executor = ToolExecutor(agent_type, self.tools)
         self.model = model or settings.AGENT_MODEL
@@ -68,6 +124,14 @@ class AgentRuntime:
             if max_tokens_per_task is not None
             else settings.AGENT_MAX_TOKENS_PER_TASK
         )
+        self.max_tool_concurrency = max(
+            1,
+            max_tool_concurrency
+            or self.agent_info.get("max_tool_concurrency")
+            or settings.AGENT_MAX_TOOL_CONCURRENCY,
+        )
+        self.streaming = settings.AGENT_STREAMING if streaming is None else streaming
+        self._event_sink: Optional[TaskEventSink] = None
 
     def _initialize_tools(self) -> Dict[str, Any]:
         tools = {}
@@ -77,26 +141,128 @@ class AgentRuntime:
         return tools
 
     def _emit_event(self, task_id: str, event_type: str, payload: dict = None):
-        supabase = get_supabase()
-        supabase.table("agent_task_events").insert(
-            {
-                "task_id": task_id,
-                "event_type": event_type,
-                "payload": payload or {},
-            }
-        ).execute()
+        # Buffered; flushed in batches off the critical path (see events.py).
+        if self._event_sink is not None:
+            self._event_sink.emit(event_type, payload)
+
+    async def _run_tool(
+        self, task_id: Optional[str], block: Any, iteration: int, slots: asyncio.Semaphore
+    ) -> Any:
+        if task_id:
+            self._emit_event(
+                task_id,
+                "tool_called",
+                {
+                    "tool_name": block.name,
+                    "input": block.input,
+                    "iteration": iteration,
+                },
+            )
+
+        cached, tool_result = self.executor.recall(block.name, block.input)
+        if not cached:
+            async with slots:
+                tool_result = await self.executor.execute(block.name, block.input)
+
+        if task_id:
+            self._emit_event(
+                task_id,
+                "tool_result",
+                {
+                    "tool_name": block.name,
+                    "result_preview": str(tool_result)[:500],
+                    "cached": cached,
+                },
+            )
+        return tool_result
+
+    async def _stream_model_call(
+        self,
+        task_id: Optional[str],
+        iteration: int,
+        request: Dict[str, Any],
+        slots: asyncio.Semaphore,
+        early_tools: Dict[str, asyncio.Task],
+    ) -> Any:
+        """Stream one model turn, starting read-only tools as their input completes.
+
+        Tool tasks are registered in `early_tools` by tool_use id; the caller
+        awaits (or cancels) them once the full message is known. Tools with
+        side effects are never started here: the turn may still end at
+        max_tokens or over budget, and a cancelled write cannot be undone.
+        """
+        pending_text = ""
+
+        def flush_text() -> None:
+            nonlocal pending_text
+            if task_id and pending_text:
+                self._emit_event(
+                    task_id, "model_text_delta", {"iteration": iteration, "text": pending_text}
+                )
+            pending_text = ""
+
+        async with self.client.messages.stream(**request) as stream:
+            async for event in stream:
+                if event.type == "text":
+                    pending_text += event.text
+                    if len(pending_text) >= STREAM_TEXT_CHUNK_CHARS:
+                        flush_text()
+                elif event.type == "content_block_start":
+                    block = event.content_block
+                    if block.type == "tool_use" and task_id:
+                        self._emit_event(
+                            task_id,
+                            "tool_use_started",
+                            {
+                                "tool_name": block.name,
+                                "tool_use_id": block.id,
+                                "iteration": iteration,
+                            },
+                        )
+                elif event.type == "content_block_stop":
+                    block = event.content_block
+                    if block.type == "text":
+                        flush_text()
+                    elif block.type == "tool_use" and block.name in self.executor.read_only_tools:
+                        early_tools[block.id] = asyncio.create_task(
+                            self._run_tool(task_id, block, iteration, slots)
+                        )
+            flush_text()
+            return await stream.get_final_message()
 
     async def execute(
         self, task: str, context: Dict[str, Any], task_id: str = None
+    ) -> Dict[str, Any]:
+        self._event_sink = (
+            TaskEventSink(task_id, self.user_id, get_async_supabase) if task_id else None
+        )
+        try:
+            return await self._execute(task, context, task_id)
+        finally:
+            if self._event_sink is not None:
+                await self._event_sink.close()
+                self._event_sink = None
+
+    async def _execute(
+        self, task: str, context: Dict[str, Any], task_id: Optional[str]
     ) -> Dict[str, Any]:
         start_time = time.time()
         budget = TokenBudget(max_tokens=self.max_tokens_per_task)
+        # Memoized read-only tool results never outlive the task.
+        self.executor.clear_memo()
 
         messages = [{"role": "user", "content": task}]
         if context:
             messages[0]["content"] += f"\n\nAdditional context:\n{context}"
 
+        # Built once per task so every iteration sends a byte-identical
+        # prefix the provider can serve from its prompt cache.
+        system_prompt: Any = build_system_prompt(self.agent_type)
         tools_schema = get_tools_schema(self.agent_type)
+        tools_hash = get_tools_schema_hash(self.agent_type)
+        if settings.AGENT_PROMPT_CACHING:
+            system_prompt = cacheable_system(system_prompt)
+            tools_schema = cacheable_tools(tools_schema)
 
         log.info(
             "agent_task_started",
@@ -106,6 +272,7 @@ class AgentRuntime:
                 "user_id": self.user_id,
                 "model": self.model,
                 "prompt_version": PROMPT_VERSION,
+                "tools_hash": tools_hash,
             },
         )
 
@@ -117,9 +284,12 @@ class AgentRuntime:
                     "agent_type": self.agent_type.value,
                     "model": self.model,
                     "prompt_version": PROMPT_VERSION,
+                    "tools_hash": tools_hash,
                 },
             )
 
+        slots = asyncio.Semaphore(self.max_tool_concurrency)
+
         iteration = 0
         while iteration < self.max_iterations:
             iteration += 1
@@ -127,21 +297,41 @@ class AgentRuntime:
             if task_id:
                 self._emit_event(task_id, "model_call_started", {"iteration": iteration})
 
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=settings.AGENT_MAX_OUTPUT_TOKENS,
-                system=build_system_prompt(self.agent_type),
-                tools=tools_schema if tools_schema else None,
-                messages=messages,
-            )
+            request = {
+                "model": self.model,
+                "max_tokens": settings.AGENT_MAX_OUTPUT_TOKENS,
+                "system": system_prompt,
+                "tools": tools_schema if tools_schema else None,
+                "messages": messages,
+            }
+            # Tools started mid-stream, keyed by tool_use id.
+            early_tools: Dict[str, asyncio.Task] = {}
+            if self.streaming:
+                try:
+                    response = await self._stream_model_call(
+                        task_id, iteration, request, slots, early_tools
+                    )
+                except BaseException:
+                    _cancel_all(early_tools)
+                    raise
+                if response.stop_reason != "tool_use":
+                    # e.g. max_tokens cut the turn short; don't run partial calls.
+                    _cancel_all(early_tools)
+            else:
+                response = await self.client.messages.create(**request)
 
             usage = getattr(response, "usage", None)
             input_tokens = getattr(usage, "input_tokens", None) if usage else None
             output_tokens = getattr(usage, "output_tokens", None) if usage else None
+            cache_read_tokens = getattr(usage, "cache_read_input_tokens", None) if usage else None
+            cache_write_tokens = (
+                getattr(usage, "cache_creation_input_tokens", None) if usage else None
+            )
 
             try:
-                budget.record(input_tokens, output_tokens)
+                budget.record(input_tokens, output_tokens, cache_read_tokens, cache_write_tokens)
             except BudgetExceeded as exc:
+                _cancel_all(early_tools)
                 duration_ms = int((time.time() - start_time) * 1000)
                 log.warning(
                     "agent_budget_exceeded",
@@ -180,6 +370,8 @@ class AgentRuntime:
                         "stop_reason": response.stop_reason,
                         "input_tokens": input_tokens,
                         "output_tokens": output_tokens,
+                        "cache_read_tokens": cache_read_tokens,
+                        "cache_write_tokens": cache_write_tokens,
                         "total_tokens": budget.total_tokens,
                     },
                 )
@@ -198,11 +390,14 @@ class AgentRuntime:
                         "iterations": iteration,
                         "duration_ms": duration_ms,
                         "total_tokens": budget.total_tokens,
+                        "cache_read_tokens": budget.cache_read_tokens,
+                        "cache_write_tokens": budget.cache_write_tokens,
                     },
                 )
                 if task_id:
-                    supabase = get_supabase()
-                    supabase.table("agent_tasks").update(
+                    await store.update_task(
+                        await get_async_supabase(),
+                        task_id,
                         {
                             "duration_ms": duration_ms,
                             "model_provider": "anthropic",
@@ -210,8 +405,10 @@ class AgentRuntime:
                             "input_tokens": budget.input_tokens,
                             "output_tokens": budget.output_tokens,
                             "total_tokens": budget.total_tokens,
-                        }
-                    ).eq("id", task_id).execute()
+                            "prompt_version": PROMPT_VERSION,
+                            "tools_hash": tools_hash,
+                        },
+                    )
 
                     self._emit_event(
                         task_id,
@@ -220,6 +417,8 @@ class AgentRuntime:
                             "iterations": iteration,
                             "duration_ms": duration_ms,
                             "total_tokens": budget.total_tokens,
+                            "cache_read_tokens": budget.cache_read_tokens,
+                            "cache_write_tokens": budget.cache_write_tokens,
                         },
                     )
 
@@ -230,48 +429,47 @@ class AgentRuntime:
                     "total_tokens": budget.total_tokens,
                 }
 
-            # Tool use
+            # Tool use: independent calls from one turn run concurrently
+            # (capped per agent), and all results go back in one user turn.
             if response.stop_reason == "tool_use":
-                for block in response.content:
-                    if block.type != "tool_use":
-                        continue
-
-                    if task_id:
-                        self._emit_event(
-                            task_id,
-                            "tool_called",
-                            {
-                                "tool_name": block.name,
-                                "input": block.input,
-                                "iteration": iteration,
-                            },
+                tool_blocks = [block for block in response.content if block.type == "tool_use"]
+                outcomes = await asyncio.gather(
+                    *(
+                        early_tools.pop(block.id, None)
+                        or self._run_tool(task_id, block, iteration, slots)
+                        for block in tool_blocks
+                    ),
+                    return_exceptions=True,
+                )
+                # One tool raising must not fail the turn (or orphan its
+                # siblings); the model sees it as that tool's error result.
+                tool_results = []
+                for block, outcome in zip(tool_blocks, outcomes, strict=True):
+                    if isinstance(outcome, Exception):
+                        log.warning(
+                            "agent_tool_failed",
+                            extra={"task_id": task_id, "tool_name": block.name},
+                            exc_info=outcome,
                         )
+                        outcome = {"error": f"Tool {block.name} failed: {outcome}"}
+                    elif isinstance(outcome, BaseException):
+                        raise outcome
+                    tool_results.append(outcome)
 
-                    tool_result = await self.executor.execute(block.name, block.input)
-
-                    if task_id:
-                        self._emit_event(
-                            task_id,
-                            "tool_result",
+                messages.append({"role": "assistant", "content": response.content})
+                messages.append(
+                    {
+                        "role": "user",
+                        "content": [
                             {
-                                "tool_name": block.name,
-                                "result_preview": str(tool_result)[:500],
-                            },
-                        )
-
-                    messages.append({"role": "assistant", "content": response.content})
-                    messages.append(
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "tool_result",
-                                    "tool_use_id": block.id,
-                                    "content": str(tool_result),
-                                }
-                            ],
-                        }
-                    )
+                                "type": "tool_result",
+                                "tool_use_id": block.id,
+                                "content": str(tool_result),
+                            }
+                            for block, tool_result in zip(tool_blocks, tool_results, strict=True)
+                        ],
+                    }
+                )
 
                 continue
 
@@ -1,6 +1,9 @@
-from typing import List, Dict, Any
+from types import MappingProxyType
+from typing import List, Dict, Any, Mapping, Optional
 from app.agents.registry import AgentType
 
+from .base import CompiledToolSchemas, compile_tool_schemas
+
 from .bookkeeper import get_bookkeeper_schema
 from .inbox import get_inbox_schema
 from .appointment import get_appointment_schema
@@ -31,9 +34,27 @@ SCHEMA_REGISTRY: Dict[AgentType, callable] = {
 }
 
 
+# Built once at import. Factories above stay the source of truth; the
+# runtime only ever sees these frozen copies.
+COMPILED_SCHEMAS: Mapping[AgentType, CompiledToolSchemas] = MappingProxyType(
+    {agent_type: compile_tool_schemas(fn()) for agent_type, fn in SCHEMA_REGISTRY.items()}
+)
+
+
+def get_compiled_schemas(agent_type: AgentType) -> Optional[CompiledToolSchemas]:
+    """Frozen schemas plus their content hash."""
+    return COMPILED_SCHEMAS.get(agent_type)
+
+
 def get_tools_schema(agent_type: AgentType) -> List[Dict[str, Any]]:
-    """Get tool schemas for an agent type"""
-    schema_fn = SCHEMA_REGISTRY.get(agent_type)
-    if schema_fn:
-        return schema_fn()
+    """Get tool schemas for an agent type (immutable, shared across calls)"""
+    compiled = COMPILED_SCHEMAS.get(agent_type)
+    if compiled:
+        return list(compiled.tools)
     return []
+
+
+def get_tools_schema_hash(agent_type: AgentType) -> Optional[str]:
+    """sha256 of the agent's canonical tool-schema JSON, or None."""
+    compiled = COMPILED_SCHEMAS.get(agent_type)
+    return compiled.hash if compiled else None
@@ -1,4 +1,7 @@
-from typing import Dict, Any, List, Optional
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
 
 
 def create_tool_schema(
@@ -44,3 +47,51 @@ def boolean_prop(description: str) -> Dict[str, str]:
 def array_string_prop(description: str) -> Dict[str, Any]:
     """Create an array of strings property"""
     return {"type": "array", "items": {"type": "string"}, "description": description}
+
+
+def array_object_prop(
+    description: str,
+    properties: Dict[str, Dict[str, Any]],
+    required: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Create an array of objects property"""
+    items: Dict[str, Any] = {"type": "object", "properties": properties}
+    if required:
+        items["required"] = required
+    return {"type": "array", "items": items, "description": description}
+
+
+class FrozenDict(dict):
+    """A dict that rejects mutation. Still JSON- and SDK-serializable."""
+
+    def _readonly(self, *_args, **_kwargs):
+        raise TypeError("compiled tool schemas are immutable")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts to FrozenDict and lists to tuples."""
+    if isinstance(value, dict):
+        return FrozenDict({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
+class CompiledToolSchemas:
+    """An agent's tool schemas, built once: frozen and hashed."""
+
+    tools: Tuple[Dict[str, Any], ...]
+    hash: str
+
+
+def compile_tool_schemas(schemas: List[Dict[str, Any]]) -> CompiledToolSchemas:
+    """Freeze schemas and precompute the sha256 of their canonical JSON."""
+    canonical = json.dumps(schemas, sort_keys=True, separators=(",", ":"))
+    return CompiledToolSchemas(
+        tools=freeze(schemas),
+        hash=hashlib.sha256(canonical.encode("utf-8")).hexdigest(),
+    )
@@ -1,5 +1,5 @@
 from typing import List, Dict, Any
-from .base import create_tool_schema, string_prop
+from .base import create_tool_schema, string_prop, integer_prop, array_object_prop
 
 
 def get_bookkeeper_schema() -> List[Dict[str, Any]]:
@@ -7,11 +7,14 @@ def get_bookkeeper_schema() -> List[Dict[str, Any]]:
     return [
         create_tool_schema(
             name="get_transactions",
-            description="Fetch transactions from QuickBooks within a date range",
+            description="Fetch transactions from QuickBooks within a date range, newest first. 'truncated' is true when more exist; use create_expense_report for totals over the whole range.",
             properties={
                 "start_date": string_prop("Start date in YYYY-MM-DD format"),
                 "end_date": string_prop("End date in YYYY-MM-DD format"),
                 "account_id": string_prop("Optional: Filter by specific account ID"),
+                "max_results": integer_prop(
+                    "Maximum number of transactions to return (default: 100, max: 1000)"
+                ),
             },
             required=["start_date", "end_date"],
         ),
@@ -25,6 +28,27 @@ def get_bookkeeper_schema() -> List[Dict[str, Any]]:
             },
             required=["transaction_id", "category"],
         ),
+        create_tool_schema(
+            name="categorize_transactions_bulk",
+            description="Queue categorizations for many transactions in one call. Prefer this over repeated categorize_transaction calls.",
+            properties={
+                "categorizations": array_object_prop(
+                    "The transactions to categorize",
+                    {
+                        "transaction_id": string_prop("The transaction ID to categorize"),
+                        "category": string_prop("The category/account to assign"),
+                        "memo": string_prop("Optional memo for the categorization"),
+                    },
+                    required=["transaction_id", "category"],
+                ),
+            },
+            required=["categorizations"],
+        ),
+        create_tool_schema(
+            name="apply_approved_categorizations",
+            description="Write categorizations a reviewer has approved to QuickBooks",
+            properties={},
+        ),
         create_tool_schema(
             name="get_accounts",
             description="Get list of accounts from QuickBooks",
@@ -32,6 +56,16 @@ def get_bookkeeper_schema() -> List[Dict[str, Any]]:
                 "account_type": string_prop("Optional: Filter by account type"),
             },
         ),
+        create_tool_schema(
+            name="get_vendors",
+            description="Get list of active vendors from QuickBooks",
+            properties={},
+        ),
+        create_tool_schema(
+            name="get_customers",
+            description="Get list of active customers from QuickBooks",
+            properties={},
+        ),
         create_tool_schema(
             name="get_account_balance",
             description="Get the balance of a specific account",
@@ -60,4 +94,20 @@ def get_bookkeeper_schema() -> List[Dict[str, Any]]:
             },
             required=["transaction_id", "reason"],
         ),
+        create_tool_schema(
+            name="flag_transactions_bulk",
+            description="Flag many transactions for human review in one call. Prefer this over repeated flag_for_review calls.",
+            properties={
+                "flags": array_object_prop(
+                    "The transactions to flag",
+                    {
+                        "transaction_id": string_prop("The transaction ID to flag"),
+                        "reason": string_prop("Reason for flagging"),
+                        "suggested_action": string_prop("Suggested action for the reviewer"),
+                    },
+                    required=["transaction_id", "reason"],
+                ),
+            },
+            required=["flags"],
+        ),
     ]
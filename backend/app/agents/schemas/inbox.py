@@ -1,5 +1,11 @@
 from typing import List, Dict, Any
-from .base import create_tool_schema, string_prop, integer_prop, boolean_prop
+from .base import (
+    create_tool_schema,
+    string_prop,
+    integer_prop,
+    boolean_prop,
+    array_string_prop,
+)
 
 
 def get_inbox_schema() -> List[Dict[str, Any]]:
@@ -7,7 +13,7 @@ def get_inbox_schema() -> List[Dict[str, Any]]:
     return [
         create_tool_schema(
             name="get_emails",
-            description="Fetch emails from Gmail inbox with optional filtering by query, label, or unread status",
+            description="Fetch emails from Gmail inbox with optional filtering by query, label, or unread status. Returns headers, labels and snippet; use get_email_by_id (or include_body) for the full body.",
             properties={
                 "query": string_prop(
                     "Gmail search query (e.g., 'from:boss@company.com', 'subject:urgent')"
@@ -17,6 +23,7 @@ def get_inbox_schema() -> List[Dict[str, Any]]:
                     "Maximum number of emails to return (default: 20, max: 50)"
                 ),
                 "unread_only": boolean_prop("Only return unread emails"),
+                "include_body": boolean_prop("Also fetch and return each email's body (slower)"),
             },
         ),
         create_tool_schema(
@@ -101,6 +108,18 @@ def get_inbox_schema() -> List[Dict[str, Any]]:
             },
             required=["email_id"],
         ),
+        create_tool_schema(
+            name="bulk_modify",
+            description="Add and/or remove labels on many emails in one request. Prefer this over repeated apply_label, mark_as_read or archive_email calls: archive with remove_labels ['INBOX'], mark read with remove_labels ['UNREAD'].",
+            properties={
+                "email_ids": array_string_prop("The email IDs to modify (up to 1000 per request)"),
+                "add_labels": array_string_prop(
+                    "Label names to add (user labels are created if they don't exist)"
+                ),
+                "remove_labels": array_string_prop("Label names to remove"),
+            },
+            required=["email_ids"],
+        ),
         create_tool_schema(
             name="get_followups_due",
             description="Get list of scheduled follow-ups that are due today or overdue",
@@ -4,7 +4,7 @@ from decimal import Decimal
 import httpx
 
 from app.core.database import get_supabase
-from app.agents.tools.quickbooks import QuickBooksTools
+from app.agents.tools.quickbooks import QuickBooksAPIError, QuickBooksTools, flow_totals
 
 
 class CashFlowTools:
@@ -33,28 +33,19 @@ class CashFlowTools:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=90)
 
-        txns_result = await self.quickbooks.get_transactions(
-            start_date=start_date.strftime("%Y-%m-%d"), end_date=end_date.strftime("%Y-%m-%d")
-        )
-
-        if "error" in txns_result:
-            return txns_result
-
-        transactions = txns_result.get("transactions", [])
-
-        # Analyze patterns
-        weekly_inflows = []
-        weekly_outflows = []
-
-        for txn in transactions:
-            amount = float(txn.get("amount", 0))
-            if amount > 0:
-                weekly_outflows.append(amount)
-            else:
-                weekly_inflows.append(abs(amount))
+        # Analyze patterns over every transaction, streamed page by page
+        try:
+            flows = await flow_totals(
+                self.quickbooks.iter_transactions(
+                    start_date=start_date.strftime("%Y-%m-%d"),
+                    end_date=end_date.strftime("%Y-%m-%d"),
+                )
+            )
+        except QuickBooksAPIError as e:
+            return e.result
 
-        avg_weekly_inflow = sum(weekly_inflows) / 13 if weekly_inflows else 0
-        avg_weekly_outflow = sum(weekly_outflows) / 13 if weekly_outflows else 0
+        avg_weekly_inflow = flows["inflow"] / 13
+        avg_weekly_outflow = flows["outflow"] / 13
 
         # Project future cash positions
         projections = []
@@ -136,16 +127,13 @@ class CashFlowTools:
         start_date = end_date - timedelta(days=180)
 
         # Query for open invoices
-        client_info = await self.quickbooks._get_client()
-        query = f"SELECT * FROM Invoice WHERE Balance > 0 ORDER BY DueDate"
-
-        result = await self.quickbooks._make_request("GET", "query", params={"query": query})
+        result = await self.quickbooks.open_balances("Invoice")
 
         receivables = []
         total_ar = 0
 
         if "error" not in result:
-            invoices = result.get("QueryResponse", {}).get("Invoice", [])
+            invoices = result["rows"]
 
             for inv in invoices:
                 balance = float(inv.get("Balance", 0))
@@ -253,15 +241,13 @@ class CashFlowTools:
             return ap_result
 
         # Query for bills
-        query = "SELECT * FROM Bill WHERE Balance > 0 ORDER BY DueDate"
-
-        result = await self.quickbooks._make_request("GET", "query", params={"query": query})
+        result = await self.quickbooks.open_balances("Bill")
 
         payables = []
         total_ap = 0
 
         if "error" not in result:
-            bills = result.get("QueryResponse", {}).get("Bill", [])
+            bills = result["rows"]
 
             for bill in bills:
                 balance = float(bill.get("Balance", 0))
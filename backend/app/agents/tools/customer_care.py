@@ -1,8 +1,8 @@
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
-import httpx
 
 from app.core.database import get_supabase
+from app.core.http import get_http_client
 
 
 class CustomerCareTools:
@@ -31,15 +31,15 @@ class CustomerCareTools:
                 "Content-Type": "application/json",
             }
 
-            async with httpx.AsyncClient() as client:
-                if method == "GET":
-                    response = await client.get(url, headers=headers, params=params)
-                elif method == "POST":
-                    response = await client.post(url, headers=headers, json=data)
-                elif method == "PUT":
-                    response = await client.put(url, headers=headers, json=data)
-                else:
-                    raise ValueError(f"Unsupported method: {method}")
+            client = get_http_client(url)
+            if method == "GET":
+                response = await client.get(url, headers=headers, params=params)
+            elif method == "POST":
+                response = await client.post(url, headers=headers, json=data)
+            elif method == "PUT":
+                response = await client.put(url, headers=headers, json=data)
+            else:
+                raise ValueError(f"Unsupported method: {method}")
 
             if response.status_code in (200, 201):
                 return response.json()
@@ -1,12 +1,57 @@
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
-import httpx
+import asyncio
 import base64
 import json
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-from app.core.database import get_supabase
+from app.core import store
+from app.core.config import settings
+from app.core.database import get_async_supabase_admin, get_supabase
+from app.core.http import get_http_client
+from app.core.logging import get_logger
+
+log = get_logger(__name__)
+
+
+# Max messages.get calls in flight per get_emails. Gmail's per-user quota
+# tolerates this comfortably; higher mostly buys 429s.
+GMAIL_FETCH_CONCURRENCY = 10
+
+# Listing and triage only read these headers plus snippet/labels, so they
+# fetch format=metadata with a partial-response mask instead of full
+# messages; bodies are fetched (and decoded) only when a tool needs them.
+METADATA_HEADERS = ["Subject", "From", "To", "Cc", "Date"]
+METADATA_FIELDS = "id,threadId,historyId,snippet,labelIds,payload/headers"
+LIST_FIELDS = "messages/id,nextPageToken"
+HISTORY_FIELDS = "history/messages/id,historyId,nextPageToken"
+
+# messages.batchModify accepts at most this many ids per request.
+BATCH_MODIFY_LIMIT = 1000
+
+# System labels whose id is their name; these need no labels.list lookup.
+SYSTEM_LABELS = {"INBOX", "UNREAD", "STARRED", "IMPORTANT", "SPAM", "TRASH"}
+
+# user_id -> (expires_at monotonic seconds, lowercased label name -> id).
+# Process-wide so every task for a user shares one labels.list call.
+_label_cache: Dict[str, tuple] = {}
+
+
+def _history_at_least(history_id: Optional[str], floor: Optional[str]) -> bool:
+    """Whether a message's historyId is at or past `floor` (both numeric strings)."""
+    if history_id is None or floor is None:
+        return False
+    return int(history_id) >= int(floor)
+
+
+class GmailAPIError(Exception):
+    """Raised from label lookups; `result` is the usual {"error": ...} dict."""
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get("error"))
+        self.result = result
 
 
 class GmailTools:
@@ -15,6 +60,11 @@ class GmailTools:
     def __init__(self, user_id: str):
         self.user_id = user_id
         self._client_info = None
+        # None until the message cache has been synced for this instance.
+        self._cache_ready: Optional[bool] = None
+        self._cache_lock = asyncio.Lock()
+        # gmail_sync_state.history_id as of our own sync.
+        self._synced_history_id: Optional[str] = None
 
     async def _get_client(self) -> Dict[str, str]:
         """Get authenticated Gmail client info"""
@@ -38,24 +88,28 @@ class GmailTools:
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient() as client:
-            if method == "GET":
-                response = await client.get(url, headers=headers, params=params)
-            elif method == "POST":
-                response = await client.post(url, headers=headers, json=data)
-            elif method == "PATCH":
-                response = await client.patch(url, headers=headers, json=data)
-            elif method == "DELETE":
-                response = await client.delete(url, headers=headers)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
+        client = get_http_client(url)
+        if method == "GET":
+            response = await client.get(url, headers=headers, params=params)
+        elif method == "POST":
+            response = await client.post(url, headers=headers, json=data)
+        elif method == "PATCH":
+            response = await client.patch(url, headers=headers, json=data)
+        elif method == "DELETE":
+            response = await client.delete(url, headers=headers)
+        else:
+            raise ValueError(f"Unsupported method: {method}")
 
         if response.status_code in (200, 204):
             if response.text:
                 return response.json()
             return {"success": True}
         else:
-            return {"error": f"Gmail API error: {response.status_code}", "details": response.text}
+            return {
+                "error": f"Gmail API error: {response.status_code}",
+                "status_code": response.status_code,
+                "details": response.text,
+            }
 
     def _decode_body(self, payload: Dict) -> str:
         """Decode email body from base64"""
@@ -92,12 +146,12 @@ class GmailTools:
                 return header.get("value", "")
         return ""
 
-    def _parse_email(self, message: Dict) -> Dict[str, Any]:
+    def _parse_email(self, message: Dict, include_body: bool = True) -> Dict[str, Any]:
         """Parse Gmail message into structured format"""
         payload = message.get("payload", {})
         headers = payload.get("headers", [])
 
-        return {
+        email = {
             "id": message.get("id"),
             "thread_id": message.get("threadId"),
             "snippet": message.get("snippet", ""),
@@ -107,11 +161,175 @@ class GmailTools:
             "cc": self._get_header(headers, "Cc"),
             "date": self._get_header(headers, "Date"),
             "labels": message.get("labelIds", []),
-            "body": self._decode_body(payload),
             "is_unread": "UNREAD" in message.get("labelIds", []),
             "is_important": "IMPORTANT" in message.get("labelIds", []),
             "is_starred": "STARRED" in message.get("labelIds", []),
         }
+        if include_body:
+            email["body"] = self._decode_body(payload)
+        return email
+
+    def _message_params(self, include_body: bool) -> Optional[Dict[str, Any]]:
+        """Query params for messages.get: full, or metadata-only with a field mask."""
+        if include_body:
+            return None
+        return {
+            "format": "metadata",
+            "metadataHeaders": METADATA_HEADERS,
+            "fields": METADATA_FIELDS,
+        }
+
+    # ---------- Message cache (gmail_message_cache) ----------
+
+    async def _sync_cache(self) -> bool:
+        """Replay mailbox history into the cache once per instance.
+
+        Returns whether the cache can be trusted for this run. Cache trouble
+        is logged and the tools fall back to the Gmail API.
+        """
+        if not settings.GMAIL_CACHE_ENABLED:
+            return False
+        async with self._cache_lock:
+            if self._cache_ready is None:
+                try:
+                    self._cache_ready = await self._replay_history()
+                except Exception:
+                    log.warning(
+                        "gmail_cache_sync_failed", exc_info=True, extra={"user_id": self.user_id}
+                    )
+                    self._cache_ready = False
+            return self._cache_ready
+
+    async def _replay_history(self) -> bool:
+        db = await get_async_supabase_admin()
+        start = await store.get_gmail_history_id(db, self.user_id)
+        if start is None:
+            return await self._reset_cache(db)
+
+        changed = set()
+        latest = start
+        page_token = None
+        while True:
+            params = {"startHistoryId": start, "fields": HISTORY_FIELDS}
+            if page_token:
+                params["pageToken"] = page_token
+            result = await self._make_request("GET", "history", params=params)
+            if "error" in result:
+                # 404 means startHistoryId is too old to replay.
+                if result.get("status_code") == 404:
+                    return await self._reset_cache(db)
+                return False
+            for record in result.get("history", []):
+                changed.update(message["id"] for message in record.get("messages", []))
+            latest = result.get("historyId", latest)
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                break
+
+        await store.evict_gmail_messages(db, self.user_id, sorted(changed))
+        if latest != start:
+            await store.save_gmail_history_id(db, self.user_id, latest)
+        self._synced_history_id = latest
+        log.info(
+            "gmail_cache_synced",
+            extra={"user_id": self.user_id, "changed": len(changed), "history_id": latest},
+        )
+        return True
+
+    async def _reset_cache(self, db) -> bool:
+        """Start over from the mailbox's current historyId."""
+        profile = await self._make_request("GET", "profile", params={"fields": "historyId"})
+        if "error" in profile:
+            return False
+        await store.evict_gmail_messages(db, self.user_id)
+        await store.save_gmail_history_id(db, self.user_id, profile["historyId"])
+        self._synced_history_id = profile["historyId"]
+        return True
+
+    async def _cache_get(self, message_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not message_ids or not await self._sync_cache():
+            return {}
+        try:
+            db = await get_async_supabase_admin()
+            return await store.get_cached_gmail_messages(db, self.user_id, message_ids)
+        except Exception:
+            log.warning("gmail_cache_read_failed", exc_info=True, extra={"user_id": self.user_id})
+            return {}
+
+    async def _cache_put(self, fetched: List[tuple]) -> None:
+        """Cache (raw message, parsed email, has_body) triples.
+
+        If another run advanced the sync point while we were fetching, it
+        may have evicted a message we fetched before the change; only
+        messages at or past the new sync point are written then.
+        """
+        if not fetched or not self._cache_ready:
+            return
+        try:
+            db = await get_async_supabase_admin()
+            current = await store.get_gmail_history_id(db, self.user_id)
+        except Exception:
+            log.warning("gmail_cache_write_failed", exc_info=True, extra={"user_id": self.user_id})
+            return
+        if current != self._synced_history_id:
+            fetched = [
+                item for item in fetched if _history_at_least(item[0].get("historyId"), current)
+            ]
+            if not fetched:
+                return
+        rows = [
+            {
+                "user_id": self.user_id,
+                "message_id": email["id"],
+                "thread_id": email["thread_id"],
+                "history_id": raw.get("historyId"),
+                "email": email,
+                "has_body": has_body,
+            }
+            for raw, email, has_body in fetched
+        ]
+        try:
+            await store.cache_gmail_messages(db, rows)
+        except Exception:
+            log.warning("gmail_cache_write_failed", exc_info=True, extra={"user_id": self.user_id})
+
+    async def _cache_evict(self, message_ids: List[str]) -> None:
+        if not self._cache_ready:
+            return
+        try:
+            db = await get_async_supabase_admin()
+            await store.evict_gmail_messages(db, self.user_id, message_ids)
+        except Exception:
+            log.warning("gmail_cache_write_failed", exc_info=True, extra={"user_id": self.user_id})
+
+    def _cached_email(self, row: Optional[Dict[str, Any]], include_body: bool):
+        """The cached email if it satisfies the request, else None."""
+        if row is None or (include_body and not row.get("has_body")):
+            return None
+        email = dict(row["email"])
+        if not include_body:
+            email.pop("body", None)
+        return email
+
+    async def _load_emails(self, message_ids: List[str], include_body: bool) -> List[Dict]:
+        """Parsed emails for `message_ids` in order: cache first, then Gmail."""
+        cached = await self._cache_get(message_ids)
+        emails = {}
+        for message_id, row in cached.items():
+            email = self._cached_email(row, include_body)
+            if email is not None:
+                emails[message_id] = email
+
+        missing = [message_id for message_id in message_ids if message_id not in emails]
+        fetched = []
+        for raw in await self._get_messages(missing, include_body=include_body):
+            if "error" not in raw:
+                email = self._parse_email(raw, include_body)
+                emails[email["id"]] = email
+                fetched.append((raw, email, include_body))
+        await self._cache_put(fetched)
+
+        return [emails[message_id] for message_id in message_ids if message_id in emails]
 
     async def get_emails(
         self,
@@ -119,8 +337,12 @@ class GmailTools:
         label: Optional[str] = None,
         max_results: int = 20,
         unread_only: bool = False,
+        include_body: bool = False,
     ) -> Dict[str, Any]:
-        """Fetch emails from inbox with optional filtering"""
+        """Fetch emails from inbox with optional filtering.
+
+        Returns headers, labels and snippet only unless `include_body` is set.
+        """
         q_parts = []
 
         if query:
@@ -130,7 +352,11 @@ class GmailTools:
         if unread_only:
             q_parts.append("is:unread")
 
-        params = {"maxResults": min(max_results, 50), "q": " ".join(q_parts) if q_parts else None}
+        params = {
+            "maxResults": min(max_results, 50),
+            "q": " ".join(q_parts) if q_parts else None,
+            "fields": LIST_FIELDS,
+        }
         params = {k: v for k, v in params.items() if v is not None}
 
         result = await self._make_request("GET", "messages", params=params)
@@ -139,23 +365,44 @@ class GmailTools:
             return result
 
         messages = result.get("messages", [])
-        emails = []
-
-        for msg in messages[:max_results]:
-            full_msg = await self._make_request("GET", f"messages/{msg['id']}")
-            if "error" not in full_msg:
-                emails.append(self._parse_email(full_msg))
+        emails = await self._load_emails(
+            [msg["id"] for msg in messages[:max_results]], include_body=include_body
+        )
 
         return {"emails": emails, "count": len(emails), "has_more": len(messages) > max_results}
 
+    async def _get_messages(
+        self, message_ids: List[str], include_body: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Fetch messages concurrently (bounded), preserving input order."""
+        slots = asyncio.Semaphore(GMAIL_FETCH_CONCURRENCY)
+        params = self._message_params(include_body)
+
+        async def fetch(message_id: str) -> Dict[str, Any]:
+            async with slots:
+                return await self._make_request("GET", f"messages/{message_id}", params=params)
+
+        return await asyncio.gather(*(fetch(message_id) for message_id in message_ids))
+
     async def get_email_by_id(self, email_id: str) -> Dict[str, Any]:
         """Get a specific email by ID"""
-        result = await self._make_request("GET", f"messages/{email_id}")
+        return await self._get_email(email_id, include_body=True)
+
+    async def _get_email(self, email_id: str, include_body: bool) -> Dict[str, Any]:
+        cached = await self._cache_get([email_id])
+        email = self._cached_email(cached.get(email_id), include_body)
+        if email is not None:
+            return {"email": email}
+
+        params = self._message_params(include_body)
+        result = await self._make_request("GET", f"messages/{email_id}", params=params)
 
         if "error" in result:
             return result
 
-        return {"email": self._parse_email(result)}
+        email = self._parse_email(result, include_body)
+        await self._cache_put([(result, email, include_body)])
+        return {"email": email}
 
     async def triage_inbox(self, time_window_hours: int = 24) -> Dict[str, Any]:
         """Analyze and categorize recent emails for triage"""
@@ -221,7 +468,7 @@ class GmailTools:
         self, email_id: str, response_body: str, include_original: bool = True
     ) -> Dict[str, Any]:
         """Create a draft reply to an email"""
-        original = await self.get_email_by_id(email_id)
+        original = await self._get_email(email_id, include_body=False)
 
         if "error" in original:
             return original
@@ -298,7 +545,7 @@ class GmailTools:
 
         send_data = {"raw": raw}
         if reply_to_id:
-            original = await self.get_email_by_id(reply_to_id)
+            original = await self._get_email(reply_to_id, include_body=False)
             if "error" not in original:
                 send_data["threadId"] = original["email"]["thread_id"]
 
@@ -320,7 +567,7 @@ class GmailTools:
         self, email_id: str, followup_date: str, followup_note: str
     ) -> Dict[str, Any]:
         """Schedule a follow-up reminder for an email"""
-        email_result = await self.get_email_by_id(email_id)
+        email_result = await self._get_email(email_id, include_body=False)
 
         if "error" in email_result:
             return email_result
@@ -377,34 +624,81 @@ class GmailTools:
             "message": "Email content retrieved. Analyze for action items.",
         }
 
-    async def apply_label(self, email_id: str, label_name: str) -> Dict[str, Any]:
-        """Apply a label to an email"""
-        # First get or create the label
-        labels_result = await self._make_request("GET", "labels")
+    async def _label_ids(self, refresh: bool = False) -> Dict[str, str]:
+        """This user's label name -> id map (lowercased names), cached with a TTL.
 
-        if "error" in labels_result:
-            return labels_result
+        Raises GmailAPIError if labels.list fails.
+        """
+        entry = _label_cache.get(self.user_id)
+        if entry is not None and not refresh and entry[0] > time.monotonic():
+            return entry[1]
 
-        label_id = None
-        for label in labels_result.get("labels", []):
-            if label["name"].lower() == label_name.lower():
-                label_id = label["id"]
-                break
+        result = await self._make_request("GET", "labels", params={"fields": "labels(id,name)"})
+        if "error" in result:
+            raise GmailAPIError(result)
 
-        # Create label if it doesn't exist
-        if not label_id:
-            create_result = await self._make_request(
-                "POST",
-                "labels",
-                data={
-                    "name": label_name,
-                    "labelListVisibility": "labelShow",
-                    "messageListVisibility": "show",
-                },
-            )
-            if "error" in create_result:
-                return create_result
-            label_id = create_result.get("id")
+        labels = {label["name"].lower(): label["id"] for label in result.get("labels", [])}
+        _label_cache[self.user_id] = (
+            time.monotonic() + settings.GMAIL_LABEL_CACHE_TTL_SECONDS,
+            labels,
+        )
+        return labels
+
+    async def _resolve_label(self, label_name: str) -> str:
+        """Get or create a label by name and return its id.
+
+        Raises GmailAPIError if the label can be neither found nor created.
+        """
+        labels = await self._label_ids()
+        label_id = labels.get(label_name.lower())
+        if label_id:
+            return label_id
+
+        create_result = await self._make_request(
+            "POST",
+            "labels",
+            data={
+                "name": label_name,
+                "labelListVisibility": "labelShow",
+                "messageListVisibility": "show",
+            },
+        )
+        if "error" in create_result:
+            # Most likely created since we cached the list; refetch once.
+            labels = await self._label_ids(refresh=True)
+            if label_name.lower() in labels:
+                return labels[label_name.lower()]
+            raise GmailAPIError(create_result)
+
+        labels[label_name.lower()] = create_result["id"]
+        return create_result["id"]
+
+    async def _batch_modify(
+        self,
+        email_ids: List[str],
+        add_label_ids: Optional[List[str]] = None,
+        remove_label_ids: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Change labels on many messages with messages.batchModify."""
+        for start in range(0, len(email_ids), BATCH_MODIFY_LIMIT):
+            chunk = email_ids[start : start + BATCH_MODIFY_LIMIT]
+            data = {"ids": chunk}
+            if add_label_ids:
+                data["addLabelIds"] = add_label_ids
+            if remove_label_ids:
+                data["removeLabelIds"] = remove_label_ids
+            result = await self._make_request("POST", "messages/batchModify", data=data)
+            if "error" in result:
+                return result
+            await self._cache_evict(chunk)
+        return {"success": True}
+
+    async def apply_label(self, email_id: str, label_name: str) -> Dict[str, Any]:
+        """Apply a label to an email"""
+        try:
+            label_id = await self._resolve_label(label_name)
+        except GmailAPIError as e:
+            return e.result
 
         # Apply label to email
         result = await self._make_request(
@@ -412,7 +706,10 @@ class GmailTools:
         )
 
         if "error" in result:
+            # The label may have been deleted in Gmail since it was cached.
+            _label_cache.pop(self.user_id, None)
             return result
+        await self._cache_evict([email_id])
 
         return {
             "email_id": email_id,
@@ -421,6 +718,67 @@ class GmailTools:
             "status": "label_applied",
         }
 
+    async def bulk_modify(
+        self,
+        email_ids: List[str],
+        add_labels: Optional[List[str]] = None,
+        remove_labels: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Add and/or remove labels on many emails in one batchModify request.
+
+        System labels (INBOX, UNREAD, ...) are passed through, so archiving is
+        remove_labels=["INBOX"] and marking read is remove_labels=["UNREAD"].
+        Missing user labels are created when added and ignored when removed.
+        """
+        if not email_ids:
+            return {"error": "email_ids must not be empty"}
+        if not add_labels and not remove_labels:
+            return {"error": "Provide add_labels and/or remove_labels"}
+
+        add_ids = []
+        remove_ids = []
+        try:
+            for name in add_labels or []:
+                if name.upper() in SYSTEM_LABELS:
+                    add_ids.append(name.upper())
+                else:
+                    add_ids.append(await self._resolve_label(name))
+
+            for name in remove_labels or []:
+                if name.upper() in SYSTEM_LABELS:
+                    remove_ids.append(name.upper())
+                    continue
+                labels = await self._label_ids()
+                if name.lower() in labels:
+                    remove_ids.append(labels[name.lower()])
+        except GmailAPIError as e:
+            return e.result
+
+        if not add_ids and not remove_ids:
+            return {
+                "email_ids": email_ids,
+                "count": 0,
+                "added_labels": [],
+                "removed_labels": [],
+                "status": "nothing_to_modify",
+                "message": "None of the labels to remove exist",
+            }
+
+        result = await self._batch_modify(
+            email_ids, add_label_ids=add_ids, remove_label_ids=remove_ids
+        )
+        if "error" in result:
+            _label_cache.pop(self.user_id, None)
+            return result
+
+        return {
+            "email_ids": email_ids,
+            "count": len(email_ids),
+            "added_labels": add_labels or [],
+            "removed_labels": remove_labels or [],
+            "status": "modified",
+        }
+
     async def mark_as_read(self, email_id: str) -> Dict[str, Any]:
         """Mark an email as read"""
         result = await self._make_request(
@@ -429,6 +787,7 @@ class GmailTools:
 
         if "error" in result:
             return result
+        await self._cache_evict([email_id])
 
         return {"email_id": email_id, "status": "marked_read"}
 
@@ -440,6 +799,7 @@ class GmailTools:
 
         if "error" in result:
             return result
+        await self._cache_evict([email_id])
 
         return {"email_id": email_id, "status": "archived"}
 
@@ -1,8 +1,142 @@
-from typing import Dict, Any, Optional, List
-from datetime import datetime
-import httpx
+from typing import Dict, Any, Optional, List, Iterable, Tuple, AsyncIterator, Callable
+from datetime import datetime, timezone
+import asyncio
+import time
 from app.api.integrations import get_quickbooks_client
-from app.core.database import get_supabase
+from app.core import store
+from app.core.config import settings
+from app.core.database import get_async_supabase_admin, get_supabase
+from app.core.http import get_http_client
+from app.core.logging import get_logger
+
+log = get_logger(__name__)
+
+
+# Slow-changing reference entities, cached per realm across tasks:
+# (realm_id, entity) -> (expires_at monotonic seconds, active rows).
+# Task workers drop entries when webhook_events report changes to the realm
+# (app.workers.quickbooks_sync.invalidate_changed_reference_data).
+REFERENCE_ENTITIES = ("Account", "Vendor", "Customer")
+
+# Entities kept in the quickbooks_ledger mirror by app.workers.quickbooks_sync.
+MIRRORED_ENTITIES = ("Purchase", "Invoice", "Bill", "Account")
+_reference_cache: Dict[Tuple[str, str], Tuple[float, List[Dict[str, Any]]]] = {}
+
+# Expense reports total every transaction but list at most this many
+# (the most recent) per group.
+REPORT_TRANSACTIONS_PER_GROUP = 25
+
+# get_transactions returns at most this many rows, whatever the model asks for.
+MAX_TRANSACTIONS_PER_CALL = 1000
+
+# QuickBooks accepts at most 30 operations per /batch request.
+BATCH_LIMIT = 30
+# Purchase ids per lookup query when applying categorizations.
+LOOKUP_IDS_PER_QUERY = 100
+
+
+def invalidate_reference_data(realm_id: str, entities: Optional[Iterable[str]] = None) -> None:
+    """Forget cached reference data for a realm after QuickBooks reports changes.
+
+    Accounts are always dropped: their balances move with every transaction.
+    Vendors and customers are dropped when they are among `entities`, or
+    when `entities` is None.
+    """
+    changed = set(REFERENCE_ENTITIES if entities is None else entities) | {"Account"}
+    for entity in changed:
+        _reference_cache.pop((realm_id, entity), None)
+
+
+def _mirror_usable(realm_id: str, state: Optional[Dict[str, Any]]) -> bool:
+    """Backfilled, and synced within QUICKBOOKS_MIRROR_MAX_STALENESS_SECONDS."""
+    if not state or not state.get("backfilled_at"):
+        return False
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(state["synced_through"])
+    if age.total_seconds() > settings.QUICKBOOKS_MIRROR_MAX_STALENESS_SECONDS:
+        log.warning(
+            "quickbooks_mirror_stale",
+            extra={"realm_id": realm_id, "age_seconds": int(age.total_seconds())},
+        )
+        return False
+    return True
+
+
+class QuickBooksAPIError(Exception):
+    """Raised from streaming reads; `result` is the usual {"error": ...} dict."""
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get("error"))
+        self.result = result
+
+
+def _parse_purchase(purchase: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": purchase.get("Id"),
+        "date": purchase.get("TxnDate"),
+        "amount": purchase.get("TotalAmt"),
+        "vendor": purchase.get("EntityRef", {}).get("name", "Unknown"),
+        "account": purchase.get("AccountRef", {}).get("name", "Uncategorized"),
+        "memo": purchase.get("PrivateNote", ""),
+        "payment_type": purchase.get("PaymentType", ""),
+        "line_items": [
+            {
+                "description": line.get("Description", ""),
+                "amount": line.get("Amount"),
+                "account": line.get("AccountBasedExpenseLineDetail", {})
+                .get("AccountRef", {})
+                .get("name", ""),
+            }
+            for line in purchase.get("Line", [])
+            if line.get("DetailType") == "AccountBasedExpenseLineDetail"
+        ],
+    }
+
+
+async def group_totals(
+    transactions: AsyncIterator[Dict[str, Any]],
+    key: Callable[[Dict[str, Any]], str],
+    keep: int = 0,
+) -> Dict[str, Any]:
+    """Total and count transactions per `key(txn)` as they stream past.
+
+    Keeps at most `keep` transactions per group (the first seen), so memory
+    grows with the number of groups, not the number of transactions.
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    total = 0.0
+    count = 0
+    async for txn in transactions:
+        amount = float(txn.get("amount") or 0)
+        total += amount
+        count += 1
+        group = groups.setdefault(key(txn), {"total": 0, "count": 0, "transactions": []})
+        group["total"] += amount
+        group["count"] += 1
+        if len(group["transactions"]) < keep:
+            group["transactions"].append(
+                {
+                    "id": txn.get("id"),
+                    "date": txn.get("date"),
+                    "amount": amount,
+                    "vendor": txn.get("vendor"),
+                    "memo": txn.get("memo"),
+                }
+            )
+    return {"total": total, "count": count, "groups": groups}
+
+
+async def flow_totals(transactions: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum outflows (positive amounts) and inflows (negative) over a stream."""
+    totals = {"inflow": 0.0, "inflow_count": 0, "outflow": 0.0, "outflow_count": 0}
+    async for txn in transactions:
+        amount = float(txn.get("amount") or 0)
+        if amount > 0:
+            totals["outflow"] += amount
+            totals["outflow_count"] += 1
+        else:
+            totals["inflow"] += abs(amount)
+            totals["inflow_count"] += 1
+    return totals
 
 
 class QuickBooksTools:
@@ -11,6 +145,8 @@ class QuickBooksTools:
     def __init__(self, user_id: str):
         self.user_id = user_id
         self._client_info = None
+        # Realm id once the local ledger mirror is known to be usable, "" if not.
+        self._mirror_realm: Optional[str] = None
 
     async def _get_client(self) -> Dict[str, str]:
         """Get authenticated QuickBooks client info"""
@@ -31,13 +167,13 @@ class QuickBooksTools:
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient() as client:
-            if method == "GET":
-                response = await client.get(url, headers=headers, params=params)
-            elif method == "POST":
-                response = await client.post(url, headers=headers, json=data)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
+        client = get_http_client(url)
+        if method == "GET":
+            response = await client.get(url, headers=headers, params=params)
+        elif method == "POST":
+            response = await client.post(url, headers=headers, json=data)
+        else:
+            raise ValueError(f"Unsupported method: {method}")
 
         if response.status_code == 200:
             return response.json()
@@ -47,54 +183,196 @@ class QuickBooksTools:
                 "details": response.text,
             }
 
-    async def get_transactions(
-        self, start_date: str, end_date: str, account_id: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """Fetch transactions from QuickBooks"""
+    async def _reference_rows(self, entity: str) -> List[Dict[str, Any]]:
+        """All active rows of a reference entity, read through the realm cache.
+
+        Raises QuickBooksAPIError if the query fails.
+        """
+        client_info = await self._get_client()
+        key = (client_info["realm_id"], entity)
+        entry = _reference_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        realm_id = await self._mirror() if entity in MIRRORED_ENTITIES else None
+        if realm_id:
+            rows = [
+                row["data"]
+                async for row in self._mirror_rows(
+                    realm_id, entity, active_only=True, order="entity_id"
+                )
+            ]
+        else:
+            query = f"SELECT * FROM {entity} WHERE Active = true MAXRESULTS 1000"
+            result = await self._make_request("GET", "query", params={"query": query})
+            if "error" in result:
+                raise QuickBooksAPIError(result)
+            rows = result.get("QueryResponse", {}).get(entity, [])
+
+        _reference_cache[key] = (
+            time.monotonic() + settings.QUICKBOOKS_REFERENCE_CACHE_TTL_SECONDS,
+            rows,
+        )
+        return rows
+
+    async def _mirror(self) -> Optional[str]:
+        """The realm id if reads can use the local ledger mirror, else None."""
+        if not settings.QUICKBOOKS_MIRROR_ENABLED:
+            return None
+        if self._mirror_realm is None:
+            realm_id = (await self._get_client())["realm_id"]
+            try:
+                db = await get_async_supabase_admin()
+                state = await store.get_quickbooks_sync_state(db, realm_id)
+            except Exception:
+                log.warning("quickbooks_mirror_unavailable", exc_info=True)
+                state = None
+            self._mirror_realm = realm_id if _mirror_usable(realm_id, state) else ""
+        return self._mirror_realm or None
+
+    async def _mirror_rows(
+        self, realm_id: str, entity: str, page_size: int = 1000, **filters: Any
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Page through mirrored rows matching `filters` (see store.list_ledger_rows)."""
+        db = await get_async_supabase_admin()
+        offset = 0
+        while True:
+            rows = await store.list_ledger_rows(
+                db, realm_id, entity, offset=offset, limit=page_size, **filters
+            )
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                return
+            offset += page_size
+
+    async def _iter_query(
+        self,
+        query: str,
+        entity: str,
+        page_size: Optional[int] = None,
+        prefetch: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every row of a QuickBooks query, page by page.
+
+        Pages are requested with STARTPOSITION/MAXRESULTS, keeping up to
+        `prefetch` (QUICKBOOKS_PAGE_PREFETCH) requests in flight ahead of the
+        consumer. Raises QuickBooksAPIError if a page fails.
+        """
+        page_size = page_size or settings.QUICKBOOKS_PAGE_SIZE
+
+        def fetch(page: int) -> asyncio.Task:
+            paged = f"{query} STARTPOSITION {page * page_size + 1} MAXRESULTS {page_size}"
+            return asyncio.ensure_future(
+                self._make_request("GET", "query", params={"query": paged})
+            )
+
+        prefetch = max(1, prefetch or settings.QUICKBOOKS_PAGE_PREFETCH)
+        pending = [fetch(page) for page in range(prefetch)]
+        next_page = prefetch
+        try:
+            while pending:
+                result = await pending.pop(0)
+                if "error" in result:
+                    raise QuickBooksAPIError(result)
+
+                rows = result.get("QueryResponse", {}).get(entity, [])
+                if len(rows) < page_size:
+                    # Last page; anything still in flight is past the end.
+                    for task in pending:
+                        task.cancel()
+                    pending = []
+                else:
+                    pending.append(fetch(next_page))
+                    next_page += 1
+
+                for row in rows:
+                    yield row
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def iter_transactions(
+        self,
+        start_date: str,
+        end_date: str,
+        account_id: Optional[str] = None,
+        page_size: Optional[int] = None,
+        prefetch: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every Purchase in the range, newest first.
+
+        Reads the local ledger mirror when it is backfilled for this realm,
+        otherwise pages through the QuickBooks API (see `_iter_query`).
+        """
+        realm_id = await self._mirror()
+        if realm_id:
+            rows = self._mirror_rows(
+                realm_id,
+                "Purchase",
+                page_size=page_size or settings.QUICKBOOKS_PAGE_SIZE,
+                start_date=start_date,
+                end_date=end_date,
+                account_ref=account_id,
+                desc=True,
+            )
+            async for row in rows:
+                yield _parse_purchase(row["data"])
+            return
+
         query = (
             f"SELECT * FROM Purchase WHERE TxnDate >= '{start_date}' AND TxnDate <= '{end_date}'"
         )
-
         if account_id:
             query += f" AND AccountRef = '{account_id}'"
+        query += " ORDERBY TxnDate DESC"
 
-        query += " ORDERBY TxnDate DESC MAXRESULTS 100"
+        async for purchase in self._iter_query(query, "Purchase", page_size, prefetch):
+            yield _parse_purchase(purchase)
 
-        result = await self._make_request("GET", "query", params={"query": query})
+    async def open_balances(self, entity: str) -> Dict[str, Any]:
+        """Invoices or Bills with an open balance, earliest due first."""
+        realm_id = await self._mirror()
+        if realm_id:
+            rows = self._mirror_rows(realm_id, entity, open_only=True, order="due_date")
+            return {"rows": [row["data"] async for row in rows]}
 
+        query = f"SELECT * FROM {entity} WHERE Balance > 0 ORDER BY DueDate"
+        result = await self._make_request("GET", "query", params={"query": query})
         if "error" in result:
             return result
+        return {"rows": result.get("QueryResponse", {}).get(entity, [])}
 
-        purchases = result.get("QueryResponse", {}).get("Purchase", [])
-
+    async def get_transactions(
+        self,
+        start_date: str,
+        end_date: str,
+        account_id: Optional[str] = None,
+        max_results: int = 100,
+    ) -> Dict[str, Any]:
+        """Fetch transactions from QuickBooks"""
+        max_results = max(1, min(max_results, MAX_TRANSACTIONS_PER_CALL))
         transactions = []
-        for purchase in purchases:
-            transactions.append(
-                {
-                    "id": purchase.get("Id"),
-                    "date": purchase.get("TxnDate"),
-                    "amount": purchase.get("TotalAmt"),
-                    "vendor": purchase.get("EntityRef", {}).get("name", "Unknown"),
-                    "account": purchase.get("AccountRef", {}).get("name", "Uncategorized"),
-                    "memo": purchase.get("PrivateNote", ""),
-                    "payment_type": purchase.get("PaymentType", ""),
-                    "line_items": [
-                        {
-                            "description": line.get("Description", ""),
-                            "amount": line.get("Amount"),
-                            "account": line.get("AccountBasedExpenseLineDetail", {})
-                            .get("AccountRef", {})
-                            .get("name", ""),
-                        }
-                        for line in purchase.get("Line", [])
-                        if line.get("DetailType") == "AccountBasedExpenseLineDetail"
-                    ],
-                }
-            )
+        truncated = False
+        # Read one row past the limit to know whether there are more.
+        stream = self.iter_transactions(
+            start_date, end_date, account_id, page_size=min(max_results + 1, 1000), prefetch=1
+        )
+        try:
+            async for txn in stream:
+                if len(transactions) == max_results:
+                    truncated = True
+                    break
+                transactions.append(txn)
+        except QuickBooksAPIError as e:
+            return e.result
+        finally:
+            await stream.aclose()
 
         return {
             "transactions": transactions,
             "count": len(transactions),
+            "truncated": truncated,
             "date_range": {"start": start_date, "end": end_date},
         }
 
@@ -138,21 +416,187 @@ class QuickBooksTools:
             "requires_approval": True,
         }
 
-    async def get_accounts(self, account_type: Optional[str] = None) -> Dict[str, Any]:
-        """Get list of accounts"""
-        query = "SELECT * FROM Account WHERE Active = true"
+    async def categorize_transactions_bulk(
+        self, categorizations: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Queue many categorizations against one accounts lookup and one insert"""
+        accounts = await self.get_accounts(account_type="Expense")
 
-        if account_type:
-            query += f" AND AccountType = '{account_type}'"
+        if "error" in accounts:
+            return accounts
 
-        query += " ORDERBY Name"
+        by_name = {a["name"].lower(): a for a in accounts.get("accounts", []) if a["name"]}
+        now = datetime.utcnow().isoformat()
+        rows, not_found, duplicates = [], [], []
+        seen = set()
+        for item in categorizations:
+            # Rows from one call share created_at, so a second categorization
+            # of the same transaction would have no defined order.
+            if item.get("transaction_id") in seen:
+                duplicates.append(item.get("transaction_id"))
+                continue
+            seen.add(item.get("transaction_id"))
+            account = by_name.get((item.get("category") or "").lower())
+            if not account:
+                not_found.append(
+                    {"transaction_id": item.get("transaction_id"), "category": item.get("category")}
+                )
+                continue
+            rows.append(
+                {
+                    "user_id": self.user_id,
+                    "transaction_id": item["transaction_id"],
+                    "new_category": account["name"],
+                    "account_id": account["id"],
+                    "memo": item.get("memo"),
+                    "status": "pending_approval",
+                    "created_at": now,
+                }
+            )
 
-        result = await self._make_request("GET", "query", params={"query": query})
+        db = await get_async_supabase_admin()
+        await store.insert_pending_categorizations(db, rows)
 
-        if "error" in result:
-            return result
+        result: Dict[str, Any] = {
+            "status": "pending_approval",
+            "queued": len(rows),
+            "requires_approval": True,
+            "message": f"{len(rows)} transactions queued for categorization",
+        }
+        if not_found:
+            result["not_found"] = not_found
+            result["available_categories"] = [a["name"] for a in accounts.get("accounts", [])]
+        if duplicates:
+            result["duplicates_skipped"] = duplicates
+        return result
+
+    async def _batch(self, items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Send operations through /batch, BATCH_LIMIT per request.
+
+        Returns each item's response keyed by its bId. Raises
+        QuickBooksAPIError if a request fails as a whole.
+        """
+        responses: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(items), BATCH_LIMIT):
+            result = await self._make_request(
+                "POST", "batch", data={"BatchItemRequest": items[i : i + BATCH_LIMIT]}
+            )
+            if "error" in result:
+                raise QuickBooksAPIError(result)
+            for response in result.get("BatchItemResponse", []):
+                responses[response.get("bId")] = response
+        return responses
+
+    async def apply_approved_categorizations(self) -> Dict[str, Any]:
+        """Write approved categorizations to QuickBooks through the batch API"""
+        db = await get_async_supabase_admin()
+        approved = await store.list_pending_categorizations(db, self.user_id, "approved")
+        if not approved:
+            return {"applied": 0, "failed": [], "message": "No approved categorizations"}
+
+        # Oldest first (ties broken by id), so a later categorization of the
+        # same transaction wins.
+        by_txn: Dict[str, List[Dict[str, Any]]] = {}
+        for row in approved:
+            by_txn.setdefault(row["transaction_id"], []).append(row)
+
+        txn_ids = list(by_txn)
+        purchases: Dict[str, Dict[str, Any]] = {}
+        try:
+            for i in range(0, len(txn_ids), LOOKUP_IDS_PER_QUERY):
+                ids = ", ".join(f"'{t}'" for t in txn_ids[i : i + LOOKUP_IDS_PER_QUERY])
+                async for purchase in self._iter_query(
+                    f"SELECT * FROM Purchase WHERE Id IN ({ids})", "Purchase"
+                ):
+                    purchases[purchase["Id"]] = purchase
+
+            updates = []
+            split = set()
+            for txn_id, rows in by_txn.items():
+                purchase = purchases.get(txn_id)
+                if purchase is None:
+                    continue
+                expense_lines = [
+                    line
+                    for line in purchase.get("Line", [])
+                    if line.get("DetailType") == "AccountBasedExpenseLineDetail"
+                ]
+                # A categorization names no line; recategorizing every line of
+                # a split purchase would erase its per-line accounts.
+                if len(expense_lines) != 1:
+                    split.add(txn_id)
+                    continue
+                row = rows[-1]
+                lines = []
+                for line in purchase.get("Line", []):
+                    if line is expense_lines[0]:
+                        detail = line["AccountBasedExpenseLineDetail"]
+                        line = {
+                            **line,
+                            "AccountBasedExpenseLineDetail": {
+                                **detail,
+                                "AccountRef": {
+                                    "value": row["account_id"],
+                                    "name": row["new_category"],
+                                },
+                            },
+                        }
+                    lines.append(line)
+                update = {
+                    "Id": txn_id,
+                    "SyncToken": purchase["SyncToken"],
+                    "sparse": True,
+                    "Line": lines,
+                }
+                if row.get("memo"):
+                    update["PrivateNote"] = row["memo"]
+                updates.append({"bId": txn_id, "operation": "update", "Purchase": update})
+
+            responses = await self._batch(updates)
+        except QuickBooksAPIError as e:
+            return e.result
+
+        applied, failed = [], []
+        for txn_id, rows in by_txn.items():
+            response = responses.get(txn_id)
+            if response is not None and "Purchase" in response:
+                applied.extend(row["id"] for row in rows)
+                continue
+            if txn_id not in purchases:
+                error = "Transaction not found"
+            elif txn_id in split:
+                error = "Purchase has no single expense line; categorize it in QuickBooks"
+            elif response is None:
+                error = "No response from QuickBooks"
+            else:
+                errors = response.get("Fault", {}).get("Error", [{}])
+                error = errors[0].get("Detail") or errors[0].get("Message") or "Update failed"
+            failed.append({"transaction_id": txn_id, "error": error})
+
+        await store.update_pending_categorizations(db, applied, {"status": "applied"})
+        await store.update_pending_categorizations(
+            db,
+            [row["id"] for f in failed for row in by_txn[f["transaction_id"]]],
+            {"status": "failed"},
+        )
+        if applied:
+            invalidate_reference_data((await self._get_client())["realm_id"], ())
 
-        accounts_data = result.get("QueryResponse", {}).get("Account", [])
+        return {
+            "applied": len(applied),
+            "failed": failed,
+            "message": f"Applied {len(applied)} categorizations in QuickBooks",
+        }
+
+    async def get_accounts(self, account_type: Optional[str] = None) -> Dict[str, Any]:
+        """Get list of accounts"""
+        try:
+            accounts_data = await self._reference_rows("Account")
+        except QuickBooksAPIError as e:
+            return e.result
+
+        if account_type:
+            accounts_data = [a for a in accounts_data if a.get("AccountType") == account_type]
 
         accounts = [
             {
@@ -163,11 +607,41 @@ class QuickBooksTools:
                 "balance": account.get("CurrentBalance", 0),
                 "fully_qualified_name": account.get("FullyQualifiedName"),
             }
-            for account in accounts_data
+            for account in sorted(accounts_data, key=lambda a: a.get("Name") or "")
         ]
 
         return {"accounts": accounts, "count": len(accounts)}
 
+    async def get_vendors(self) -> Dict[str, Any]:
+        """Get list of active vendors"""
+        try:
+            vendors = await self._reference_rows("Vendor")
+        except QuickBooksAPIError as e:
+            return e.result
+
+        return {
+            "vendors": [
+                {"id": v.get("Id"), "name": v.get("DisplayName"), "balance": v.get("Balance", 0)}
+                for v in vendors
+            ],
+            "count": len(vendors),
+        }
+
+    async def get_customers(self) -> Dict[str, Any]:
+        """Get list of active customers"""
+        try:
+            customers = await self._reference_rows("Customer")
+        except QuickBooksAPIError as e:
+            return e.result
+
+        return {
+            "customers": [
+                {"id": c.get("Id"), "name": c.get("DisplayName"), "balance": c.get("Balance", 0)}
+                for c in customers
+            ],
+            "count": len(customers),
+        }
+
     async def get_account_balance(self, account_id: str) -> Dict[str, Any]:
         """Get balance for a specific account"""
         result = await self._make_request("GET", f"account/{account_id}")
@@ -188,57 +662,36 @@ class QuickBooksTools:
     async def create_expense_report(
         self, start_date: str, end_date: str, group_by: str = "category"
     ) -> Dict[str, Any]:
-        """Generate an expense report"""
-        transactions_result = await self.get_transactions(start_date, end_date)
-
-        if "error" in transactions_result:
-            return transactions_result
-
-        transactions = transactions_result.get("transactions", [])
-
-        report = {
-            "date_range": {"start": start_date, "end": end_date},
-            "total_expenses": 0,
-            "transaction_count": len(transactions),
-            "grouped_data": {},
-            "generated_at": datetime.utcnow().isoformat(),
-        }
-
-        for txn in transactions:
-            amount = float(txn.get("amount", 0))
-            report["total_expenses"] += amount
+        """Generate an expense report over every transaction in the range"""
 
+        def key(txn: Dict[str, Any]) -> str:
             if group_by == "category":
-                key = txn.get("account", "Uncategorized")
-            elif group_by == "vendor":
-                key = txn.get("vendor", "Unknown")
-            elif group_by == "month":
+                return txn.get("account", "Uncategorized")
+            if group_by == "vendor":
+                return txn.get("vendor", "Unknown")
+            if group_by == "month":
                 date = txn.get("date", "")
-                key = date[:7] if date else "Unknown"
-            else:
-                key = "All"
-
-            if key not in report["grouped_data"]:
-                report["grouped_data"][key] = {"total": 0, "count": 0, "transactions": []}
-
-            report["grouped_data"][key]["total"] += amount
-            report["grouped_data"][key]["count"] += 1
-            report["grouped_data"][key]["transactions"].append(
-                {
-                    "id": txn.get("id"),
-                    "date": txn.get("date"),
-                    "amount": amount,
-                    "vendor": txn.get("vendor"),
-                    "memo": txn.get("memo"),
-                }
+                return date[:7] if date else "Unknown"
+            return "All"
+
+        try:
+            totals = await group_totals(
+                self.iter_transactions(start_date, end_date),
+                key,
+                keep=REPORT_TRANSACTIONS_PER_GROUP,
             )
+        except QuickBooksAPIError as e:
+            return e.result
 
-        sorted_groups = sorted(
-            report["grouped_data"].items(), key=lambda x: x[1]["total"], reverse=True
-        )
-        report["grouped_data"] = dict(sorted_groups)
+        sorted_groups = sorted(totals["groups"].items(), key=lambda x: x[1]["total"], reverse=True)
 
-        return report
+        return {
+            "date_range": {"start": start_date, "end": end_date},
+            "total_expenses": totals["total"],
+            "transaction_count": totals["count"],
+            "grouped_data": dict(sorted_groups),
+            "generated_at": datetime.utcnow().isoformat(),
+        }
 
     async def flag_for_review(
         self, transaction_id: str, reason: str, suggested_action: Optional[str] = None
@@ -268,3 +721,28 @@ class QuickBooksTools:
             "reason": reason,
             "suggested_action": suggested_action,
         }
+
+    async def flag_transactions_bulk(self, flags: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Flag many transactions for human review in one insert"""
+        now = datetime.utcnow().isoformat()
+        rows = [
+            {
+                "user_id": self.user_id,
+                "transaction_id": flag["transaction_id"],
+                "reason": flag["reason"],
+                "suggested_action": flag.get("suggested_action"),
+                "status": "pending_review",
+                "created_at": now,
+            }
+            for flag in flags
+        ]
+
+        db = await get_async_supabase_admin()
+        inserted = await store.insert_flagged_transactions(db, rows)
+
+        return {
+            "status": "flagged",
+            "flagged": len(rows),
+            "flag_ids": [row["id"] for row in inserted],
+            "message": f"{len(rows)} transactions flagged for review",
+        }
@@ -1,8 +1,8 @@
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
-import httpx
 
 from app.core.database import get_supabase
+from app.core.http import get_http_client
 
 
 class SocialPilotTools:
@@ -30,13 +30,13 @@ class SocialPilotTools:
                 params = {}
             params["access_token"] = client_info["access_token"]
 
-            async with httpx.AsyncClient() as client:
-                if method == "GET":
-                    response = await client.get(url, params=params)
-                elif method == "POST":
-                    response = await client.post(url, params=params, json=data)
-                else:
-                    raise ValueError(f"Unsupported method: {method}")
+            client = get_http_client(url)
+            if method == "GET":
+                response = await client.get(url, params=params)
+            elif method == "POST":
+                response = await client.post(url, params=params, json=data)
+            else:
+                raise ValueError(f"Unsupported method: {method}")
 
             if response.status_code == 200:
                 return response.json()
@@ -3,7 +3,8 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime, timezone
 
-from app.core.database import get_supabase_user
+from app.core import store
+from app.core.database import get_async_supabase_user
 from app.core.auth import get_current_user, CurrentUser
 from app.agents.registry import AGENT_REGISTRY, AgentType
 
@@ -46,9 +47,8 @@ async def get_agent_catalog():
 
 @router.get("/subscriptions")
 async def get_my_subscriptions(user: CurrentUser = Depends(get_current_user)):
-    supabase = get_supabase_user(user.token)
-    result = supabase.table("agent_subscriptions").select("*").eq("status", "active").execute()
-    return {"subscriptions": result.data or []}
+    db = await get_async_supabase_user(user.token)
+    return {"subscriptions": await store.list_subscriptions(db)}
 
 
 @router.post("/subscribe")
@@ -56,19 +56,20 @@ async def subscribe_to_agent(req: SubscribeRequest, user: CurrentUser = Depends(
     if req.agent_type not in AGENT_REGISTRY:
         raise HTTPException(status_code=400, detail="Unknown agent type")
 
-    supabase = get_supabase_user(user.token)
+    db = await get_async_supabase_user(user.token)
 
     # Idempotent subscription creation is better, but keep simple for now.
-    inserted = supabase.table("agent_subscriptions").insert(
+    inserted = await store.create_subscription(
+        db,
         {
             "agent_type": req.agent_type.value,
             "status": "active",
             "config": req.config or {},
             "created_at": utc_now_iso(),
-        }
+        },
     )
 
-    return {"subscription": inserted.data}
+    return {"subscription": inserted}
 
 
 @router.post("/run")
@@ -77,17 +78,18 @@ async def run_agent(req: AgentRunRequest, user: CurrentUser = Depends(get_curren
     if req.agent_type not in AGENT_REGISTRY:
         raise HTTPException(status_code=400, detail="Unknown agent type")
 
-    supabase = get_supabase_user(user.token)
+    db = await get_async_supabase_user(user.token)
 
     # Create a task record. Actual execution should be a job queue in Step 3.
-    task = supabase.table("agent_tasks").insert(
+    task = await store.create_task(
+        db,
         {
             "agent_type": req.agent_type.value,
             "task": req.task,
             "context": req.context or {},
             "status": "queued",
             "created_at": utc_now_iso(),
-        }
+        },
     )
 
-    return {"task": task.data}
+    return {"task": task}
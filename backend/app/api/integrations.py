@@ -3,15 +3,17 @@ from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
-import httpx
+from datetime import datetime, timezone
 import secrets
 from urllib.parse import urlencode
 
 from app.core.config import settings
-from app.core.database import get_supabase, get_supabase_user
+from app.core import store
+from app.core.database import get_async_supabase_admin, get_async_supabase_user
+from app.core.http import get_http_client
 from app.core.auth import get_current_user, CurrentUser
 from app.core.crypto import encryption_service  # NEW: Import encryption
+from app.core.tokens import needs_refresh, token_cache, token_expiry
 
 router = APIRouter()
 
@@ -60,12 +62,10 @@ CALENDAR_SCOPES = [
 @router.get("/status")
 async def get_integration_status(user: CurrentUser = Depends(get_current_user)):
     """Get status of all integrations for the user"""
-    supabase = get_supabase_user(user.token)  # FIXED: Use user-scoped client
-    result = (
-        supabase.table("user_integrations").select("*").execute()
-    )  # RLS filters by user_id automatically
+    db = await get_async_supabase_user(user.token)
+    rows = await store.list_integrations(db)  # RLS filters by user_id automatically
 
-    integrations = {item["integration_type"]: item for item in (result.data or [])}
+    integrations = {item["integration_type"]: item for item in rows}
 
     return {
         "integrations": [
@@ -110,15 +110,16 @@ async def quickbooks_connect(user: CurrentUser = Depends(get_current_user)):
     """Initiate QuickBooks OAuth flow"""
     state = secrets.token_urlsafe(32)
 
-    supabase = get_supabase_user(user.token)  # FIXED: Use user-scoped client
-    supabase.table("oauth_states").insert(
+    db = await get_async_supabase_user(user.token)
+    await store.create_oauth_state(
+        db,
         {
             "state": state,
             "user_id": user.id,
             "integration_type": "quickbooks",
-            "created_at": datetime.utcnow().isoformat(),
-        }
-    ).execute()
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+    )
 
     scopes = "com.intuit.quickbooks.accounting"
     auth_url = (
@@ -136,56 +137,46 @@ async def quickbooks_connect(user: CurrentUser = Depends(get_current_user)):
 @router.get("/quickbooks/callback")
 async def quickbooks_callback(code: str, state: str, realmId: str):
     """Handle QuickBooks OAuth callback"""
-    supabase = get_supabase()  # Admin needed for callback (no user session yet)
+    db = await get_async_supabase_admin()  # Admin needed for callback (no user session yet)
 
-    state_record = supabase.table("oauth_states").select("*").eq("state", state).single().execute()
+    state_record = await store.pop_oauth_state(db, state)
 
-    if not state_record.data:
+    if not state_record:
         raise HTTPException(status_code=400, detail="Invalid state parameter")
 
-    user_id = state_record.data["user_id"]
-
-    supabase.table("oauth_states").delete().eq("state", state).execute()
-
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(
-            QUICKBOOKS_TOKEN_URL,
-            data={
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": settings.QUICKBOOKS_REDIRECT_URI,
-            },
-            auth=(settings.QUICKBOOKS_CLIENT_ID, settings.QUICKBOOKS_CLIENT_SECRET),
-            headers={"Accept": "application/json"},
-        )
+    user_id = state_record["user_id"]
+
+    client = get_http_client(QUICKBOOKS_TOKEN_URL)
+    token_response = await client.post(
+        QUICKBOOKS_TOKEN_URL,
+        data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": settings.QUICKBOOKS_REDIRECT_URI,
+        },
+        auth=(settings.QUICKBOOKS_CLIENT_ID, settings.QUICKBOOKS_CLIENT_SECRET),
+        headers={"Accept": "application/json"},
+    )
 
     if token_response.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to exchange code for tokens")
 
     tokens = token_response.json()
 
-    async with httpx.AsyncClient() as client:
-        company_response = await client.get(
-            f"{QUICKBOOKS_API_BASE}/v3/company/{realmId}/companyinfo/{realmId}",
-            headers={
-                "Authorization": f"Bearer {tokens['access_token']}",
-                "Accept": "application/json",
-            },
-        )
+    client = get_http_client(QUICKBOOKS_API_BASE)
+    company_response = await client.get(
+        f"{QUICKBOOKS_API_BASE}/v3/company/{realmId}/companyinfo/{realmId}",
+        headers={
+            "Authorization": f"Bearer {tokens['access_token']}",
+            "Accept": "application/json",
+        },
+    )
 
     company_name = None
     if company_response.status_code == 200:
         company_data = company_response.json()
         company_name = company_data.get("CompanyInfo", {}).get("CompanyName")
 
-    existing = (
-        supabase.table("user_integrations")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("integration_type", "quickbooks")
-        .execute()
-    )
-
     # FIXED: Encrypt tokens before storage
     integration_data = {
         "user_id": user_id,
@@ -193,18 +184,14 @@ async def quickbooks_callback(code: str, state: str, realmId: str):
         "status": "active",
         "access_token": encryption_service.encrypt(tokens["access_token"]),
         "refresh_token": encryption_service.encrypt(tokens["refresh_token"]),
-        "token_expires_at": datetime.utcnow().timestamp() + tokens.get("expires_in", 3600),
+        "token_expires_at": token_expiry(tokens.get("expires_in", 3600)),
         "realm_id": realmId,
         "account_name": company_name,
-        "connected_at": datetime.utcnow().isoformat(),
+        "connected_at": datetime.now(timezone.utc).isoformat(),
     }
 
-    if existing.data:
-        supabase.table("user_integrations").update(integration_data).eq("user_id", user_id).eq(
-            "integration_type", "quickbooks"
-        ).execute()
-    else:
-        supabase.table("user_integrations").insert(integration_data).execute()
+    await store.save_integration(db, integration_data)
+    token_cache.invalidate(user_id, integration_data["integration_type"])
 
     return RedirectResponse(
         url=f"{settings.FRONTEND_URL}/dashboard/integrations?connected=quickbooks"
@@ -214,72 +201,78 @@ async def quickbooks_callback(code: str, state: str, realmId: str):
 @router.delete("/quickbooks/disconnect")
 async def quickbooks_disconnect(user: CurrentUser = Depends(get_current_user)):
     """Disconnect QuickBooks integration"""
-    supabase = get_supabase_user(user.token)  # FIXED: Use user-scoped client
+    db = await get_async_supabase_user(user.token)
 
-    supabase.table("user_integrations").update(
-        {"status": "disconnected", "disconnected_at": datetime.utcnow().isoformat()}
-    ).eq("integration_type", "quickbooks").execute()  # RLS filters by user_id
+    await store.update_integration(
+        db,
+        "quickbooks",
+        {"status": "disconnected", "disconnected_at": datetime.now(timezone.utc).isoformat()},
+    )  # RLS filters by user_id
+
+    token_cache.invalidate(user.id, "quickbooks")
 
     return {"message": "QuickBooks disconnected successfully"}
 
 
 async def get_quickbooks_client(user_id: str):
-    """Get an authenticated QuickBooks client for a user"""
-    supabase = get_supabase()  # Admin needed to read other user's integrations for workers
-    integration = (
-        supabase.table("user_integrations")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("integration_type", "quickbooks")
-        .eq("status", "active")
-        .single()
-        .execute()
-    )
+    """Get an authenticated QuickBooks client for a user (cached per process)"""
+    return await token_cache.get(user_id, "quickbooks", lambda: _load_quickbooks_client(user_id))
+
 
-    if not integration.data:
+async def _load_quickbooks_client(user_id: str):
+    # Admin needed to read other user's integrations for workers
+    db = await get_async_supabase_admin()
+    integration = await store.get_active_integration(db, user_id, "quickbooks")
+
+    if not integration:
         raise HTTPException(status_code=400, detail="QuickBooks not connected")
 
     # FIXED: Decrypt tokens when reading
-    access_token = encryption_service.decrypt(integration.data["access_token"])
-    refresh_token = encryption_service.decrypt(integration.data["refresh_token"])
-
-    if datetime.utcnow().timestamp() > integration.data["token_expires_at"]:
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                QUICKBOOKS_TOKEN_URL,
-                data={"grant_type": "refresh_token", "refresh_token": refresh_token},
-                auth=(settings.QUICKBOOKS_CLIENT_ID, settings.QUICKBOOKS_CLIENT_SECRET),
-                headers={"Accept": "application/json"},
-            )
+    access_token, refresh_token = encryption_service.decrypt_many(
+        [integration["access_token"], integration["refresh_token"]]
+    )
+    expires_at = integration["token_expires_at"]
+
+    if needs_refresh(expires_at):
+        client = get_http_client(QUICKBOOKS_TOKEN_URL)
+        token_response = await client.post(
+            QUICKBOOKS_TOKEN_URL,
+            data={"grant_type": "refresh_token", "refresh_token": refresh_token},
+            auth=(settings.QUICKBOOKS_CLIENT_ID, settings.QUICKBOOKS_CLIENT_SECRET),
+            headers={"Accept": "application/json"},
+        )
 
         if token_response.status_code != 200:
-            supabase.table("user_integrations").update({"status": "expired"}).eq(
-                "user_id", user_id
-            ).eq("integration_type", "quickbooks").execute()
+            await store.update_integration(db, "quickbooks", {"status": "expired"}, user_id=user_id)
             raise HTTPException(
                 status_code=401, detail="QuickBooks token expired, please reconnect"
             )
 
         tokens = token_response.json()
+        expires_at = token_expiry(tokens.get("expires_in", 3600))
 
         # FIXED: Encrypt new tokens before storage
-        supabase.table("user_integrations").update(
+        await store.update_integration(
+            db,
+            "quickbooks",
             {
                 "access_token": encryption_service.encrypt(tokens["access_token"]),
                 "refresh_token": encryption_service.encrypt(
                     tokens.get("refresh_token", refresh_token)
                 ),
-                "token_expires_at": datetime.utcnow().timestamp() + tokens.get("expires_in", 3600),
-            }
-        ).eq("user_id", user_id).eq("integration_type", "quickbooks").execute()
+                "token_expires_at": expires_at,
+            },
+            user_id=user_id,
+        )
 
         access_token = tokens["access_token"]
 
-    return {
+    client_info = {
         "access_token": access_token,
-        "realm_id": integration.data["realm_id"],
+        "realm_id": integration["realm_id"],
         "base_url": QUICKBOOKS_API_BASE,
     }
+    return client_info, expires_at
 
 
 # =============================================================================
@@ -292,15 +285,16 @@ async def gmail_connect(user: CurrentUser = Depends(get_current_user)):
     """Initiate Gmail OAuth flow"""
     state = secrets.token_urlsafe(32)
 
-    supabase = get_supabase_user(user.token)  # FIXED: Use user-scoped client
-    supabase.table("oauth_states").insert(
+    db = await get_async_supabase_user(user.token)
+    await store.create_oauth_state(
+        db,
         {
             "state": state,
             "user_id": user.id,
             "integration_type": "gmail",
-            "created_at": datetime.utcnow().isoformat(),
-        }
-    ).execute()
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+    )
 
     params = {
         "client_id": settings.GOOGLE_CLIENT_ID,
@@ -320,53 +314,43 @@ async def gmail_connect(user: CurrentUser = Depends(get_current_user)):
 @router.get("/gmail/callback")
 async def gmail_callback(code: str, state: str):
     """Handle Gmail OAuth callback"""
-    supabase = get_supabase()  # Admin needed for callback
+    db = await get_async_supabase_admin()  # Admin needed for callback
 
-    state_record = supabase.table("oauth_states").select("*").eq("state", state).single().execute()
+    state_record = await store.pop_oauth_state(db, state)
 
-    if not state_record.data:
+    if not state_record:
         raise HTTPException(status_code=400, detail="Invalid state parameter")
 
-    user_id = state_record.data["user_id"]
-
-    supabase.table("oauth_states").delete().eq("state", state).execute()
-
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(
-            GOOGLE_TOKEN_URL,
-            data={
-                "client_id": settings.GOOGLE_CLIENT_ID,
-                "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                "code": code,
-                "grant_type": "authorization_code",
-                "redirect_uri": settings.GOOGLE_REDIRECT_URI,
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-        )
+    user_id = state_record["user_id"]
+
+    client = get_http_client(GOOGLE_TOKEN_URL)
+    token_response = await client.post(
+        GOOGLE_TOKEN_URL,
+        data={
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
 
     if token_response.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to exchange code for tokens")
 
     tokens = token_response.json()
 
-    async with httpx.AsyncClient() as client:
-        userinfo_response = await client.get(
-            GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
+    client = get_http_client(GOOGLE_USERINFO_URL)
+    userinfo_response = await client.get(
+        GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {tokens['access_token']}"}
+    )
 
     account_email = None
     if userinfo_response.status_code == 200:
         userinfo = userinfo_response.json()
         account_email = userinfo.get("email")
 
-    existing = (
-        supabase.table("user_integrations")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("integration_type", "gmail")
-        .execute()
-    )
-
     # FIXED: Encrypt tokens before storage
     integration_data = {
         "user_id": user_id,
@@ -374,17 +358,13 @@ async def gmail_callback(code: str, state: str):
         "status": "active",
         "access_token": encryption_service.encrypt(tokens["access_token"]),
         "refresh_token": encryption_service.encrypt(tokens.get("refresh_token")),
-        "token_expires_at": datetime.utcnow().timestamp() + tokens.get("expires_in", 3600),
+        "token_expires_at": token_expiry(tokens.get("expires_in", 3600)),
         "account_name": account_email,
-        "connected_at": datetime.utcnow().isoformat(),
+        "connected_at": datetime.now(timezone.utc).isoformat(),
     }
 
-    if existing.data:
-        supabase.table("user_integrations").update(integration_data).eq("user_id", user_id).eq(
-            "integration_type", "gmail"
-        ).execute()
-    else:
-        supabase.table("user_integrations").insert(integration_data).execute()
+    await store.save_integration(db, integration_data)
+    token_cache.invalidate(user_id, integration_data["integration_type"])
 
     return RedirectResponse(url=f"{settings.FRONTEND_URL}/dashboard/integrations?connected=gmail")
 
@@ -392,73 +372,75 @@ async def gmail_callback(code: str, state: str):
 @router.delete("/gmail/disconnect")
 async def gmail_disconnect(user: CurrentUser = Depends(get_current_user)):
     """Disconnect Gmail integration"""
-    supabase = get_supabase_user(user.token)  # FIXED: Use user-scoped client
+    db = await get_async_supabase_user(user.token)
 
-    supabase.table("user_integrations").update(
-        {"status": "disconnected", "disconnected_at": datetime.utcnow().isoformat()}
-    ).eq("integration_type", "gmail").execute()
+    await store.update_integration(
+        db,
+        "gmail",
+        {"status": "disconnected", "disconnected_at": datetime.now(timezone.utc).isoformat()},
+    )
+
+    token_cache.invalidate(user.id, "gmail")
 
     return {"message": "Gmail disconnected successfully"}
 
 
 async def get_gmail_client(user_id: str):
-    """Get an authenticated Gmail client for a user"""
-    supabase = get_supabase()  # Admin needed for workers
-    integration = (
-        supabase.table("user_integrations")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("integration_type", "gmail")
-        .eq("status", "active")
-        .single()
-        .execute()
-    )
+    """Get an authenticated Gmail client for a user (cached per process)"""
+    return await token_cache.get(user_id, "gmail", lambda: _load_gmail_client(user_id))
 
-    if not integration.data:
+
+async def _load_gmail_client(user_id: str):
+    db = await get_async_supabase_admin()  # Admin needed for workers
+    integration = await store.get_active_integration(db, user_id, "gmail")
+
+    if not integration:
         raise HTTPException(status_code=400, detail="Gmail not connected")
 
     # FIXED: Decrypt tokens when reading
-    access_token = encryption_service.decrypt(integration.data["access_token"])
-    refresh_token = encryption_service.decrypt(integration.data.get("refresh_token"))
+    access_token, refresh_token = encryption_service.decrypt_many(
+        [integration["access_token"], integration.get("refresh_token")]
+    )
+    expires_at = integration["token_expires_at"]
 
-    if datetime.utcnow().timestamp() > integration.data["token_expires_at"]:
+    if needs_refresh(expires_at):
         if not refresh_token:
-            supabase.table("user_integrations").update({"status": "expired"}).eq(
-                "user_id", user_id
-            ).eq("integration_type", "gmail").execute()
+            await store.update_integration(db, "gmail", {"status": "expired"}, user_id=user_id)
             raise HTTPException(status_code=401, detail="Gmail token expired, please reconnect")
 
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                GOOGLE_TOKEN_URL,
-                data={
-                    "client_id": settings.GOOGLE_CLIENT_ID,
-                    "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                    "refresh_token": refresh_token,
-                    "grant_type": "refresh_token",
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
+        client = get_http_client(GOOGLE_TOKEN_URL)
+        token_response = await client.post(
+            GOOGLE_TOKEN_URL,
+            data={
+                "client_id": settings.GOOGLE_CLIENT_ID,
+                "client_secret": settings.GOOGLE_CLIENT_SECRET,
+                "refresh_token": refresh_token,
+                "grant_type": "refresh_token",
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
 
         if token_response.status_code != 200:
-            supabase.table("user_integrations").update({"status": "expired"}).eq(
-                "user_id", user_id
-            ).eq("integration_type", "gmail").execute()
+            await store.update_integration(db, "gmail", {"status": "expired"}, user_id=user_id)
             raise HTTPException(status_code=401, detail="Gmail token expired, please reconnect")
 
         tokens = token_response.json()
+        expires_at = token_expiry(tokens.get("expires_in", 3600))
 
         # FIXED: Encrypt new token before storage
-        supabase.table("user_integrations").update(
+        await store.update_integration(
+            db,
+            "gmail",
             {
                 "access_token": encryption_service.encrypt(tokens["access_token"]),
-                "token_expires_at": datetime.utcnow().timestamp() + tokens.get("expires_in", 3600),
-            }
-        ).eq("user_id", user_id).eq("integration_type", "gmail").execute()
+                "token_expires_at": expires_at,
+            },
+            user_id=user_id,
+        )
 
         access_token = tokens["access_token"]
 
-    return {"access_token": access_token}
+    return {"access_token": access_token}, expires_at
 
 
 # =============================================================================
@@ -471,15 +453,16 @@ async def google_calendar_connect(user: CurrentUser = Depends(get_current_user))
     """Initiate Google Calendar OAuth flow"""
     state = secrets.token_urlsafe(32)
 
-    supabase = get_supabase_user(user.token)  # FIXED: Use user-scoped client
-    supabase.table("oauth_states").insert(
+    db = await get_async_supabase_user(user.token)
+    await store.create_oauth_state(
+        db,
         {
             "state": state,
             "user_id": user.id,
             "integration_type": "google_calendar",
-            "created_at": datetime.utcnow().isoformat(),
-        }
-    ).execute()
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+    )
 
     params = {
         "client_id": settings.GOOGLE_CLIENT_ID,
@@ -499,53 +482,43 @@ async def google_calendar_connect(user: CurrentUser = Depends(get_current_user))
 @router.get("/google_calendar/callback")
 async def google_calendar_callback(code: str, state: str):
     """Handle Google Calendar OAuth callback"""
-    supabase = get_supabase()  # Admin needed for callback
+    db = await get_async_supabase_admin()  # Admin needed for callback
 
-    state_record = supabase.table("oauth_states").select("*").eq("state", state).single().execute()
+    state_record = await store.pop_oauth_state(db, state)
 
-    if not state_record.data:
+    if not state_record:
         raise HTTPException(status_code=400, detail="Invalid state parameter")
 
-    user_id = state_record.data["user_id"]
-
-    supabase.table("oauth_states").delete().eq("state", state).execute()
-
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(
-            GOOGLE_TOKEN_URL,
-            data={
-                "client_id": settings.GOOGLE_CLIENT_ID,
-                "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                "code": code,
-                "grant_type": "authorization_code",
-                "redirect_uri": settings.GOOGLE_CALENDAR_REDIRECT_URI,
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-        )
+    user_id = state_record["user_id"]
+
+    client = get_http_client(GOOGLE_TOKEN_URL)
+    token_response = await client.post(
+        GOOGLE_TOKEN_URL,
+        data={
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": settings.GOOGLE_CALENDAR_REDIRECT_URI,
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
 
     if token_response.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to exchange code for tokens")
 
     tokens = token_response.json()
 
-    async with httpx.AsyncClient() as client:
-        userinfo_response = await client.get(
-            GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
+    client = get_http_client(GOOGLE_USERINFO_URL)
+    userinfo_response = await client.get(
+        GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {tokens['access_token']}"}
+    )
 
     account_email = None
     if userinfo_response.status_code == 200:
         userinfo = userinfo_response.json()
         account_email = userinfo.get("email")
 
-    existing = (
-        supabase.table("user_integrations")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("integration_type", "google_calendar")
-        .execute()
-    )
-
     # FIXED: Encrypt tokens before storage
     integration_data = {
         "user_id": user_id,
@@ -553,17 +526,13 @@ async def google_calendar_callback(code: str, state: str):
         "status": "active",
         "access_token": encryption_service.encrypt(tokens["access_token"]),
         "refresh_token": encryption_service.encrypt(tokens.get("refresh_token")),
-        "token_expires_at": datetime.utcnow().timestamp() + tokens.get("expires_in", 3600),
+        "token_expires_at": token_expiry(tokens.get("expires_in", 3600)),
         "account_name": account_email,
-        "connected_at": datetime.utcnow().isoformat(),
+        "connected_at": datetime.now(timezone.utc).isoformat(),
     }
 
-    if existing.data:
-        supabase.table("user_integrations").update(integration_data).eq("user_id", user_id).eq(
-            "integration_type", "google_calendar"
-        ).execute()
-    else:
-        supabase.table("user_integrations").insert(integration_data).execute()
+    await store.save_integration(db, integration_data)
+    token_cache.invalidate(user_id, integration_data["integration_type"])
 
     return RedirectResponse(
         url=f"{settings.FRONTEND_URL}/dashboard/integrations?connected=google_calendar"
@@ -573,77 +542,85 @@ async def google_calendar_callback(code: str, state: str):
 @router.delete("/google_calendar/disconnect")
 async def google_calendar_disconnect(user: CurrentUser = Depends(get_current_user)):
     """Disconnect Google Calendar integration"""
-    supabase = get_supabase_user(user.token)  # FIXED: Use user-scoped client
+    db = await get_async_supabase_user(user.token)
+
+    await store.update_integration(
+        db,
+        "google_calendar",
+        {"status": "disconnected", "disconnected_at": datetime.now(timezone.utc).isoformat()},
+    )
 
-    supabase.table("user_integrations").update(
-        {"status": "disconnected", "disconnected_at": datetime.utcnow().isoformat()}
-    ).eq("integration_type", "google_calendar").execute()
+    token_cache.invalidate(user.id, "google_calendar")
 
     return {"message": "Google Calendar disconnected successfully"}
 
 
 async def get_google_calendar_client(user_id: str):
-    """Get an authenticated Google Calendar client for a user"""
-    supabase = get_supabase()  # Admin needed for workers
-    integration = (
-        supabase.table("user_integrations")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("integration_type", "google_calendar")
-        .eq("status", "active")
-        .single()
-        .execute()
+    """Get an authenticated Google Calendar client for a user (cached per process)"""
+    return await token_cache.get(
+        user_id, "google_calendar", lambda: _load_google_calendar_client(user_id)
     )
 
-    if not integration.data:
+
+async def _load_google_calendar_client(user_id: str):
+    db = await get_async_supabase_admin()  # Admin needed for workers
+    integration = await store.get_active_integration(db, user_id, "google_calendar")
+
+    if not integration:
         raise HTTPException(status_code=400, detail="Google Calendar not connected")
 
     # FIXED: Decrypt tokens when reading
-    access_token = encryption_service.decrypt(integration.data["access_token"])
-    refresh_token = encryption_service.decrypt(integration.data.get("refresh_token"))
+    access_token, refresh_token = encryption_service.decrypt_many(
+        [integration["access_token"], integration.get("refresh_token")]
+    )
+    expires_at = integration["token_expires_at"]
 
-    if datetime.utcnow().timestamp() > integration.data["token_expires_at"]:
+    if needs_refresh(expires_at):
         if not refresh_token:
-            supabase.table("user_integrations").update({"status": "expired"}).eq(
-                "user_id", user_id
-            ).eq("integration_type", "google_calendar").execute()
+            await store.update_integration(
+                db, "google_calendar", {"status": "expired"}, user_id=user_id
+            )
             raise HTTPException(
                 status_code=401, detail="Google Calendar token expired, please reconnect"
             )
 
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                GOOGLE_TOKEN_URL,
-                data={
-                    "client_id": settings.GOOGLE_CLIENT_ID,
-                    "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                    "refresh_token": refresh_token,
-                    "grant_type": "refresh_token",
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
+        client = get_http_client(GOOGLE_TOKEN_URL)
+        token_response = await client.post(
+            GOOGLE_TOKEN_URL,
+            data={
+                "client_id": settings.GOOGLE_CLIENT_ID,
+                "client_secret": settings.GOOGLE_CLIENT_SECRET,
+                "refresh_token": refresh_token,
+                "grant_type": "refresh_token",
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
 
         if token_response.status_code != 200:
-            supabase.table("user_integrations").update({"status": "expired"}).eq(
-                "user_id", user_id
-            ).eq("integration_type", "google_calendar").execute()
+            await store.update_integration(
+                db, "google_calendar", {"status": "expired"}, user_id=user_id
+            )
             raise HTTPException(
                 status_code=401, detail="Google Calendar token expired, please reconnect"
             )
 
         tokens = token_response.json()
+        expires_at = token_expiry(tokens.get("expires_in", 3600))
 
         # FIXED: Encrypt new token before storage
-        supabase.table("user_integrations").update(
+        await store.update_integration(
+            db,
+            "google_calendar",
             {
                 "access_token": encryption_service.encrypt(tokens["access_token"]),
-                "token_expires_at": datetime.utcnow().timestamp() + tokens.get("expires_in", 3600),
-            }
-        ).eq("user_id", user_id).eq("integration_type", "google_calendar").execute()
+                "token_expires_at": expires_at,
+            },
+            user_id=user_id,
+        )
 
         access_token = tokens["access_token"]
 
-    return {"access_token": access_token}
+    return {"access_token": access_token}, expires_at
 
 
 # =============================================================================
@@ -653,23 +630,15 @@ async def get_google_calendar_client(user_id: str):
 
 async def get_zendesk_client(user_id: str) -> Dict[str, str]:
     """Get authenticated Zendesk client info for a user"""
-    supabase = get_supabase()
-    integration = (
-        supabase.table("user_integrations")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("integration_type", "zendesk")
-        .eq("status", "active")
-        .single()
-        .execute()
-    )
+    db = await get_async_supabase_admin()
+    integration = await store.get_active_integration(db, user_id, "zendesk")
 
-    if not integration.data:
+    if not integration:
         return {"access_token": "mock_zendesk_token", "subdomain": "mock-company"}
 
     return {
-        "access_token": encryption_service.decrypt(integration.data.get("access_token", "")),
-        "subdomain": integration.data.get("subdomain", ""),
+        "access_token": encryption_service.decrypt(integration.get("access_token", "")),
+        "subdomain": integration.get("subdomain", ""),
     }
 
 
@@ -680,21 +649,13 @@ async def get_zendesk_client(user_id: str) -> Dict[str, str]:
 
 async def get_meta_client(user_id: str) -> Dict[str, str]:
     """Get authenticated Meta (Facebook/Instagram) client info for a user"""
-    supabase = get_supabase()
-    integration = (
-        supabase.table("user_integrations")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("integration_type", "meta")
-        .eq("status", "active")
-        .single()
-        .execute()
-    )
+    db = await get_async_supabase_admin()
+    integration = await store.get_active_integration(db, user_id, "meta")
 
-    if not integration.data:
+    if not integration:
         return {"access_token": "mock_meta_token", "page_id": "mock_page_123"}
 
     return {
-        "access_token": encryption_service.decrypt(integration.data.get("access_token", "")),
-        "page_id": integration.data.get("page_id", ""),
+        "access_token": encryption_service.decrypt(integration.get("access_token", "")),
+        "page_id": integration.get("page_id", ""),
     }
@@ -5,7 +5,8 @@ import hmac
 import hashlib
 import base64
 from app.core.config import settings
-from app.core.database import get_supabase
+from app.core import store
+from app.core.database import get_async_supabase_admin
 
 router = APIRouter()
 
@@ -47,71 +48,42 @@ async def stripe_webhook(request: Request, stripe_signature: Optional[str] = Hea
     except stripe.error.SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid signature")
 
-    supabase = get_supabase()
+    db = await get_async_supabase_admin()
 
     if event["type"] == "checkout.session.completed":
         session = event["data"]["object"]
         user_id = session.get("client_reference_id")
 
         if user_id:
-            supabase.table("users").update(
-                {"stripe_customer_id": session.get("customer"), "subscription_status": "active"}
-            ).eq("id", user_id).execute()
+            await store.update_user(
+                db,
+                user_id,
+                {"stripe_customer_id": session.get("customer"), "subscription_status": "active"},
+            )
 
     elif event["type"] == "customer.subscription.updated":
         subscription = event["data"]["object"]
-        customer_id = subscription.get("customer")
-
-        user = (
-            supabase.table("users")
-            .select("id")
-            .eq("stripe_customer_id", customer_id)
-            .single()
-            .execute()
-        )
+        user = await store.get_user_by_stripe_customer(db, subscription.get("customer"))
 
-        if user.data:
-            supabase.table("users").update({"subscription_status": subscription.get("status")}).eq(
-                "id", user.data["id"]
-            ).execute()
+        if user:
+            await store.update_user(
+                db, user["id"], {"subscription_status": subscription.get("status")}
+            )
 
     elif event["type"] == "customer.subscription.deleted":
         subscription = event["data"]["object"]
-        customer_id = subscription.get("customer")
-
-        user = (
-            supabase.table("users")
-            .select("id")
-            .eq("stripe_customer_id", customer_id)
-            .single()
-            .execute()
-        )
-
-        if user.data:
-            supabase.table("users").update({"subscription_status": "cancelled"}).eq(
-                "id", user.data["id"]
-            ).execute()
+        user = await store.get_user_by_stripe_customer(db, subscription.get("customer"))
 
-            supabase.table("agent_subscriptions").update({"status": "cancelled"}).eq(
-                "user_id", user.data["id"]
-            ).eq("status", "active").execute()
+        if user:
+            await store.update_user(db, user["id"], {"subscription_status": "cancelled"})
+            await store.cancel_subscriptions(db, user["id"])
 
     elif event["type"] == "invoice.payment_failed":
         invoice = event["data"]["object"]
-        customer_id = invoice.get("customer")
-
-        user = (
-            supabase.table("users")
-            .select("id, email")
-            .eq("stripe_customer_id", customer_id)
-            .single()
-            .execute()
-        )
+        user = await store.get_user_by_stripe_customer(db, invoice.get("customer"))
 
-        if user.data:
-            supabase.table("users").update({"subscription_status": "past_due"}).eq(
-                "id", user.data["id"]
-            ).execute()
+        if user:
+            await store.update_user(db, user["id"], {"subscription_status": "past_due"})
 
     return {"status": "success"}
 
@@ -147,36 +119,31 @@ async def quickbooks_webhook(
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
 
     event_notifications = data.get("eventNotifications", [])
+    db = await get_async_supabase_admin()
 
     for notification in event_notifications:
         realm_id = notification.get("realmId")
         data_change_event = notification.get("dataChangeEvent", {})
         entities = data_change_event.get("entities", [])
 
-        supabase = get_supabase()
-
-        integration = (
-            supabase.table("user_integrations")
-            .select("user_id")
-            .eq("realm_id", realm_id)
-            .eq("integration_type", "quickbooks")
-            .eq("status", "active")
-            .single()
-            .execute()
-        )
+        integration = await store.get_active_integration_by_realm(db, realm_id)
 
-        if integration.data:
-            for entity in entities:
-                supabase.table("webhook_events").insert(
+        if integration:
+            await store.insert_webhook_events(
+                db,
+                [
                     {
-                        "user_id": integration.data["user_id"],
+                        "user_id": integration["user_id"],
                         "integration_type": "quickbooks",
+                        "realm_id": realm_id,
                         "event_type": entity.get("operation"),
                         "entity_type": entity.get("name"),
                         "entity_id": entity.get("id"),
                         "payload": entity,
                         "processed": False,
                     }
-                ).execute()
+                    for entity in entities
+                ],
+            )
 
     return {"status": "success"}
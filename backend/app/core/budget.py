@@ -4,6 +4,11 @@ Agents accumulate tokens across multiple model calls during a single
 task. Without a ceiling, a poorly-prompted agent can run away with
 spend. `TokenBudget` is checked after every model call and raises
 `BudgetExceeded` when the cap is hit.
+
+Prompt-cache reads and writes are reported separately by the API (they
+are not part of `input_tokens`) but still count toward the cap: with
+caching on, the system prompt and tool definitions arrive as cache
+tokens, and cache writes cost more than plain input.
 """
 
 from __future__ import annotations
@@ -20,16 +25,31 @@ class TokenBudget:
     max_tokens: int
     input_tokens: int = 0
     output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
     iterations: int = field(default=0, init=False)
 
     @property
     def total_tokens(self) -> int:
-        return self.input_tokens + self.output_tokens
-
-    def record(self, input_tokens: int | None, output_tokens: int | None) -> None:
+        return (
+            self.input_tokens
+            + self.output_tokens
+            + self.cache_read_tokens
+            + self.cache_write_tokens
+        )
+
+    def record(
+        self,
+        input_tokens: int | None,
+        output_tokens: int | None,
+        cache_read_tokens: int | None = None,
+        cache_write_tokens: int | None = None,
+    ) -> None:
         self.iterations += 1
         self.input_tokens += int(input_tokens or 0)
         self.output_tokens += int(output_tokens or 0)
+        self.cache_read_tokens += int(cache_read_tokens or 0)
+        self.cache_write_tokens += int(cache_write_tokens or 0)
         if self.max_tokens > 0 and self.total_tokens > self.max_tokens:
             raise BudgetExceeded(
                 f"Task exceeded token budget: {self.total_tokens} > {self.max_tokens}"
@@ -23,6 +23,13 @@ class Settings(BaseSettings):
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "").rstrip("/")
     SUPABASE_ANON_KEY: str = os.getenv("SUPABASE_ANON_KEY", "")
     SUPABASE_SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+    # Connections in the HTTP pool shared by every cached Supabase client.
+    SUPABASE_MAX_CONNECTIONS: int = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+    # User-scoped clients are cached per JWT (LRU) for at most this long.
+    SUPABASE_USER_CLIENT_CACHE_SIZE: int = int(os.getenv("SUPABASE_USER_CLIENT_CACHE_SIZE", "256"))
+    SUPABASE_USER_CLIENT_TTL_SECONDS: float = float(
+        os.getenv("SUPABASE_USER_CLIENT_TTL_SECONDS", "300")
+    )
 
     # Supabase JWT Verification
     SUPABASE_JWKS_URL: str = os.getenv("SUPABASE_JWKS_URL", "")
@@ -31,6 +38,10 @@ class Settings(BaseSettings):
 
     # Encryption (OAuth token protection)
     INTEGRATION_ENCRYPTION_KEY: str = os.getenv("INTEGRATION_ENCRYPTION_KEY", "")
+    # Opt-in: keep up to this many decrypted tokens in memory (0 = off),
+    # each for ENCRYPTION_CACHE_TTL_SECONDS, keyed by ciphertext digest.
+    ENCRYPTION_CACHE_SIZE: int = int(os.getenv("ENCRYPTION_CACHE_SIZE", "0"))
+    ENCRYPTION_CACHE_TTL_SECONDS: float = float(os.getenv("ENCRYPTION_CACHE_TTL_SECONDS", "60"))
 
     # AI Providers
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
@@ -42,6 +53,42 @@ class Settings(BaseSettings):
     AGENT_MAX_OUTPUT_TOKENS: int = int(os.getenv("AGENT_MAX_OUTPUT_TOKENS", "4096"))
     # Hard ceiling on cumulative input+output tokens per single task. 0 disables.
     AGENT_MAX_TOKENS_PER_TASK: int = int(os.getenv("AGENT_MAX_TOKENS_PER_TASK", "200000"))
+    # Mark the system prompt and tool schemas with Anthropic prompt-caching
+    # breakpoints so repeat iterations read them from cache.
+    AGENT_PROMPT_CACHING: bool = os.getenv("AGENT_PROMPT_CACHING", "true").lower() == "true"
+    # Stream model responses: emit partial text / tool-start events as they
+    # arrive and start each tool as soon as its input is complete.
+    AGENT_STREAMING: bool = os.getenv("AGENT_STREAMING", "false").lower() == "true"
+    # Max tool calls from one model turn run concurrently. Agents may
+    # override via `max_tool_concurrency` in AGENT_REGISTRY.
+    AGENT_MAX_TOOL_CONCURRENCY: int = int(os.getenv("AGENT_MAX_TOOL_CONCURRENCY", "4"))
+
+    # Task worker
+    # Max queue records one worker process executes concurrently.
+    WORKER_CONCURRENCY: int = int(os.getenv("WORKER_CONCURRENCY", "1"))
+    # Direct Postgres URL (session mode). When set, the worker LISTENs for
+    # queue NOTIFYs and only polls every WORKER_SAFETY_POLL_SECONDS.
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    WORKER_SAFETY_POLL_SECONDS: float = float(os.getenv("WORKER_SAFETY_POLL_SECONDS", "30"))
+
+    # Outbound HTTP (tool + OAuth calls). One pooled client per upstream host.
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+
+    # Integration OAuth tokens (app.core.tokens). Cached client info is
+    # reloaded after the TTL, and refreshed this long before the token expires.
+    OAUTH_TOKEN_CACHE_TTL_SECONDS: float = float(os.getenv("OAUTH_TOKEN_CACHE_TTL_SECONDS", "300"))
+    OAUTH_TOKEN_REFRESH_MARGIN_SECONDS: float = float(
+        os.getenv("OAUTH_TOKEN_REFRESH_MARGIN_SECONDS", "300")
+    )
+    # The task worker never sees the API's invalidations on disconnect, so it
+    # reuses cached client info for at most this long.
+    OAUTH_TOKEN_WORKER_CACHE_TTL_SECONDS: float = float(
+        os.getenv("OAUTH_TOKEN_WORKER_CACHE_TTL_SECONDS", "60")
+    )
 
     # QuickBooks
     QUICKBOOKS_CLIENT_ID: str = os.getenv("QUICKBOOKS_CLIENT_ID", "")
@@ -49,12 +96,38 @@ class Settings(BaseSettings):
     QUICKBOOKS_REDIRECT_URI: str = os.getenv("QUICKBOOKS_REDIRECT_URI", "")
     QUICKBOOKS_ENVIRONMENT: str = os.getenv("QUICKBOOKS_ENVIRONMENT", "sandbox")
     QUICKBOOKS_WEBHOOK_VERIFIER_TOKEN: str = os.getenv("QUICKBOOKS_WEBHOOK_VERIFIER_TOKEN", "")
+    # Per-realm cache of accounts / vendors / customers shared across tasks.
+    QUICKBOOKS_REFERENCE_CACHE_TTL_SECONDS: float = float(
+        os.getenv("QUICKBOOKS_REFERENCE_CACHE_TTL_SECONDS", "300")
+    )
+    # Transaction queries page with STARTPOSITION/MAXRESULTS (API max 1000),
+    # keeping this many page requests in flight.
+    QUICKBOOKS_PAGE_SIZE: int = int(os.getenv("QUICKBOOKS_PAGE_SIZE", "1000"))
+    QUICKBOOKS_PAGE_PREFETCH: int = int(os.getenv("QUICKBOOKS_PAGE_PREFETCH", "2"))
+    # Local ledger mirror kept current by the worker from QuickBooks CDC
+    # (app/workers/quickbooks_sync.py). Read tools use it once backfilled.
+    QUICKBOOKS_MIRROR_ENABLED: bool = (
+        os.getenv("QUICKBOOKS_MIRROR_ENABLED", "false").lower() == "true"
+    )
+    QUICKBOOKS_SYNC_INTERVAL_SECONDS: float = float(
+        os.getenv("QUICKBOOKS_SYNC_INTERVAL_SECONDS", "30")
+    )
+    # Reads fall back to the API once a realm's mirror is older than this;
+    # the worker re-syncs quiet realms after half of it.
+    QUICKBOOKS_MIRROR_MAX_STALENESS_SECONDS: float = float(
+        os.getenv("QUICKBOOKS_MIRROR_MAX_STALENESS_SECONDS", "900")
+    )
 
     # Google
     GOOGLE_CLIENT_ID: str = os.getenv("GOOGLE_CLIENT_ID", "")
     GOOGLE_CLIENT_SECRET: str = os.getenv("GOOGLE_CLIENT_SECRET", "")
     GOOGLE_REDIRECT_URI: str = os.getenv("GOOGLE_REDIRECT_URI", "")
     GOOGLE_CALENDAR_REDIRECT_URI: str = os.getenv("GOOGLE_CALENDAR_REDIRECT_URI", "")
+    # Serve unchanged Gmail messages from gmail_message_cache, kept current
+    # via users.history.list (see migrations/20261017_gmail_message_cache.sql).
+    GMAIL_CACHE_ENABLED: bool = os.getenv("GMAIL_CACHE_ENABLED", "true").lower() == "true"
+    # How long a user's label name -> id map is reused by apply_label.
+    GMAIL_LABEL_CACHE_TTL_SECONDS: float = float(os.getenv("GMAIL_LABEL_CACHE_TTL_SECONDS", "600"))
 
     # Stripe
     STRIPE_SECRET_KEY: str = os.getenv("STRIPE_SECRET_KEY", "")
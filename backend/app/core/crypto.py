@@ -1,5 +1,9 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from cryptography.fernet import Fernet
-from typing import Optional
+from typing import List, Optional, Tuple
 from app.core.config import settings
 
 
@@ -13,8 +17,11 @@ class EncryptionService:
     _fernet: Optional[Fernet] = None
 
     def __init__(self):
-        # Lazy initialization - don't create Fernet until actually needed
-        pass
+        # Lazy initialization - don't create Fernet until actually needed.
+        # Opt-in plaintext cache (ENCRYPTION_CACHE_SIZE > 0): sha256 of the
+        # ciphertext -> (plaintext, expires_at monotonic seconds), oldest first.
+        self._cache: OrderedDict[bytes, Tuple[str, float]] = OrderedDict()
+        self._cache_lock = threading.Lock()
 
     def _get_fernet(self) -> Fernet:
         """Lazy initialization of Fernet cipher."""
@@ -45,7 +52,32 @@ class EncryptionService:
         """Decrypt a string value. Returns None if input is None."""
         if value is None:
             return None
-        return self._get_fernet().decrypt(value.encode()).decode()
+        if settings.ENCRYPTION_CACHE_SIZE <= 0:
+            return self._get_fernet().decrypt(value.encode()).decode()
+
+        key = hashlib.sha256(value.encode()).digest()
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[1] > now:
+                self._cache.move_to_end(key)
+                return entry[0]
+
+        plaintext = self._get_fernet().decrypt(value.encode()).decode()
+        with self._cache_lock:
+            self._cache[key] = (plaintext, now + settings.ENCRYPTION_CACHE_TTL_SECONDS)
+            self._cache.move_to_end(key)
+            while len(self._cache) > settings.ENCRYPTION_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return plaintext
+
+    def decrypt_many(self, values: List[str | None]) -> List[str | None]:
+        """Decrypt several values in order, sharing one cipher and the cache."""
+        return [self.decrypt(value) for value in values]
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
 
 
 # Singleton instance - safe to import, won't crash until actually used
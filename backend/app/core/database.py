@@ -1,13 +1,176 @@
-from typing import Optional
-from supabase import create_client, Client
+"""Supabase client factories.
+
+Building a `supabase.Client` is not free: each one owns its own HTTP
+session (so a fresh TLS handshake on first use) and a user-scoped client
+additionally round-trips to GoTrue in `set_session`. These accessors are
+called from every tool method, the runtime and the worker, so clients are
+cached per process instead of being rebuilt per call:
+
+- the service-role client is a process-wide singleton;
+- user-scoped clients live in a small LRU keyed by the caller's JWT and
+  expire after SUPABASE_USER_CLIENT_TTL_SECONDS (or when the JWT does);
+- every client's PostgREST session shares one HTTP/2 connection pool.
+
+The `get_async_*` accessors are the same thing for supabase's AsyncClient,
+which `app.core.store` uses so request handlers never block the event
+loop. Call `aclose_supabase_clients()` on shutdown.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+from postgrest.utils import SyncClient
+from supabase import AClientOptions, AsyncClient, Client, ClientOptions
 
 from app.core.config import settings
 
+_lock = threading.Lock()
+_transport: Optional[httpx.HTTPTransport] = None
+_async_transport: Optional[httpx.AsyncHTTPTransport] = None
+_admin_client: Optional[Client] = None
+_async_admin_client: Optional[AsyncClient] = None
+
+
+class _UserClientCache:
+    """LRU of user-scoped clients keyed by JWT, each with its own expiry."""
+
+    def __init__(self):
+        # jwt -> (client, expires_at monotonic seconds); oldest first.
+        self._entries: OrderedDict[str, Tuple[Any, float]] = OrderedDict()
+
+    def get(self, user_jwt: str, now: float) -> Optional[Any]:
+        with _lock:
+            entry = self._entries.get(user_jwt)
+            if entry is None:
+                return None
+            client, expires_at = entry
+            if expires_at <= now:
+                del self._entries[user_jwt]
+                return None
+            self._entries.move_to_end(user_jwt)
+            return client
+
+    def put(self, user_jwt: str, client: Any, now: float, session: Any) -> None:
+        expires_at = now + settings.SUPABASE_USER_CLIENT_TTL_SECONDS
+        if session is not None and session.expires_at:
+            expires_at = min(expires_at, now + (session.expires_at - time.time()))
+        with _lock:
+            self._entries[user_jwt] = (client, expires_at)
+            self._entries.move_to_end(user_jwt)
+            while len(self._entries) > settings.SUPABASE_USER_CLIENT_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with _lock:
+            self._entries.clear()
+
+
+_user_clients = _UserClientCache()
+_async_user_clients = _UserClientCache()
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SUPABASE_MAX_CONNECTIONS,
+    )
+
+
+def _shared_transport() -> httpx.HTTPTransport:
+    global _transport
+    with _lock:
+        if _transport is None:
+            _transport = httpx.HTTPTransport(http2=True, limits=_pool_limits())
+        return _transport
+
+
+def _shared_async_transport() -> httpx.AsyncHTTPTransport:
+    global _async_transport
+    with _lock:
+        if _async_transport is None:
+            _async_transport = httpx.AsyncHTTPTransport(http2=True, limits=_pool_limits())
+        return _async_transport
+
+
+class _PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose session sends over the shared transport.
+
+    TLS verification and proxying are transport settings, so `verify` and
+    `proxy` are fixed by the shared pool rather than per client.
+    """
+
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout,
+        _verify: bool = True,
+        _proxy: Optional[str] = None,
+    ) -> SyncClient:
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            transport=_shared_transport(),
+        )
+
+
+class _PooledAsyncPostgrestClient(AsyncPostgrestClient):
+    """Async counterpart of `_PooledPostgrestClient`."""
+
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout,
+        _verify: bool = True,
+        _proxy: Optional[str] = None,
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            transport=_shared_async_transport(),
+        )
+
+
+class _PooledClient(Client):
+    @staticmethod
+    def _init_postgrest_client(
+        rest_url, headers, schema, timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT, verify=True, proxy=None
+    ):
+        return _PooledPostgrestClient(
+            rest_url, headers=headers, schema=schema, timeout=timeout, verify=verify, proxy=proxy
+        )
+
 
-def _create_client(key: str) -> Client:
+class _PooledAsyncClient(AsyncClient):
+    @staticmethod
+    def _init_postgrest_client(
+        rest_url, headers, schema, timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT, verify=True, proxy=None
+    ):
+        return _PooledAsyncPostgrestClient(
+            rest_url, headers=headers, schema=schema, timeout=timeout, verify=verify, proxy=proxy
+        )
+
+
+def _create_client(key: str, options: Optional[ClientOptions] = None) -> Client:
+    if not settings.SUPABASE_URL:
+        raise RuntimeError("SUPABASE_URL is not configured")
+    return _PooledClient.create(settings.SUPABASE_URL, key, options)
+
+
+async def _create_async_client(key: str, options: Optional[AClientOptions] = None) -> AsyncClient:
     if not settings.SUPABASE_URL:
         raise RuntimeError("SUPABASE_URL is not configured")
-    return create_client(settings.SUPABASE_URL, key)
+    return await _PooledAsyncClient.create(settings.SUPABASE_URL, key, options)
 
 
 def get_supabase_admin() -> Client:
@@ -16,10 +179,18 @@ def get_supabase_admin() -> Client:
     Bypasses RLS.
     Use ONLY in trusted server-side contexts (workers, webhooks).
     """
+    global _admin_client
+    if _admin_client is not None:
+        return _admin_client
+
     if not settings.SUPABASE_SERVICE_ROLE_KEY:
         raise RuntimeError("SUPABASE_SERVICE_ROLE_KEY is not configured")
 
-    return _create_client(settings.SUPABASE_SERVICE_ROLE_KEY)
+    client = _create_client(settings.SUPABASE_SERVICE_ROLE_KEY)
+    with _lock:
+        if _admin_client is None:
+            _admin_client = client
+        return _admin_client
 
 
 def get_supabase_user(user_jwt: str) -> Client:
@@ -30,8 +201,16 @@ def get_supabase_user(user_jwt: str) -> Client:
     if not settings.SUPABASE_ANON_KEY:
         raise RuntimeError("SUPABASE_ANON_KEY is not configured")
 
-    client = _create_client(settings.SUPABASE_ANON_KEY)
-    client.auth.set_session(user_jwt, "")
+    now = time.monotonic()
+    client = _user_clients.get(user_jwt, now)
+    if client is not None:
+        return client
+
+    # The session is pinned to this one JWT; there is no refresh token, so
+    # the background refresh timer would only ever fail.
+    client = _create_client(settings.SUPABASE_ANON_KEY, ClientOptions(auto_refresh_token=False))
+    response = client.auth.set_session(user_jwt, "")
+    _user_clients.put(user_jwt, client, now, getattr(response, "session", None))
     return client
 
 
@@ -46,3 +225,68 @@ def get_supabase(user_jwt: Optional[str] = None) -> Client:
         return get_supabase_user(user_jwt)
 
     return get_supabase_admin()
+
+
+async def get_async_supabase_admin() -> AsyncClient:
+    """Async service-role client. Same trust rules as `get_supabase_admin`."""
+    global _async_admin_client
+    if _async_admin_client is not None:
+        return _async_admin_client
+
+    if not settings.SUPABASE_SERVICE_ROLE_KEY:
+        raise RuntimeError("SUPABASE_SERVICE_ROLE_KEY is not configured")
+
+    client = await _create_async_client(settings.SUPABASE_SERVICE_ROLE_KEY)
+    with _lock:
+        if _async_admin_client is None:
+            _async_admin_client = client
+        return _async_admin_client
+
+
+async def get_async_supabase_user(user_jwt: str) -> AsyncClient:
+    """Async user-scoped client. Enforces RLS using the user's JWT."""
+    if not settings.SUPABASE_ANON_KEY:
+        raise RuntimeError("SUPABASE_ANON_KEY is not configured")
+
+    now = time.monotonic()
+    client = _async_user_clients.get(user_jwt, now)
+    if client is not None:
+        return client
+
+    client = await _create_async_client(
+        settings.SUPABASE_ANON_KEY, AClientOptions(auto_refresh_token=False)
+    )
+    response = await client.auth.set_session(user_jwt, "")
+    _async_user_clients.put(user_jwt, client, now, getattr(response, "session", None))
+    return client
+
+
+async def get_async_supabase(user_jwt: Optional[str] = None) -> AsyncClient:
+    """Async counterpart of `get_supabase`."""
+    if user_jwt:
+        return await get_async_supabase_user(user_jwt)
+
+    return await get_async_supabase_admin()
+
+
+def close_supabase_clients() -> None:
+    """Drop cached clients and close the shared sync connection pool."""
+    global _admin_client, _async_admin_client, _transport
+    with _lock:
+        _admin_client = None
+        _async_admin_client = None
+        transport, _transport = _transport, None
+    _user_clients.clear()
+    _async_user_clients.clear()
+    if transport is not None:
+        transport.close()
+
+
+async def aclose_supabase_clients() -> None:
+    """`close_supabase_clients`, plus closing the shared async pool."""
+    global _async_transport
+    close_supabase_clients()
+    with _lock:
+        transport, _async_transport = _async_transport, None
+    if transport is not None:
+        await transport.aclose()
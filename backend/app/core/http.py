@@ -0,0 +1,63 @@
+"""Shared outbound HTTP clients.
+
+Tool `_make_request` helpers and the OAuth token exchanges used to open a
+fresh `httpx.AsyncClient` per call, paying a TCP + TLS handshake every
+time. `get_http_client(url)` instead hands out one long-lived client per
+upstream origin (scheme + host + port), with bounded keep-alive pools,
+HTTP/2 where the server negotiates it, and explicit timeouts.
+
+Clients are created lazily and closed by `close_http_clients()` from the
+API lifespan and on worker shutdown.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict
+
+import httpx
+
+from app.core.config import settings
+
+_lock = threading.Lock()
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _origin(url: str) -> str:
+    parsed = httpx.URL(url)
+    port = f":{parsed.port}" if parsed.port else ""
+    return f"{parsed.scheme}://{parsed.host}{port}"
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS
+        ),
+    )
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    """Return the shared client for `url`'s origin. Do not close it."""
+    origin = _origin(url)
+    client = _clients.get(origin)
+    if client is None or client.is_closed:
+        with _lock:
+            client = _clients.get(origin)
+            if client is None or client.is_closed:
+                client = _clients[origin] = _build_client()
+    return client
+
+
+async def close_http_clients() -> None:
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        await client.aclose()
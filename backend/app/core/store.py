@@ -0,0 +1,450 @@
+"""Async data access for the tables the API, worker and runtime share.
+
+Request handlers are `async def`; calling the synchronous supabase client
+from them blocks the event loop for the whole PostgREST round-trip. Every
+function here takes an `AsyncClient` from `app.core.database`
+(`get_async_supabase_user(jwt)` for RLS-scoped access,
+`get_async_supabase_admin()` for trusted server-side code) and awaits the
+query instead, so one uvicorn worker can serve many requests concurrently.
+
+Functions return plain rows (dicts) or lists of rows, and `None` where a
+single row is missing, rather than supabase response objects.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from supabase import AsyncClient
+
+Row = Dict[str, Any]
+
+
+def _first(data: Any) -> Optional[Row]:
+    if isinstance(data, list):
+        return data[0] if data else None
+    return data or None
+
+
+# ---------- users ----------
+
+
+async def get_user_by_stripe_customer(db: AsyncClient, customer_id: str) -> Optional[Row]:
+    res = (
+        await db.table("users")
+        .select("id, email")
+        .eq("stripe_customer_id", customer_id)
+        .limit(1)
+        .execute()
+    )
+    return _first(res.data)
+
+
+async def update_user(db: AsyncClient, user_id: str, fields: Row) -> None:
+    await db.table("users").update(fields).eq("id", user_id).execute()
+
+
+# ---------- agent_tasks ----------
+
+
+async def list_tasks(db: AsyncClient, *, status: Optional[str] = None) -> List[Row]:
+    query = db.table("agent_tasks").select("*")
+    if status is not None:
+        query = query.eq("status", status)
+    res = await query.order("created_at", desc=True).execute()
+    return list(res.data or [])
+
+
+async def get_task(db: AsyncClient, task_id: str) -> Optional[Row]:
+    res = await db.table("agent_tasks").select("*").eq("id", task_id).limit(1).execute()
+    return _first(res.data)
+
+
+async def create_task(db: AsyncClient, row: Row) -> Optional[Row]:
+    res = await db.table("agent_tasks").insert(row).execute()
+    return _first(res.data)
+
+
+async def update_task(db: AsyncClient, task_id: str, fields: Row) -> None:
+    await db.table("agent_tasks").update(fields).eq("id", task_id).execute()
+
+
+# ---------- agent_task_queue ----------
+
+
+async def enqueue_task(db: AsyncClient, task_id: str, **fields: Any) -> Optional[Row]:
+    row = {"task_id": task_id, "status": "queued", **fields}
+    res = await db.table("agent_task_queue").insert(row).execute()
+    return _first(res.data)
+
+
+async def update_queue_record(db: AsyncClient, queue_id: str, fields: Row) -> None:
+    await db.table("agent_task_queue").update(fields).eq("id", queue_id).execute()
+
+
+async def claim_queue_records(
+    db: AsyncClient, worker_id: str, limit: int, stale_after: str
+) -> List[Row]:
+    """Claim up to `limit` ready records via the `claim_tasks` RPC."""
+    res = await db.rpc(
+        "claim_tasks",
+        {"p_worker_id": worker_id, "p_limit": limit, "p_stale_after": stale_after},
+    ).execute()
+    return list(res.data or [])
+
+
+# ---------- agent_task_events ----------
+
+
+async def insert_task_events(db: AsyncClient, rows: List[Row]) -> None:
+    """Write a batch of events as one multi-row insert."""
+    if rows:
+        await db.table("agent_task_events").insert(rows).execute()
+
+
+# ---------- agent_subscriptions ----------
+
+
+async def list_subscriptions(db: AsyncClient, *, status: str = "active") -> List[Row]:
+    res = await db.table("agent_subscriptions").select("*").eq("status", status).execute()
+    return list(res.data or [])
+
+
+async def create_subscription(db: AsyncClient, row: Row) -> Optional[Row]:
+    res = await db.table("agent_subscriptions").insert(row).execute()
+    return _first(res.data)
+
+
+async def cancel_subscriptions(db: AsyncClient, user_id: str) -> None:
+    """Cancel all of a user's active agent subscriptions."""
+    await (
+        db.table("agent_subscriptions")
+        .update({"status": "cancelled"})
+        .eq("user_id", user_id)
+        .eq("status", "active")
+        .execute()
+    )
+
+
+# ---------- user_integrations ----------
+
+
+async def list_integrations(db: AsyncClient) -> List[Row]:
+    """All integrations visible to `db` (RLS scopes a user client to its owner)."""
+    res = await db.table("user_integrations").select("*").execute()
+    return list(res.data or [])
+
+
+async def get_active_integration(
+    db: AsyncClient, user_id: str, integration_type: str
+) -> Optional[Row]:
+    res = (
+        await db.table("user_integrations")
+        .select("*")
+        .eq("user_id", user_id)
+        .eq("integration_type", integration_type)
+        .eq("status", "active")
+        .limit(1)
+        .execute()
+    )
+    return _first(res.data)
+
+
+async def get_active_integration_by_realm(
+    db: AsyncClient, realm_id: str, integration_type: str = "quickbooks"
+) -> Optional[Row]:
+    res = (
+        await db.table("user_integrations")
+        .select("*")
+        .eq("realm_id", realm_id)
+        .eq("integration_type", integration_type)
+        .eq("status", "active")
+        .limit(1)
+        .execute()
+    )
+    return _first(res.data)
+
+
+async def save_integration(db: AsyncClient, row: Row) -> None:
+    """Insert or replace a user's integration (unique on user_id + integration_type)."""
+    await (
+        db.table("user_integrations").upsert(row, on_conflict="user_id,integration_type").execute()
+    )
+
+
+async def update_integration(
+    db: AsyncClient, integration_type: str, fields: Row, *, user_id: Optional[str] = None
+) -> None:
+    """Update one integration type; omit `user_id` when RLS already scopes `db`."""
+    query = db.table("user_integrations").update(fields).eq("integration_type", integration_type)
+    if user_id is not None:
+        query = query.eq("user_id", user_id)
+    await query.execute()
+
+
+# ---------- oauth_states ----------
+
+
+async def create_oauth_state(db: AsyncClient, row: Row) -> None:
+    await db.table("oauth_states").insert(row).execute()
+
+
+async def pop_oauth_state(db: AsyncClient, state: str) -> Optional[Row]:
+    """Fetch and delete an OAuth state in one round-trip; None if unknown."""
+    res = await db.table("oauth_states").delete().eq("state", state).execute()
+    return _first(res.data)
+
+
+# ---------- gmail_sync_state / gmail_message_cache ----------
+
+
+async def get_gmail_history_id(db: AsyncClient, user_id: str) -> Optional[str]:
+    res = (
+        await db.table("gmail_sync_state")
+        .select("history_id")
+        .eq("user_id", user_id)
+        .limit(1)
+        .execute()
+    )
+    row = _first(res.data)
+    return row["history_id"] if row else None
+
+
+async def save_gmail_history_id(db: AsyncClient, user_id: str, history_id: str) -> None:
+    await (
+        db.table("gmail_sync_state")
+        .upsert(
+            {
+                "user_id": user_id,
+                "history_id": history_id,
+                "synced_at": datetime.now(timezone.utc).isoformat(),
+            }
+        )
+        .execute()
+    )
+
+
+async def get_cached_gmail_messages(
+    db: AsyncClient, user_id: str, message_ids: List[str]
+) -> Dict[str, Row]:
+    """Cached rows for `message_ids`, keyed by message id."""
+    if not message_ids:
+        return {}
+    res = (
+        await db.table("gmail_message_cache")
+        .select("message_id,email,has_body")
+        .eq("user_id", user_id)
+        .in_("message_id", message_ids)
+        .execute()
+    )
+    return {row["message_id"]: row for row in res.data or []}
+
+
+async def cache_gmail_messages(db: AsyncClient, rows: List[Row]) -> None:
+    if rows:
+        await db.table("gmail_message_cache").upsert(rows).execute()
+
+
+async def evict_gmail_messages(
+    db: AsyncClient, user_id: str, message_ids: Optional[List[str]] = None
+) -> None:
+    """Drop cached messages; all of the user's when `message_ids` is None."""
+    query = db.table("gmail_message_cache").delete().eq("user_id", user_id)
+    if message_ids is not None:
+        if not message_ids:
+            return
+        query = query.in_("message_id", message_ids)
+    await query.execute()
+
+
+# ---------- pending_categorizations / flagged_transactions ----------
+
+
+async def insert_pending_categorizations(db: AsyncClient, rows: List[Row]) -> List[Row]:
+    """Queue categorizations as one multi-row insert."""
+    if not rows:
+        return []
+    res = await db.table("pending_categorizations").insert(rows).execute()
+    return list(res.data or [])
+
+
+async def list_pending_categorizations(
+    db: AsyncClient, user_id: str, status: str, limit: int = 1000
+) -> List[Row]:
+    res = (
+        await db.table("pending_categorizations")
+        .select("*")
+        .eq("user_id", user_id)
+        .eq("status", status)
+        .order("created_at")
+        .order("id")
+        .limit(limit)
+        .execute()
+    )
+    return list(res.data or [])
+
+
+async def update_pending_categorizations(db: AsyncClient, ids: List[str], fields: Row) -> None:
+    if ids:
+        await db.table("pending_categorizations").update(fields).in_("id", ids).execute()
+
+
+async def insert_flagged_transactions(db: AsyncClient, rows: List[Row]) -> List[Row]:
+    """Flag transactions as one multi-row insert."""
+    if not rows:
+        return []
+    res = await db.table("flagged_transactions").insert(rows).execute()
+    return list(res.data or [])
+
+
+# ---------- webhook_events ----------
+
+
+async def insert_webhook_events(db: AsyncClient, rows: List[Row]) -> None:
+    if rows:
+        await db.table("webhook_events").insert(rows).execute()
+
+
+async def list_pending_webhook_users(
+    db: AsyncClient, integration_type: str, exclude: List[str], limit: int = 100
+) -> List[str]:
+    """Distinct users with unprocessed events, oldest first, via RPC."""
+    res = await db.rpc(
+        "pending_webhook_users",
+        {"p_integration_type": integration_type, "p_exclude": exclude, "p_limit": limit},
+    ).execute()
+    return [row["user_id"] for row in res.data or []]
+
+
+async def list_webhook_events_since(
+    db: AsyncClient, integration_type: str, since: str, limit: int = 1000
+) -> List[Row]:
+    """Events recorded at or after `since`, processed or not, oldest first."""
+    res = (
+        await db.table("webhook_events")
+        .select("realm_id, entity_type, created_at")
+        .eq("integration_type", integration_type)
+        .gte("created_at", since)
+        .order("created_at")
+        .limit(limit)
+        .execute()
+    )
+    return list(res.data or [])
+
+
+async def mark_webhook_events_processed(
+    db: AsyncClient, integration_type: str, user_id: str, before: str
+) -> None:
+    """Mark a user's events created before `before` as processed."""
+    await (
+        db.table("webhook_events")
+        .update({"processed": True})
+        .eq("integration_type", integration_type)
+        .eq("user_id", user_id)
+        .eq("processed", False)
+        .lt("created_at", before)
+        .execute()
+    )
+
+
+# ---------- quickbooks_sync_state / quickbooks_ledger ----------
+
+
+async def get_quickbooks_sync_state(db: AsyncClient, realm_id: str) -> Optional[Row]:
+    res = (
+        await db.table("quickbooks_sync_state")
+        .select("*")
+        .eq("realm_id", realm_id)
+        .limit(1)
+        .execute()
+    )
+    return _first(res.data)
+
+
+async def list_quickbooks_sync_users(
+    db: AsyncClient, synced_before: str, limit: int = 100
+) -> List[str]:
+    """Users whose realm mirror was last synced before `synced_before`."""
+    res = (
+        await db.table("quickbooks_sync_state")
+        .select("user_id")
+        .lt("synced_through", synced_before)
+        .order("synced_through")
+        .limit(limit)
+        .execute()
+    )
+    return [row["user_id"] for row in res.data or []]
+
+
+async def save_quickbooks_sync_state(db: AsyncClient, row: Row) -> None:
+    row = {**row, "updated_at": datetime.now(timezone.utc).isoformat()}
+    await db.table("quickbooks_sync_state").upsert(row).execute()
+
+
+async def upsert_ledger_rows(db: AsyncClient, rows: List[Row]) -> None:
+    if rows:
+        await db.table("quickbooks_ledger").upsert(rows).execute()
+
+
+async def delete_ledger_rows(
+    db: AsyncClient, realm_id: str, entity_type: str, entity_ids: List[str]
+) -> None:
+    if entity_ids:
+        await (
+            db.table("quickbooks_ledger")
+            .delete()
+            .eq("realm_id", realm_id)
+            .eq("entity_type", entity_type)
+            .in_("entity_id", entity_ids)
+            .execute()
+        )
+
+
+async def delete_ledger_rows_before(db: AsyncClient, realm_id: str, before: str) -> None:
+    """Drop a realm's rows not rewritten since `before` (swept after a backfill)."""
+    await (
+        db.table("quickbooks_ledger")
+        .delete()
+        .eq("realm_id", realm_id)
+        .lt("updated_at", before)
+        .execute()
+    )
+
+
+async def list_ledger_rows(
+    db: AsyncClient,
+    realm_id: str,
+    entity_type: str,
+    *,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    account_ref: Optional[str] = None,
+    open_only: bool = False,
+    active_only: bool = False,
+    order: str = "txn_date",
+    desc: bool = False,
+    offset: int = 0,
+    limit: int = 1000,
+) -> List[Row]:
+    """One page of mirrored entities; `data` holds the QuickBooks object."""
+    query = (
+        db.table("quickbooks_ledger")
+        .select("entity_id,data")
+        .eq("realm_id", realm_id)
+        .eq("entity_type", entity_type)
+    )
+    if start_date is not None:
+        query = query.gte("txn_date", start_date)
+    if end_date is not None:
+        query = query.lte("txn_date", end_date)
+    if account_ref is not None:
+        query = query.eq("account_ref", account_ref)
+    if open_only:
+        query = query.gt("balance", 0)
+    if active_only:
+        query = query.eq("active", True)
+    res = await (
+        query.order(order, desc=desc).order("entity_id").range(offset, offset + limit - 1).execute()
+    )
+    return list(res.data or [])
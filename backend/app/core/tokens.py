@@ -0,0 +1,124 @@
+"""Process-wide cache of OAuth client info for integrations.
+
+`get_quickbooks_client`, `get_gmail_client` and `get_google_calendar_client`
+read `user_integrations`, decrypt the stored tokens and sometimes refresh
+them over HTTP. Every tool object did that on first use, and tools that
+build nested tools (HiringTools, CashFlowTools) did it again. `TokenCache`
+keeps the result per `(user_id, integration)` instead:
+
+- entries are reused for OAUTH_TOKEN_CACHE_TTL_SECONDS, and never past
+  OAUTH_TOKEN_REFRESH_MARGIN_SECONDS before the token expires;
+- inside that margin the cached token is still handed out while one
+  background load refreshes it, so callers rarely wait on a refresh;
+- concurrent loads for the same key share one in-flight call.
+
+Loaders return `(client_info, expires_at)` with `expires_at` in epoch
+seconds from `time.time()` (see `token_expiry`). Failed loads are not cached; every waiter sees the exception.
+
+`invalidate` only reaches the process it runs in (the API handles
+connect/disconnect). Other processes notice a disconnect when an entry
+expires and the loader finds no active integration, so the task worker
+runs with the shorter OAUTH_TOKEN_WORKER_CACHE_TTL_SECONDS.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+log = get_logger(__name__)
+
+Key = Tuple[str, str]
+Loader = Callable[[], Awaitable[Tuple[Dict[str, Any], float]]]
+
+# Never hand out a token this close to (or past) its expiry.
+EXPIRY_SKEW_SECONDS = 30
+
+
+class TokenCache:
+    def __init__(self, ttl: Optional[float] = None):
+        # Seconds an entry is reused; OAUTH_TOKEN_CACHE_TTL_SECONDS when None.
+        self.ttl = ttl
+        # key -> (client_info, fresh_until, expires_at), epoch seconds.
+        self._entries: Dict[Key, Tuple[Dict[str, Any], float, float]] = {}
+        self._inflight: Dict[Key, asyncio.Task] = {}
+        # Bumped by `invalidate` so loads started before it are not stored.
+        self._generations: Dict[Key, int] = {}
+
+    async def get(self, user_id: str, integration: str, loader: Loader) -> Dict[str, Any]:
+        key = (user_id, integration)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            info, fresh_until, expires_at = entry
+            if now < fresh_until:
+                return info
+            if now < expires_at - EXPIRY_SKEW_SECONDS:
+                self._load(key, loader, background=True)
+                return info
+        return await asyncio.shield(self._load(key, loader))
+
+    def _load(self, key: Key, loader: Loader, background: bool = False) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._run(key, loader, self._generations.get(key, 0)))
+            self._inflight[key] = task
+            if background:
+                task.add_done_callback(self._log_background_failure)
+        return task
+
+    async def _run(self, key: Key, loader: Loader, generation: int) -> Dict[str, Any]:
+        try:
+            info, expires_at = await loader()
+            if self._generations.get(key, 0) == generation:
+                ttl = settings.OAUTH_TOKEN_CACHE_TTL_SECONDS if self.ttl is None else self.ttl
+                fresh_until = min(
+                    time.time() + ttl,
+                    expires_at - settings.OAUTH_TOKEN_REFRESH_MARGIN_SECONDS,
+                )
+                self._entries[key] = (info, fresh_until, expires_at)
+            return info
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    @staticmethod
+    def _log_background_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            log.warning("oauth_token_refresh_failed", exc_info=task.exception())
+
+    def invalidate(self, user_id: str, integration: str) -> None:
+        """Forget a cached token, e.g. after reconnect or disconnect.
+
+        A load already in flight still answers its waiters but is not
+        cached, and later calls start a fresh load.
+        """
+        key = (user_id, integration)
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self) -> None:
+        for key in self._inflight:
+            self._generations[key] = self._generations.get(key, 0) + 1
+        self._entries.clear()
+        self._inflight.clear()
+
+
+token_cache = TokenCache()
+
+
+def needs_refresh(expires_at: Optional[float]) -> bool:
+    """Whether a stored token should be refreshed before use."""
+    if not expires_at:
+        return True
+    return time.time() > expires_at - settings.OAUTH_TOKEN_REFRESH_MARGIN_SECONDS
+
+
+def token_expiry(expires_in: float) -> float:
+    """Epoch seconds `expires_in` from now, on the clock `needs_refresh` reads."""
+    return time.time() + expires_in
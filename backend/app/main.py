@@ -7,8 +7,11 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
+from app.agents.runtime import close_anthropic_client
 from app.api import agents, auth, integrations, tasks, webhooks
 from app.core.config import settings
+from app.core.database import aclose_supabase_clients
+from app.core.http import close_http_clients
 from app.core.logging import configure_logging, get_logger
 from app.core.observability import init_sentry
 from app.core.ratelimit import limiter
@@ -31,6 +34,9 @@ async def lifespan(app: FastAPI):
         },
     )
     yield
+    await close_anthropic_client()
+    await aclose_supabase_clients()
+    await close_http_clients()
     log.info("shutdown")
 
 
@@ -0,0 +1,103 @@
+"""LISTEN/NOTIFY wakeups for the task worker.
+
+The `20261017_queue_notify` migration fires `pg_notify('agent_task_queue',
+...)` whenever a queue row is (re-)queued. `QueueNotifier` holds a direct
+Postgres connection (`DATABASE_URL`, session mode — LISTEN does not survive
+a transaction pooler) and turns those notifications into an asyncio.Event
+the worker loop waits on, so pickup latency drops to a round-trip and idle
+workers stop hammering the REST API.
+
+Optional: without asyncpg or DATABASE_URL, `start()` returns False and the
+worker keeps polling on its normal interval.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from app.core.logging import get_logger
+from app.workers.backoff import utc_now
+
+log = get_logger(__name__)
+
+QUEUE_CHANNEL = "agent_task_queue"
+
+
+class QueueNotifier:
+    def __init__(self, dsn: str, channel: str = QUEUE_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self.wakeup = asyncio.Event()
+        self._conn: Any = None
+        self._timers: set[asyncio.TimerHandle] = set()
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def start(self) -> bool:
+        """Open the LISTEN connection. Returns False if unavailable."""
+        if not self.dsn:
+            return False
+        try:
+            import asyncpg
+        except ImportError:
+            log.warning("queue_notify_disabled_missing_dep")
+            return False
+
+        try:
+            self._conn = await asyncpg.connect(self.dsn)
+            await self._conn.add_listener(self.channel, self._on_notify)
+            self._conn.add_termination_listener(self._on_terminated)
+        except Exception:
+            log.exception("queue_notify_connect_failed")
+            self._conn = None
+            return False
+
+        log.info("queue_notify_listening", extra={"channel": self.channel})
+        return True
+
+    async def ensure_connected(self) -> bool:
+        """Reconnect after a dropped connection; cheap when already connected."""
+        if self.connected:
+            return True
+        return await self.start()
+
+    def _on_notify(self, _conn: Any, _pid: int, _channel: str, payload: str) -> None:
+        delay = _seconds_until_ready(payload)
+        if delay <= 0:
+            self.wakeup.set()
+            return
+        # Retries are re-queued with a future next_run_at; wake when due.
+        loop = asyncio.get_running_loop()
+        self._timers = {h for h in self._timers if h.when() > loop.time()}
+        self._timers.add(loop.call_later(delay, self.wakeup.set))
+
+    def _on_terminated(self, _conn: Any) -> None:
+        log.warning("queue_notify_connection_lost", extra={"channel": self.channel})
+        self._conn = None
+
+    async def close(self) -> None:
+        for handle in self._timers:
+            handle.cancel()
+        self._timers.clear()
+        if self._conn is not None:
+            try:
+                await self._conn.close()
+            finally:
+                self._conn = None
+
+
+def _seconds_until_ready(payload: str) -> float:
+    try:
+        data = json.loads(payload or "{}")
+        next_run_at: Optional[str] = data.get("next_run_at")
+        if not next_run_at:
+            return 0.0
+        ready_at = datetime.fromisoformat(next_run_at.replace("Z", "+00:00"))
+        return (ready_at - utc_now()).total_seconds()
+    except Exception:
+        return 0.0
@@ -0,0 +1,300 @@
+"""
+QuickBooks ledger mirror sync.
+
+`quickbooks_webhook` records one `webhook_events` row per changed entity.
+This job, run from the task worker every QUICKBOOKS_SYNC_INTERVAL_SECONDS,
+turns those rows into incremental syncs of `quickbooks_ledger`:
+
+- a realm with no sync state (or one too stale for CDC) is backfilled with
+  paged queries for every mirrored entity, then rows the backfill did not
+  rewrite are swept, so entities deleted meanwhile disappear;
+- otherwise one CDC request fetches everything changed since the last sync,
+  upserting changed entities and deleting removed ones. CDC returns at most
+  CDC_MAX_OBJECTS per entity, so a response at that limit falls back to a
+  backfill rather than advancing past changes it never saw.
+
+Each pass takes distinct users with pending events (plus realms not synced
+for half of QUICKBOOKS_MIRROR_MAX_STALENESS_SECONDS, so quiet realms stay
+fresh enough to read). A user's events are marked processed only after
+their realm synced. Failing users are retried with exponential backoff and
+their events are dropped after MAX_SYNC_FAILURES; QuickBooksTools falls
+back to the API once a mirror is stale, so nothing reads the lagging copy.
+
+Every pass, mirror or not, also replays webhook_events recorded since the
+last pass into `invalidate_reference_data`: the webhook handler runs in the
+API process and cannot reach the reference cache held by this one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.agents.tools.quickbooks import (
+    MIRRORED_ENTITIES,
+    QuickBooksTools,
+    invalidate_reference_data,
+)
+from app.core import store
+from app.core.config import settings
+from app.core.database import get_async_supabase_admin
+from app.core.logging import get_logger
+
+log = get_logger(__name__)
+
+# QuickBooks CDC looks back at most 30 days; older state needs a backfill.
+CDC_MAX_LOOKBACK = timedelta(days=29)
+# CDC returns at most this many objects per entity per response.
+CDC_MAX_OBJECTS = 1000
+# Rows per upsert while backfilling.
+BACKFILL_BATCH_SIZE = 500
+# Users synced per pass.
+USERS_PER_PASS = 100
+# Consecutive failures before a user's pending events are dropped.
+MAX_SYNC_FAILURES = 8
+# Upper bound on the retry delay for a failing user, in seconds.
+MAX_RETRY_BACKOFF_SECONDS = 3600
+
+# user_id -> (consecutive failures, retry_at monotonic seconds), per process.
+_failures: Dict[str, Tuple[int, float]] = {}
+
+# created_at of the newest webhook event replayed into this process's
+# reference cache. Starts a little before import so nothing recorded while
+# the worker boots is missed; replaying an event twice is harmless.
+_events_seen_through: str = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+
+
+def _date(value: Optional[str]) -> Optional[str]:
+    return value[:10] if value else None
+
+
+def ledger_row(
+    realm_id: str, user_id: str, entity_type: str, data: Dict[str, Any], updated_at: str
+) -> Dict:
+    """Map a QuickBooks entity onto a quickbooks_ledger row."""
+    return {
+        "realm_id": realm_id,
+        "entity_type": entity_type,
+        "entity_id": data["Id"],
+        "user_id": user_id,
+        "txn_date": _date(data.get("TxnDate")),
+        "due_date": _date(data.get("DueDate")),
+        "total_amt": data.get("TotalAmt"),
+        "balance": data.get("Balance", data.get("CurrentBalance")),
+        "account_ref": (data.get("AccountRef") or {}).get("value"),
+        "account_type": data.get("AccountType"),
+        "active": data.get("Active", True),
+        "data": data,
+        "updated_at": updated_at,
+    }
+
+
+async def _backfill(
+    db, tools: QuickBooksTools, realm_id: str, user_id: str, started: datetime
+) -> int:
+    """Rewrite every mirrored entity, then sweep rows the backfill did not touch."""
+    stamp = started.isoformat()
+    count = 0
+    for entity in MIRRORED_ENTITIES:
+        # Without a filter, Account queries only return active accounts.
+        where = " WHERE Active IN (true, false)" if entity == "Account" else ""
+        batch: List[Dict] = []
+        async for data in tools._iter_query(f"SELECT * FROM {entity}{where}", entity):
+            batch.append(ledger_row(realm_id, user_id, entity, data, stamp))
+            if len(batch) >= BACKFILL_BATCH_SIZE:
+                await store.upsert_ledger_rows(db, batch)
+                count += len(batch)
+                batch = []
+        await store.upsert_ledger_rows(db, batch)
+        count += len(batch)
+    # Anything older than this sync was deleted in QuickBooks meanwhile.
+    await store.delete_ledger_rows_before(db, realm_id, stamp)
+    return count
+
+
+async def _fetch_changes(
+    tools: QuickBooksTools, realm_id: str, since: datetime
+) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """Entity -> objects changed since `since`; None if CDC failed."""
+    result = await tools._make_request(
+        "GET",
+        "cdc",
+        params={"entities": ",".join(MIRRORED_ENTITIES), "changedSince": since.isoformat()},
+    )
+    if "error" in result:
+        log.warning("quickbooks_cdc_failed", extra={"realm_id": realm_id, "error": result["error"]})
+        return None
+
+    changes: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for response in result.get("CDCResponse", []):
+        for query_response in response.get("QueryResponse", []):
+            for entity in MIRRORED_ENTITIES:
+                changes[entity].extend(query_response.get(entity, []))
+    return changes
+
+
+async def _apply_changes(
+    db, realm_id: str, user_id: str, changes: Dict[str, List[Dict[str, Any]]]
+) -> int:
+    now = datetime.now(timezone.utc).isoformat()
+    count = 0
+    for entity, changed in changes.items():
+        deleted = [e["Id"] for e in changed if e.get("status") == "Deleted"]
+        rows = [
+            ledger_row(realm_id, user_id, entity, e, now)
+            for e in changed
+            if e.get("status") != "Deleted"
+        ]
+        await store.upsert_ledger_rows(db, rows)
+        await store.delete_ledger_rows(db, realm_id, entity, deleted)
+        count += len(changed)
+    return count
+
+
+async def sync_realm(user_id: str) -> bool:
+    """Bring one user's QuickBooks realm mirror up to date."""
+    db = await get_async_supabase_admin()
+    tools = QuickBooksTools(user_id)
+    realm_id = (await tools._get_client())["realm_id"]
+    started = datetime.now(timezone.utc)
+
+    state = await store.get_quickbooks_sync_state(db, realm_id)
+    synced_through = datetime.fromisoformat(state["synced_through"]) if state is not None else None
+    needs_backfill = (
+        state is None
+        or not state.get("backfilled_at")
+        or synced_through < started - CDC_MAX_LOOKBACK
+    )
+
+    if not needs_backfill:
+        changes = await _fetch_changes(tools, realm_id, synced_through)
+        if changes is None:
+            return False
+        if any(len(changed) >= CDC_MAX_OBJECTS for changed in changes.values()):
+            # Possibly truncated: only a backfill is sure to catch everything.
+            log.info("quickbooks_cdc_truncated", extra={"realm_id": realm_id})
+            needs_backfill = True
+        else:
+            count = await _apply_changes(db, realm_id, user_id, changes)
+            mode = "cdc"
+
+    if needs_backfill:
+        count = await _backfill(db, tools, realm_id, user_id, started)
+        mode = "backfill"
+
+    await store.save_quickbooks_sync_state(
+        db,
+        {
+            "realm_id": realm_id,
+            "user_id": user_id,
+            "synced_through": started.isoformat(),
+            "backfilled_at": started.isoformat() if needs_backfill else state.get("backfilled_at"),
+        },
+    )
+    # Reference data in this process (e.g. account balances) may have moved.
+    invalidate_reference_data(realm_id)
+    log.info(
+        "quickbooks_mirror_synced",
+        extra={"realm_id": realm_id, "mode": mode, "entities": count},
+    )
+    return True
+
+
+async def invalidate_changed_reference_data() -> int:
+    """Drop cached reference data for realms with new webhook events; returns events seen."""
+    global _events_seen_through
+    db = await get_async_supabase_admin()
+    events = await store.list_webhook_events_since(db, "quickbooks", _events_seen_through)
+    changed: Dict[str, set] = defaultdict(set)
+    for event in events:
+        if event.get("realm_id"):
+            changed[event["realm_id"]].add(event.get("entity_type"))
+    for realm_id, entities in changed.items():
+        invalidate_reference_data(realm_id, entities)
+    if events:
+        _events_seen_through = events[-1]["created_at"]
+        log.info(
+            "quickbooks_reference_data_invalidated",
+            extra={"realms": len(changed), "events": len(events)},
+        )
+    return len(events)
+
+
+def _record_failure(user_id: str, interval: float) -> int:
+    """Schedule the next retry for a failing user; returns consecutive failures."""
+    failures = _failures.get(user_id, (0, 0.0))[0] + 1
+    delay = min(interval * 2**failures, MAX_RETRY_BACKOFF_SECONDS)
+    _failures[user_id] = (failures, time.monotonic() + delay)
+    return failures
+
+
+async def sync_pending_realms() -> int:
+    """Sync realms with unprocessed webhook events or a stale mirror; returns realms synced."""
+    db = await get_async_supabase_admin()
+    now = time.monotonic()
+    backing_off = [user_id for user_id, (_, retry_at) in _failures.items() if retry_at > now]
+    users = await store.list_pending_webhook_users(db, "quickbooks", backing_off, USERS_PER_PASS)
+    stale_before = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.QUICKBOOKS_MIRROR_MAX_STALENESS_SECONDS / 2
+    )
+    stale_users = await store.list_quickbooks_sync_users(
+        db, stale_before.isoformat(), USERS_PER_PASS + len(backing_off)
+    )
+    for user_id in stale_users:
+        if user_id not in users and user_id not in backing_off:
+            users.append(user_id)
+
+    synced = 0
+    for user_id in users:
+        # Events recorded before the sync starts are covered by it.
+        started = datetime.now(timezone.utc).isoformat()
+        try:
+            ok = await sync_realm(user_id)
+        except HTTPException:
+            # QuickBooks disconnected or expired: nothing left to mirror. Back
+            # off so a stale sync state is not re-checked every pass.
+            log.info("quickbooks_mirror_sync_skipped", extra={"user_id": user_id})
+            _record_failure(user_id, settings.QUICKBOOKS_SYNC_INTERVAL_SECONDS)
+            await store.mark_webhook_events_processed(db, "quickbooks", user_id, started)
+            continue
+        except Exception:
+            log.exception("quickbooks_mirror_sync_failed", extra={"user_id": user_id})
+            ok = False
+
+        if ok:
+            _failures.pop(user_id, None)
+            await store.mark_webhook_events_processed(db, "quickbooks", user_id, started)
+            synced += 1
+            continue
+
+        failures = _record_failure(user_id, settings.QUICKBOOKS_SYNC_INTERVAL_SECONDS)
+        if failures >= MAX_SYNC_FAILURES:
+            # Stop retrying these events; reads fall back to the API while the
+            # mirror is stale, and the next webhook or stale check tries again.
+            log.error(
+                "quickbooks_mirror_sync_abandoned",
+                extra={"user_id": user_id, "failures": failures},
+            )
+            await store.mark_webhook_events_processed(db, "quickbooks", user_id, started)
+    return synced
+
+
+async def sync_loop(stop: asyncio.Event, interval: Optional[float] = None) -> None:
+    """Every `interval` seconds until `stop` is set, replay webhook events into
+    the reference cache and, with the mirror enabled, run `sync_pending_realms`."""
+    interval = interval or settings.QUICKBOOKS_SYNC_INTERVAL_SECONDS
+    while not stop.is_set():
+        try:
+            await invalidate_changed_reference_data()
+            if settings.QUICKBOOKS_MIRROR_ENABLED:
+                await sync_pending_realms()
+        except Exception:
+            log.exception("quickbooks_sync_pass_failed")
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(stop.wait(), timeout=interval)
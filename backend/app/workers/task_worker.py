@@ -1,17 +1,28 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import os
+import signal
 import socket
+import time
 from datetime import datetime, timezone, timedelta
-from typing import Any, Dict, Optional
-
-from app.core.database import get_supabase_admin
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core import store
+from app.core.database import aclose_supabase_clients, get_async_supabase_admin
+from app.core.http import close_http_clients
+from app.core.logging import get_logger
+from app.core.tokens import token_cache
 from app.agents.registry import AgentType
-from app.agents.runtime import AgentRuntime
+from app.agents.runtime import AgentRuntime, close_anthropic_client
 from app.workers.failure import classify_failure
-from app.workers.backoff import compute_next_run_at, utc_now
+from app.workers.backoff import compute_next_run_at
+from app.workers.notify import QueueNotifier
+from app.workers import quickbooks_sync
 
+log = get_logger(__name__)
 
 LOCK_STALE_AFTER = timedelta(minutes=10)
 
@@ -25,112 +36,65 @@ def worker_id() -> str:
     return os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
 
 
-def _lock_is_stale(locked_at_iso: Optional[str]) -> bool:
-    if not locked_at_iso:
-        return False
-    try:
-        locked_at = datetime.fromisoformat(locked_at_iso.replace("Z", "+00:00"))
-        return utc_now() - locked_at > LOCK_STALE_AFTER
-    except Exception:
-        return True
-
-
-async def claim_next_queue_record() -> Optional[Dict[str, Any]]:
+async def claim_queue_records(limit: int = 1) -> List[Dict[str, Any]]:
     """
-    Best-effort claiming using a select-then-conditional-update pattern.
+    Atomically claim up to `limit` ready queue records for this worker.
 
-    Not perfectly atomic, but the conditional update prevents most duplicates.
-    If you later add RPC support, we can convert this to an atomic claim function.
+    One round-trip to the `claim_tasks` RPC (see
+    supabase/migrations/20261017_claim_tasks_rpc.sql), which uses
+    FOR UPDATE SKIP LOCKED so concurrent workers never claim the same row.
     """
-    sb = get_supabase_admin()
-
-    # 1) Find candidates that are ready to run
-    res = (
-        sb.table("agent_task_queue")
-        .select("*")
-        .eq("status", "queued")
-        .lte("next_run_at", utc_now_iso())
-        .order("created_at")
-        .limit(5)
-        .execute()
+    if limit < 1:
+        return []
+
+    db = await get_async_supabase_admin()
+    return await store.claim_queue_records(
+        db,
+        worker_id(),
+        limit,
+        stale_after=f"{int(LOCK_STALE_AFTER.total_seconds())} seconds",
     )
-    rows = res.data or []
-    if not rows:
-        return None
-
-    wid = worker_id()
-
-    # 2) Try to claim one
-    for row in rows:
-        qid = row.get("id")
-        if not qid:
-            continue
 
-        locked_at = row.get("locked_at")
-        # allow reclaim if lock is stale
-        allow_reclaim = (locked_at is None) or _lock_is_stale(locked_at)
-        if not allow_reclaim:
-            continue
-
-        # Conditional update: only claim if still queued AND (unlocked OR stale)
-        update = {
-            "status": "processing",
-            "locked_at": utc_now_iso(),
-            "locked_by": wid,
-        }
-
-        # If stale lock, clear it first by overwriting in same update (already done)
-        upd = (
-            sb.table("agent_task_queue")
-            .update(update)
-            .eq("id", qid)
-            .eq("status", "queued")
-            .execute()
-        )
 
-        # Our minimal client may not return affected row count;
-        # so re-read and confirm we own it.
-        confirm = sb.table("agent_task_queue").select("*").eq("id", qid).single().execute()
-        claimed = confirm.data or {}
-        if claimed.get("status") == "processing" and claimed.get("locked_by") == wid:
-            return claimed
-
-    return None
+async def claim_next_queue_record() -> Optional[Dict[str, Any]]:
+    records = await claim_queue_records(1)
+    return records[0] if records else None
 
 
 async def process_queue_record(queue_record: Dict[str, Any]) -> None:
-    sb = get_supabase_admin()
+    db = await get_async_supabase_admin()
 
     qid = queue_record["id"]
     tid = queue_record.get("task_id")
     if not tid:
-        sb.table("agent_task_queue").update(
+        await store.update_queue_record(
+            db,
+            qid,
             {
                 "status": "processed",
                 "processed_at": utc_now_iso(),
                 "last_error": "Queue record missing task_id",
-            }
-        ).eq("id", qid).execute()
+            },
+        )
         return
 
     # Load task
-    task_res = sb.table("agent_tasks").select("*").eq("id", tid).single().execute()
-    task = task_res.data or {}
+    task = await store.get_task(db, tid) or {}
     if not task:
-        sb.table("agent_task_queue").update(
+        await store.update_queue_record(
+            db,
+            qid,
             {
                 "status": "processed",
                 "processed_at": utc_now_iso(),
                 "last_error": f"Task {tid} not found",
-            }
-        ).eq("id", qid).execute()
+            },
+        )
         return
 
     # Mark task started if not already
     if not task.get("started_at"):
-        sb.table("agent_tasks").update({"status": "running", "started_at": utc_now_iso()}).eq(
-            "id", tid
-        ).execute()
+        await store.update_task(db, tid, {"status": "running", "started_at": utc_now_iso()})
 
     agent_type_str = task.get("agent_type")
     user_id = task.get("user_id")
@@ -142,18 +106,20 @@ async def process_queue_record(queue_record: Dict[str, Any]) -> None:
         agent_type = AgentType(agent_type_str)
     except Exception as exc:
         fi = classify_failure(exc)
-        sb.table("agent_tasks").update(
+        await store.update_task(
+            db,
+            tid,
             {
                 "status": "failed",
                 "failure_code": "UNKNOWN_AGENT",
                 "retryable": False,
                 "error_detail": f"Unknown agent type: {agent_type_str}",
                 "completed_at": utc_now_iso(),
-            }
-        ).eq("id", tid).execute()
-        sb.table("agent_task_queue").update(
-            {"status": "processed", "processed_at": utc_now_iso()}
-        ).eq("id", qid).execute()
+            },
+        )
+        await store.update_queue_record(
+            db, qid, {"status": "processed", "processed_at": utc_now_iso()}
+        )
         return
 
     # Execute
@@ -163,7 +129,9 @@ async def process_queue_record(queue_record: Dict[str, Any]) -> None:
         success = bool(result.get("success"))
         if success:
             # Complete task
-            sb.table("agent_tasks").update(
+            await store.update_task(
+                db,
+                tid,
                 {
                     "status": "completed",
                     "completed_at": utc_now_iso(),
@@ -171,18 +139,20 @@ async def process_queue_record(queue_record: Dict[str, Any]) -> None:
                     "failure_code": None,
                     "retryable": False,
                     "error_detail": None,
-                }
-            ).eq("id", tid).execute()
+                },
+            )
 
-            sb.table("agent_task_queue").update(
+            await store.update_queue_record(
+                db,
+                qid,
                 {
                     "status": "processed",
                     "processed_at": utc_now_iso(),
                     "last_error": None,
                     "locked_at": None,
                     "locked_by": None,
-                }
-            ).eq("id", qid).execute()
+                },
+            )
             return
 
         # Runtime returned failure
@@ -197,18 +167,22 @@ async def process_queue_record(queue_record: Dict[str, Any]) -> None:
         max_attempts = int(queue_record.get("max_attempts") or 3)
 
         # persist task classification (task is business-level record)
-        sb.table("agent_tasks").update(
+        await store.update_task(
+            db,
+            tid,
             {
                 "failure_code": fi.code,
                 "retryable": fi.retryable,
                 "error_detail": fi.message,
-            }
-        ).eq("id", tid).execute()
+            },
+        )
 
         if fi.retryable and attempts < max_attempts:
             next_run_at = compute_next_run_at(attempts)
             # Put back into queue for retry
-            sb.table("agent_task_queue").update(
+            await store.update_queue_record(
+                db,
+                qid,
                 {
                     "status": "queued",
                     "attempts": attempts,
@@ -216,19 +190,23 @@ async def process_queue_record(queue_record: Dict[str, Any]) -> None:
                     "last_error": fi.message,
                     "locked_at": None,
                     "locked_by": None,
-                }
-            ).eq("id", qid).execute()
+                },
+            )
             return
 
         # Final failure
-        sb.table("agent_tasks").update(
+        await store.update_task(
+            db,
+            tid,
             {
                 "status": "failed",
                 "completed_at": utc_now_iso(),
-            }
-        ).eq("id", tid).execute()
+            },
+        )
 
-        sb.table("agent_task_queue").update(
+        await store.update_queue_record(
+            db,
+            qid,
             {
                 "status": "processed",
                 "processed_at": utc_now_iso(),
@@ -236,27 +214,156 @@ async def process_queue_record(queue_record: Dict[str, Any]) -> None:
                 "last_error": fi.message,
                 "locked_at": None,
                 "locked_by": None,
-            }
-        ).eq("id", qid).execute()
+            },
+        )
         return
 
 
-async def worker_loop(poll_interval: float = 2.0) -> None:
-    while True:
-        try:
-            record = await claim_next_queue_record()
-            if not record:
-                await asyncio.sleep(poll_interval)
-                continue
+async def _wait_for_work(
+    stop: asyncio.Event, timeout: float, wakeup: Optional[asyncio.Event] = None
+) -> None:
+    """Sleep until `timeout`, a stop request, or a queue NOTIFY wakeup."""
+    waiters = [asyncio.ensure_future(stop.wait())]
+    if wakeup is not None:
+        waiters.append(asyncio.ensure_future(wakeup.wait()))
+    try:
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+    if wakeup is not None:
+        wakeup.clear()
+
+
+async def _run_slot(
+    record: Dict[str, Any], slots: asyncio.Semaphore, in_flight: set, concurrency: int
+) -> None:
+    started = time.monotonic()
+    try:
+        await process_queue_record(record)
+    except Exception:
+        log.exception("worker_task_crashed", extra={"queue_id": record.get("id")})
+    finally:
+        slots.release()
+        # `in_flight` still holds this task until its done-callback fires.
+        busy = len(in_flight) - 1
+        log.info(
+            "worker_slot_released",
+            extra={
+                "queue_id": record.get("id"),
+                "duration_ms": int((time.monotonic() - started) * 1000),
+                "in_flight": busy,
+                "concurrency": concurrency,
+                "utilisation": round(busy / concurrency, 2),
+            },
+        )
+
 
-            await process_queue_record(record)
+async def worker_loop(
+    poll_interval: float = 2.0,
+    *,
+    concurrency: Optional[int] = None,
+    stop: Optional[asyncio.Event] = None,
+    notifier: Optional[QueueNotifier] = None,
+) -> None:
+    """
+    Claim and execute queue records with up to `concurrency` in flight.
+
+    Claiming only happens once a slot is free, so a full pool applies
+    backpressure instead of hoarding locks. When `stop` is set the loop
+    stops claiming and waits for in-flight records to finish.
+
+    With a `notifier`, an idle worker sleeps until Postgres NOTIFYs a newly
+    queued row and only polls every WORKER_SAFETY_POLL_SECONDS as a safety
+    net; if the LISTEN connection drops it falls back to `poll_interval`.
+    """
+    concurrency = max(1, concurrency or settings.WORKER_CONCURRENCY)
+    stop = stop or asyncio.Event()
+    slots = asyncio.Semaphore(concurrency)
+    in_flight: set[asyncio.Task] = set()
+
+    log.info("worker_started", extra={"worker_id": worker_id(), "concurrency": concurrency})
+
+    while not stop.is_set():
+        await slots.acquire()
+        if stop.is_set():
+            slots.release()
+            break
+
+        # We hold one slot; finished-but-not-yet-discarded tasks only make
+        # this estimate conservative, so acquiring the extras never blocks.
+        free = max(1, concurrency - len(in_flight))
+        try:
+            records = await claim_queue_records(free)
         except Exception:
             # Don't crash the worker; avoid tight-looping
-            await asyncio.sleep(poll_interval)
+            log.exception("worker_claim_failed")
+            records = []
+
+        if not records:
+            slots.release()
+            if notifier is not None and await notifier.ensure_connected():
+                await _wait_for_work(stop, settings.WORKER_SAFETY_POLL_SECONDS, notifier.wakeup)
+            else:
+                await _wait_for_work(stop, poll_interval)
+            continue
+
+        for i, record in enumerate(records):
+            if i:
+                await slots.acquire()
+            task = asyncio.create_task(_run_slot(record, slots, in_flight, concurrency))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            log.info(
+                "worker_slot_acquired",
+                extra={
+                    "queue_id": record.get("id"),
+                    "in_flight": len(in_flight),
+                    "concurrency": concurrency,
+                    "utilisation": round(len(in_flight) / concurrency, 2),
+                },
+            )
+
+    if in_flight:
+        log.info("worker_draining", extra={"in_flight": len(in_flight)})
+        await asyncio.gather(*in_flight, return_exceptions=True)
+    log.info("worker_stopped", extra={"worker_id": worker_id()})
+
+
+async def _run() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        # Not supported on Windows event loops.
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+
+    # Disconnects are invalidated in the API process; bound how long this
+    # process keeps using a token that may have been revoked.
+    token_cache.ttl = settings.OAUTH_TOKEN_WORKER_CACHE_TTL_SECONDS
+
+    notifier = QueueNotifier(settings.DATABASE_URL)
+    if not await notifier.start():
+        notifier = None
+
+    # Keeps this process's QuickBooks reference cache in step with webhooks,
+    # and syncs the ledger mirror when it is enabled.
+    sync_task = asyncio.create_task(quickbooks_sync.sync_loop(stop))
+
+    try:
+        await worker_loop(stop=stop, notifier=notifier)
+    finally:
+        stop.set()
+        await sync_task
+        if notifier is not None:
+            await notifier.close()
+        await close_anthropic_client()
+        await aclose_supabase_clients()
+        await close_http_clients()
 
 
 def main() -> None:
-    asyncio.run(worker_loop())
+    asyncio.run(_run())
 
 
 if __name__ == "__main__":
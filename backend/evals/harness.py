@@ -60,7 +60,7 @@ class _FakeMessages:
     def __init__(self, scripted: list[_FakeResponse]):
         self._scripted = list(scripted)
 
-    def create(self, **_):
+    async def create(self, **_):
         if not self._scripted:
             raise AssertionError("Eval ran out of scripted Claude responses.")
         return self._scripted.pop(0)
@@ -98,7 +98,10 @@ class _FakeTable:
         return self
 
     def insert(self, data):
-        self.rows.append(data)
+        if isinstance(data, list):
+            self.rows.extend(data)
+        else:
+            self.rows.append(data)
         return self
 
     def update(self, _data):
@@ -110,7 +113,7 @@ class _FakeTable:
     def single(self):
         return self
 
-    def execute(self):
+    async def execute(self):
         return _FakeResult()
 
 
@@ -150,12 +153,16 @@ def run_case(case: Case, *, monkeypatch=None) -> CaseResult:
     """Execute one case synchronously. Returns a CaseResult."""
     import app.agents.runtime as runtime_mod
 
-    real_anthropic_cls = runtime_mod.anthropic.Anthropic
-    real_get_supabase = runtime_mod.get_supabase
+    real_get_anthropic_client = runtime_mod.get_anthropic_client
+    real_get_supabase = runtime_mod.get_async_supabase
 
     fake_supabase = _FakeSupabase()
-    runtime_mod.anthropic.Anthropic = lambda **_kw: _FakeAnthropic(case.scripted_responses)  # type: ignore
-    runtime_mod.get_supabase = lambda *_a, **_k: fake_supabase  # type: ignore
+    runtime_mod.get_anthropic_client = lambda: _FakeAnthropic(case.scripted_responses)  # type: ignore
+
+    async def get_fake_supabase(*_a, **_k):
+        return fake_supabase
+
+    runtime_mod.get_async_supabase = get_fake_supabase  # type: ignore
 
     try:
         rt = AgentRuntime(agent_type=case.agent, user_id="eval_user")
@@ -211,8 +218,8 @@ def run_case(case: Case, *, monkeypatch=None) -> CaseResult:
             iterations=int(result.get("iterations") or 0),
         )
     finally:
-        runtime_mod.anthropic.Anthropic = real_anthropic_cls  # type: ignore
-        runtime_mod.get_supabase = real_get_supabase  # type: ignore
+        runtime_mod.get_anthropic_client = real_get_anthropic_client  # type: ignore
+        runtime_mod.get_async_supabase = real_get_supabase  # type: ignore
 
 
 def run_suite(cases: list[Case]) -> tuple[int, int, list[CaseResult]]:
@@ -29,17 +29,34 @@ class FakeToolUseBlock:
 
 
 class FakeUsage:
-    def __init__(self, input_tokens: int = 100, output_tokens: int = 50):
+    def __init__(
+        self,
+        input_tokens: int = 100,
+        output_tokens: int = 50,
+        cache_read_input_tokens: int = 0,
+        cache_creation_input_tokens: int = 0,
+    ):
         self.input_tokens = input_tokens
         self.output_tokens = output_tokens
+        self.cache_read_input_tokens = cache_read_input_tokens
+        self.cache_creation_input_tokens = cache_creation_input_tokens
 
 
 def _patch_anthropic_and_supabase(monkeypatch, responses):
     monkeypatch.setattr(
-        "app.agents.runtime.anthropic.Anthropic",
-        lambda api_key=None: FakeAnthropicClient(responses),
+        "app.agents.runtime.get_anthropic_client",
+        lambda: FakeAnthropicClient(responses),
     )
-    monkeypatch.setattr("app.agents.runtime.get_supabase", lambda *_a, **_k: FakeSupabaseClient())
+    monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(FakeSupabaseClient()))
+
+
+def _returns(client):
+    """Stand-in for the async client accessors."""
+
+    async def get_client(*_a, **_k):
+        return client
+
+    return get_client
 
 
 class FakeClaudeResponse:
@@ -52,12 +69,54 @@ class FakeClaudeResponse:
 class FakeClaudeMessages:
     def __init__(self, responses: list):
         self._responses = list(responses)
+        self.calls = []
 
-    def create(self, **kwargs):
+    async def create(self, **kwargs):
+        self.calls.append({**kwargs, "messages": list(kwargs.get("messages", []))})
         if not self._responses:
             raise AssertionError("No more responses")
         return self._responses.pop(0)
 
+    def stream(self, **kwargs):
+        self.calls.append({**kwargs, "messages": list(kwargs.get("messages", []))})
+        if not self._responses:
+            raise AssertionError("No more responses")
+        return FakeStream(self._responses.pop(0), getattr(self, "timeline", None))
+
+
+class FakeStream:
+    """Replays a FakeClaudeResponse as Messages streaming events."""
+
+    def __init__(self, response, timeline=None):
+        self._response = response
+        self._timeline = timeline if timeline is not None else []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        import asyncio
+        from types import SimpleNamespace
+
+        for block in self._response.content:
+            self._timeline.append(f"block:{getattr(block, 'id', 'text')}")
+            yield SimpleNamespace(type="content_block_start", content_block=block)
+            if block.type == "text":
+                for i in range(0, len(block.text), 5):
+                    yield SimpleNamespace(type="text", text=block.text[i : i + 5])
+            yield SimpleNamespace(type="content_block_stop", content_block=block)
+            # Give early-started tools a chance to run mid-stream.
+            await asyncio.sleep(0.01)
+
+    async def get_final_message(self):
+        return self._response
+
 
 class FakeAnthropicClient:
     def __init__(self, responses: list):
@@ -77,7 +136,10 @@ class FakeSupabaseTable:
         return self
 
     def insert(self, data):
-        self.rows.append(data)
+        if isinstance(data, list):
+            self.rows.extend(data)
+        else:
+            self.rows.append(data)
         return self
 
     def update(self, data):
@@ -89,7 +151,7 @@ class FakeSupabaseTable:
     def single(self):
         return self
 
-    def execute(self):
+    async def execute(self):
         return FakeSupabaseResponse(None)
 
 
@@ -116,11 +178,11 @@ class TestAgentRuntimeBasic:
         ]
 
         monkeypatch.setattr(
-            "app.agents.runtime.anthropic.Anthropic", lambda api_key: FakeAnthropicClient(responses)
+            "app.agents.runtime.get_anthropic_client", lambda: FakeAnthropicClient(responses)
         )
 
         fake_sb = FakeSupabaseClient()
-        monkeypatch.setattr("app.agents.runtime.get_supabase", lambda: fake_sb)
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(fake_sb))
 
         runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
         result = await runtime.execute("Categorize my transactions", context={})
@@ -129,16 +191,38 @@ class TestAgentRuntimeBasic:
         assert result["result"] == "Task completed successfully."
         assert result["iterations"] == 1
 
+    @pytest.mark.asyncio
+    async def test_completed_task_records_prompt_version_and_tools_hash(self, monkeypatch):
+        from app.agents.prompts.agent_prompts import PROMPT_VERSION
+        from app.agents.schemas import get_tools_schema_hash
+
+        responses = [FakeClaudeResponse(stop_reason="end_turn", content=[FakeTextBlock("Done")])]
+        _patch_anthropic_and_supabase(monkeypatch, responses)
+        updates = []
+
+        async def update_task(db, task_id, fields):
+            updates.append((task_id, fields))
+
+        monkeypatch.setattr("app.agents.runtime.store.update_task", update_task)
+
+        runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
+        await runtime.execute("Categorize my transactions", context={}, task_id="task_1")
+
+        [(task_id, fields)] = updates
+        assert task_id == "task_1"
+        assert fields["prompt_version"] == PROMPT_VERSION
+        assert fields["tools_hash"] == get_tools_schema_hash(AgentType.BOOKKEEPER)
+
     @pytest.mark.asyncio
     async def test_empty_response_still_succeeds(self, monkeypatch):
         responses = [FakeClaudeResponse(stop_reason="end_turn", content=[FakeTextBlock("")])]
 
         monkeypatch.setattr(
-            "app.agents.runtime.anthropic.Anthropic", lambda api_key: FakeAnthropicClient(responses)
+            "app.agents.runtime.get_anthropic_client", lambda: FakeAnthropicClient(responses)
         )
 
         fake_sb = FakeSupabaseClient()
-        monkeypatch.setattr("app.agents.runtime.get_supabase", lambda: fake_sb)
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(fake_sb))
 
         runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
         result = await runtime.execute("Test task", context={})
@@ -167,11 +251,11 @@ class TestAgentRuntimeToolUse:
         ]
 
         monkeypatch.setattr(
-            "app.agents.runtime.anthropic.Anthropic", lambda api_key: FakeAnthropicClient(responses)
+            "app.agents.runtime.get_anthropic_client", lambda: FakeAnthropicClient(responses)
         )
 
         fake_sb = FakeSupabaseClient()
-        monkeypatch.setattr("app.agents.runtime.get_supabase", lambda: fake_sb)
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(fake_sb))
 
         runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
 
@@ -190,6 +274,136 @@ class TestAgentRuntimeToolUse:
         assert len(tool_calls) == 1
         assert tool_calls[0][0] == "get_transactions"
 
+    @pytest.mark.asyncio
+    async def test_repeated_read_only_call_is_served_from_memo(self, monkeypatch):
+        call = {"account_type": "Expense"}
+        responses = [
+            FakeClaudeResponse("tool_use", [FakeToolUseBlock("t1", "get_accounts", call)]),
+            FakeClaudeResponse("tool_use", [FakeToolUseBlock("t2", "get_accounts", dict(call))]),
+            FakeClaudeResponse("end_turn", [FakeTextBlock("Done.")]),
+        ]
+        monkeypatch.setattr(
+            "app.agents.runtime.get_anthropic_client", lambda: FakeAnthropicClient(responses)
+        )
+        fake_sb = FakeSupabaseClient()
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(fake_sb))
+
+        runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
+        routed = []
+
+        async def route(tool_name, tool_input):
+            routed.append(tool_name)
+            return {"accounts": []}
+
+        runtime.executor._route = route
+
+        await runtime.execute("List expense accounts twice", context={}, task_id="task_1")
+
+        assert routed == ["get_accounts"]
+        results = [
+            e["payload"]
+            for e in fake_sb.table("agent_task_events").rows
+            if e["event_type"] == "tool_result"
+        ]
+        assert [r["cached"] for r in results] == [False, True]
+
+
+class TestAgentRuntimeParallelTools:
+    @pytest.mark.asyncio
+    async def test_tool_calls_in_one_turn_run_concurrently(self, monkeypatch):
+        import asyncio
+
+        responses = [
+            FakeClaudeResponse(
+                stop_reason="tool_use",
+                content=[
+                    FakeTextBlock("Reading three emails."),
+                    FakeToolUseBlock("t1", "get_email_by_id", {"email_id": "a"}),
+                    FakeToolUseBlock("t2", "get_email_by_id", {"email_id": "b"}),
+                    FakeToolUseBlock("t3", "get_email_by_id", {"email_id": "c"}),
+                ],
+            ),
+            FakeClaudeResponse(stop_reason="end_turn", content=[FakeTextBlock("Done.")]),
+        ]
+        client = FakeAnthropicClient(responses)
+        monkeypatch.setattr("app.agents.runtime.get_anthropic_client", lambda: client)
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(FakeSupabaseClient()))
+
+        runtime = AgentRuntime(
+            agent_type=AgentType.INBOX_COMMANDER, user_id="user_123", max_tool_concurrency=2
+        )
+
+        active = 0
+        peak = 0
+
+        async def slow_execute(tool_name, tool_input):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return {"id": tool_input["email_id"]}
+
+        runtime.executor.execute = slow_execute
+
+        result = await runtime.execute("Read my emails", context={})
+
+        assert result["success"] is True
+        assert peak == 2
+
+        followup = client.messages.calls[1]["messages"]
+        assert [m["role"] for m in followup] == ["user", "assistant", "user"]
+        tool_results = followup[2]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == ["t1", "t2", "t3"]
+        assert "'id': 'b'" in tool_results[1]["content"]
+
+    @pytest.mark.asyncio
+    async def test_raising_tool_becomes_an_error_result(self, monkeypatch):
+        import asyncio
+
+        responses = [
+            FakeClaudeResponse(
+                stop_reason="tool_use",
+                content=[
+                    FakeToolUseBlock("t1", "get_email_by_id", {"email_id": "boom"}),
+                    FakeToolUseBlock("t2", "get_email_by_id", {"email_id": "b"}),
+                ],
+            ),
+            FakeClaudeResponse(stop_reason="end_turn", content=[FakeTextBlock("Done.")]),
+        ]
+        client = FakeAnthropicClient(responses)
+        monkeypatch.setattr("app.agents.runtime.get_anthropic_client", lambda: client)
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(FakeSupabaseClient()))
+
+        runtime = AgentRuntime(agent_type=AgentType.INBOX_COMMANDER, user_id="user_123")
+        finished = []
+
+        async def execute(tool_name, tool_input):
+            if tool_input["email_id"] == "boom":
+                raise RuntimeError("connection reset")
+            await asyncio.sleep(0.01)
+            finished.append(tool_input["email_id"])
+            return {"id": tool_input["email_id"]}
+
+        runtime.executor.execute = execute
+
+        result = await runtime.execute("Read my emails", context={})
+
+        assert result["success"] is True
+        assert finished == ["b"]
+        tool_results = client.messages.calls[1]["messages"][2]["content"]
+        assert "connection reset" in tool_results[0]["content"]
+        assert "'id': 'b'" in tool_results[1]["content"]
+
+    def test_tool_concurrency_defaults_from_registry(self, monkeypatch):
+        _patch_anthropic_and_supabase(monkeypatch, [])
+
+        inbox = AgentRuntime(agent_type=AgentType.INBOX_COMMANDER, user_id="user_123")
+        bookkeeper = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
+
+        assert inbox.max_tool_concurrency == 8
+        assert bookkeeper.max_tool_concurrency == 4
+
 
 class TestAgentRuntimeMaxIterations:
     @pytest.mark.asyncio
@@ -202,11 +416,11 @@ class TestAgentRuntimeMaxIterations:
         ]
 
         monkeypatch.setattr(
-            "app.agents.runtime.anthropic.Anthropic", lambda api_key: FakeAnthropicClient(responses)
+            "app.agents.runtime.get_anthropic_client", lambda: FakeAnthropicClient(responses)
         )
 
         fake_sb = FakeSupabaseClient()
-        monkeypatch.setattr("app.agents.runtime.get_supabase", lambda: fake_sb)
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(fake_sb))
 
         runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
 
@@ -260,6 +474,39 @@ class TestAgentRuntimeBudget:
         assert result["failure_code"] == "BUDGET_EXCEEDED"
         assert result["total_tokens"] > 2000
 
+    @pytest.mark.asyncio
+    async def test_cache_heavy_task_still_reaches_the_cap(self, monkeypatch):
+        responses = [
+            FakeClaudeResponse(
+                stop_reason="tool_use",
+                content=[FakeToolUseBlock(f"t{i}", "get_transactions", {})],
+            )
+            for i in range(3)
+        ]
+        # Nearly all input is served from (or written to) the prompt cache.
+        for r in responses:
+            r.usage = FakeUsage(
+                input_tokens=20,
+                output_tokens=30,
+                cache_read_input_tokens=900,
+                cache_creation_input_tokens=100,
+            )
+        _patch_anthropic_and_supabase(monkeypatch, responses)
+
+        runtime = AgentRuntime(
+            agent_type=AgentType.BOOKKEEPER, user_id="user_123", max_tokens_per_task=2000
+        )
+
+        async def fake_execute(tool_name, tool_input):
+            return {"ok": True}
+
+        runtime.executor.execute = fake_execute
+
+        result = await runtime.execute("Cached runaway", context={})
+
+        assert result["failure_code"] == "BUDGET_EXCEEDED"
+        assert result["iterations"] == 2
+
     @pytest.mark.asyncio
     async def test_model_is_configurable(self, monkeypatch):
         responses = [FakeClaudeResponse("end_turn", [FakeTextBlock("done")])]
@@ -274,3 +521,249 @@ class TestAgentRuntimeBudget:
 
         result = await runtime.execute("Hello", context={})
         assert result["success"] is True
+
+
+class TestAgentRuntimeStreaming:
+    @pytest.mark.asyncio
+    async def test_tools_start_before_the_turn_finishes(self, monkeypatch):
+        responses = [
+            FakeClaudeResponse(
+                stop_reason="tool_use",
+                content=[
+                    FakeToolUseBlock("t1", "get_email_by_id", {"email_id": "a"}),
+                    FakeToolUseBlock("t2", "get_email_by_id", {"email_id": "b"}),
+                ],
+            ),
+            FakeClaudeResponse(stop_reason="end_turn", content=[FakeTextBlock("Done.")]),
+        ]
+        client = FakeAnthropicClient(responses)
+        timeline = client.messages.timeline = []
+        fake_sb = FakeSupabaseClient()
+        monkeypatch.setattr("app.agents.runtime.get_anthropic_client", lambda: client)
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(fake_sb))
+
+        runtime = AgentRuntime(
+            agent_type=AgentType.INBOX_COMMANDER, user_id="user_123", streaming=True
+        )
+
+        async def tracking_execute(tool_name, tool_input):
+            timeline.append(f"exec:{tool_input['email_id']}")
+            return {"id": tool_input["email_id"]}
+
+        runtime.executor.execute = tracking_execute
+
+        result = await runtime.execute("Read my emails", context={}, task_id="task_1")
+
+        assert result["success"] is True
+        assert timeline.index("exec:a") < timeline.index("block:t2")
+        assert timeline.count("exec:a") == 1 and timeline.count("exec:b") == 1
+
+        followup = client.messages.calls[1]["messages"]
+        assert [r["tool_use_id"] for r in followup[2]["content"]] == ["t1", "t2"]
+
+        event_types = [e["event_type"] for e in fake_sb.table("agent_task_events").rows]
+        assert event_types.count("tool_use_started") == 2
+
+    @pytest.mark.asyncio
+    async def test_partial_text_is_emitted_while_streaming(self, monkeypatch):
+        text = "x" * 450
+        responses = [FakeClaudeResponse(stop_reason="end_turn", content=[FakeTextBlock(text)])]
+        fake_sb = FakeSupabaseClient()
+        monkeypatch.setattr(
+            "app.agents.runtime.get_anthropic_client", lambda: FakeAnthropicClient(responses)
+        )
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(fake_sb))
+
+        runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123", streaming=True)
+        result = await runtime.execute("Summarize", context={}, task_id="task_1")
+
+        deltas = [
+            e["payload"]["text"]
+            for e in fake_sb.table("agent_task_events").rows
+            if e["event_type"] == "model_text_delta"
+        ]
+        assert result["result"] == text
+        assert len(deltas) == 3
+        assert "".join(deltas) == text
+
+    @pytest.mark.asyncio
+    async def test_early_tools_are_cancelled_if_turn_does_not_end_in_tool_use(self, monkeypatch):
+        import asyncio
+
+        responses = [
+            FakeClaudeResponse(
+                stop_reason="max_tokens",
+                content=[FakeToolUseBlock("t1", "get_email_by_id", {"email_id": "a"})],
+            )
+        ]
+        monkeypatch.setattr(
+            "app.agents.runtime.get_anthropic_client", lambda: FakeAnthropicClient(responses)
+        )
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(FakeSupabaseClient()))
+
+        runtime = AgentRuntime(
+            agent_type=AgentType.INBOX_COMMANDER, user_id="user_123", streaming=True
+        )
+        finished = []
+
+        async def slow_execute(tool_name, tool_input):
+            await asyncio.sleep(0.5)
+            finished.append(tool_name)
+
+        runtime.executor.execute = slow_execute
+
+        result = await runtime.execute("Read", context={})
+        await asyncio.sleep(0)
+
+        assert result["success"] is False
+        assert finished == []
+
+    @pytest.mark.asyncio
+    async def test_write_tools_wait_for_the_final_message(self, monkeypatch):
+        responses = [
+            FakeClaudeResponse(
+                stop_reason="max_tokens",
+                content=[
+                    FakeToolUseBlock("t1", "get_email_by_id", {"email_id": "a"}),
+                    FakeToolUseBlock("t2", "send_email", {"to": "x@example.com"}),
+                ],
+            )
+        ]
+        monkeypatch.setattr(
+            "app.agents.runtime.get_anthropic_client", lambda: FakeAnthropicClient(responses)
+        )
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(FakeSupabaseClient()))
+
+        runtime = AgentRuntime(
+            agent_type=AgentType.INBOX_COMMANDER, user_id="user_123", streaming=True
+        )
+        started = []
+
+        async def tracking_execute(tool_name, tool_input):
+            started.append(tool_name)
+            return {}
+
+        runtime.executor.execute = tracking_execute
+
+        result = await runtime.execute("Reply", context={})
+
+        assert result["success"] is False
+        assert "send_email" not in started
+
+
+class TestAgentRuntimePromptCaching:
+    @pytest.mark.asyncio
+    async def test_system_and_tools_carry_cache_breakpoints(self, monkeypatch):
+        from app.agents.schemas import get_tools_schema
+
+        responses = [FakeClaudeResponse("end_turn", [FakeTextBlock("done")])]
+        client = FakeAnthropicClient(responses)
+        monkeypatch.setattr("app.agents.runtime.get_anthropic_client", lambda: client)
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(FakeSupabaseClient()))
+        monkeypatch.setattr("app.agents.runtime.settings.AGENT_PROMPT_CACHING", True)
+
+        runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
+        await runtime.execute("Hello", context={})
+
+        call = client.messages.calls[0]
+        assert call["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert call["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert all("cache_control" not in t for t in call["tools"][:-1])
+        # The shared schema list must not be mutated.
+        assert all("cache_control" not in t for t in get_tools_schema(AgentType.BOOKKEEPER))
+
+    @pytest.mark.asyncio
+    async def test_caching_can_be_disabled(self, monkeypatch):
+        responses = [FakeClaudeResponse("end_turn", [FakeTextBlock("done")])]
+        client = FakeAnthropicClient(responses)
+        monkeypatch.setattr("app.agents.runtime.get_anthropic_client", lambda: client)
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(FakeSupabaseClient()))
+        monkeypatch.setattr("app.agents.runtime.settings.AGENT_PROMPT_CACHING", False)
+
+        runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
+        await runtime.execute("Hello", context={})
+
+        assert isinstance(client.messages.calls[0]["system"], str)
+
+    @pytest.mark.asyncio
+    async def test_cache_tokens_are_recorded_in_events(self, monkeypatch):
+        response = FakeClaudeResponse("end_turn", [FakeTextBlock("done")])
+        response.usage = FakeUsage(
+            input_tokens=20, cache_read_input_tokens=900, cache_creation_input_tokens=100
+        )
+        fake_sb = FakeSupabaseClient()
+        monkeypatch.setattr(
+            "app.agents.runtime.get_anthropic_client", lambda: FakeAnthropicClient([response])
+        )
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(fake_sb))
+
+        runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
+        await runtime.execute("Hello", context={}, task_id="task_1")
+
+        events = {e["event_type"]: e["payload"] for e in fake_sb.table("agent_task_events").rows}
+        assert events["model_call_completed"]["cache_read_tokens"] == 900
+        assert events["model_call_completed"]["cache_write_tokens"] == 100
+        assert events["task_completed"]["cache_read_tokens"] == 900
+
+
+class TestAgentRuntimeEvents:
+    @pytest.mark.asyncio
+    async def test_events_are_batched_and_flushed_on_completion(self, monkeypatch):
+        responses = [
+            FakeClaudeResponse(
+                stop_reason="tool_use",
+                content=[FakeToolUseBlock("t1", "get_transactions", {})],
+            ),
+            FakeClaudeResponse(stop_reason="end_turn", content=[FakeTextBlock("Done.")]),
+        ]
+        fake_sb = FakeSupabaseClient()
+        inserts = []
+        events_table = fake_sb.table("agent_task_events")
+        original_insert = events_table.insert
+
+        def counting_insert(data):
+            inserts.append(data)
+            return original_insert(data)
+
+        events_table.insert = counting_insert
+        _patch_anthropic_and_supabase(monkeypatch, responses)
+        monkeypatch.setattr("app.agents.runtime.get_async_supabase", _returns(fake_sb))
+
+        runtime = AgentRuntime(agent_type=AgentType.BOOKKEEPER, user_id="user_123")
+
+        async def fake_execute(tool_name, tool_input):
+            return {"ok": True}
+
+        runtime.executor.execute = fake_execute
+
+        await runtime.execute("Go", context={}, task_id="task_1")
+
+        event_types = [e["event_type"] for e in events_table.rows]
+        assert event_types[0] == "task_started"
+        assert event_types[-1] == "task_completed"
+        assert len(inserts) < len(event_types)
+        assert all(e["user_id"] == "user_123" for e in events_table.rows)
+
+
+class TestAnthropicClient:
+    def test_client_is_async_and_shared(self, monkeypatch):
+        import anthropic
+
+        from app.agents import runtime as runtime_mod
+
+        monkeypatch.setattr(runtime_mod, "_anthropic_client", None)
+        first = runtime_mod.get_anthropic_client()
+        second = runtime_mod.get_anthropic_client()
+
+        assert isinstance(first, anthropic.AsyncAnthropic)
+        assert first is second
+
+    @pytest.mark.asyncio
+    async def test_close_resets_shared_client(self, monkeypatch):
+        from app.agents import runtime as runtime_mod
+
+        monkeypatch.setattr(runtime_mod, "_anthropic_client", None)
+        runtime_mod.get_anthropic_client()
+        await runtime_mod.close_anthropic_client()
+
+        assert runtime_mod._anthropic_client is None
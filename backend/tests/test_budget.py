@@ -33,3 +33,13 @@ def test_none_token_counts_are_treated_as_zero():
     b.record(None, None)
     assert b.total_tokens == 0
     assert b.iterations == 1
+
+
+def test_cache_tokens_count_toward_cap():
+    b = TokenBudget(max_tokens=10_000)
+    b.record(100, 50, cache_read_tokens=3_000, cache_write_tokens=1_000)
+    assert b.cache_read_tokens == 3_000
+    assert b.cache_write_tokens == 1_000
+    assert b.total_tokens == 4_150
+    with pytest.raises(BudgetExceeded):
+        b.record(10, 5, cache_read_tokens=6_000)
@@ -102,3 +102,70 @@ class TestEncryptionServiceLazyInit:
         # Creating instance should succeed (lazy init)
         service = EncryptionService()
         assert service is not None
+
+
+class TestDecryptCache:
+    """Tests for the opt-in decrypted-value cache."""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        from app.core.crypto import EncryptionService
+
+        monkeypatch.setattr("app.core.crypto.settings.ENCRYPTION_CACHE_SIZE", 2)
+        monkeypatch.setattr("app.core.crypto.settings.ENCRYPTION_CACHE_TTL_SECONDS", 60)
+        return EncryptionService()
+
+    def _count_decrypts(self, service, monkeypatch):
+        fernet = service._get_fernet()
+        calls = []
+        real = fernet.decrypt
+
+        def counting(token):
+            calls.append(token)
+            return real(token)
+
+        monkeypatch.setattr(fernet, "decrypt", counting)
+        return calls
+
+    def test_repeat_decrypt_hits_cache(self, service, monkeypatch):
+        encrypted = service.encrypt("token")
+        calls = self._count_decrypts(service, monkeypatch)
+
+        assert service.decrypt(encrypted) == "token"
+        assert service.decrypt(encrypted) == "token"
+        assert len(calls) == 1
+
+    def test_disabled_by_default(self, service, monkeypatch):
+        monkeypatch.setattr("app.core.crypto.settings.ENCRYPTION_CACHE_SIZE", 0)
+        encrypted = service.encrypt("token")
+        calls = self._count_decrypts(service, monkeypatch)
+
+        service.decrypt(encrypted)
+        service.decrypt(encrypted)
+
+        assert len(calls) == 2
+
+    def test_evicts_least_recently_used(self, service, monkeypatch):
+        a, b, c = (service.encrypt(v) for v in ("a", "b", "c"))
+        calls = self._count_decrypts(service, monkeypatch)
+
+        service.decrypt_many([a, b, a, c])  # c evicts b
+        service.decrypt(a)
+        service.decrypt(b)
+
+        assert len(calls) == 4
+
+    def test_expired_entries_are_decrypted_again(self, service, monkeypatch):
+        monkeypatch.setattr("app.core.crypto.settings.ENCRYPTION_CACHE_TTL_SECONDS", 0)
+        encrypted = service.encrypt("token")
+        calls = self._count_decrypts(service, monkeypatch)
+
+        service.decrypt(encrypted)
+        service.decrypt(encrypted)
+
+        assert len(calls) == 2
+
+    def test_decrypt_many_preserves_order_and_none(self, service):
+        values = [service.encrypt("x"), None, service.encrypt("y")]
+
+        assert service.decrypt_many(values) == ["x", None, "y"]
@@ -56,3 +56,126 @@ class TestDatabaseClientBehavior:
 
         result = get_supabase()
         assert result == mock_admin_client
+
+
+@pytest.fixture
+def fresh_clients(monkeypatch):
+    """Reset the module-level client caches around each test."""
+    import app.core.database as db
+
+    monkeypatch.setattr(db.settings, "SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setattr(db.settings, "SUPABASE_ANON_KEY", "anon.key.sig")
+    monkeypatch.setattr(db.settings, "SUPABASE_SERVICE_ROLE_KEY", "service.key.sig")
+    db.close_supabase_clients()
+    yield db
+    db.close_supabase_clients()
+
+
+def _fake_user_client():
+    client = MagicMock()
+    client.auth.set_session.return_value = MagicMock(session=None)
+    return client
+
+
+class TestClientCaching:
+    """Clients are built once and reused."""
+
+    def test_admin_client_is_cached(self, fresh_clients):
+        db = fresh_clients
+        with patch.object(db, "_create_client", side_effect=lambda *a, **k: MagicMock()) as create:
+            first = db.get_supabase_admin()
+            second = db.get_supabase()
+
+        assert first is second
+        assert create.call_count == 1
+
+    def test_user_clients_are_cached_per_jwt(self, fresh_clients):
+        db = fresh_clients
+        with patch.object(
+            db, "_create_client", side_effect=lambda *a, **k: _fake_user_client()
+        ) as create:
+            a1 = db.get_supabase_user("jwt-a")
+            a2 = db.get_supabase_user("jwt-a")
+            b = db.get_supabase_user("jwt-b")
+
+        assert a1 is a2
+        assert a1 is not b
+        assert create.call_count == 2
+        a1.auth.set_session.assert_called_once_with("jwt-a", "")
+
+    def test_user_clients_are_evicted_lru(self, fresh_clients, monkeypatch):
+        db = fresh_clients
+        monkeypatch.setattr(db.settings, "SUPABASE_USER_CLIENT_CACHE_SIZE", 2)
+        with patch.object(
+            db, "_create_client", side_effect=lambda *a, **k: _fake_user_client()
+        ) as create:
+            a = db.get_supabase_user("jwt-a")
+            db.get_supabase_user("jwt-b")
+            db.get_supabase_user("jwt-a")  # refresh a; b is now oldest
+            db.get_supabase_user("jwt-c")  # evicts b
+            assert db.get_supabase_user("jwt-a") is a
+            assert create.call_count == 3
+            db.get_supabase_user("jwt-b")
+            assert create.call_count == 4
+
+    def test_user_clients_expire_after_ttl(self, fresh_clients, monkeypatch):
+        db = fresh_clients
+        monkeypatch.setattr(db.settings, "SUPABASE_USER_CLIENT_TTL_SECONDS", 0)
+        with patch.object(db, "_create_client", side_effect=lambda *a, **k: _fake_user_client()):
+            first = db.get_supabase_user("jwt-a")
+            second = db.get_supabase_user("jwt-a")
+
+        assert first is not second
+
+    def test_clients_share_one_connection_pool(self, fresh_clients):
+        db = fresh_clients
+        admin = db.get_supabase_admin()
+        other = db._create_client("other.key.sig")
+
+        transport = admin.postgrest.session._transport
+        assert transport is db._shared_transport()
+        assert other.postgrest.session._transport is transport
+
+    def test_close_resets_caches(self, fresh_clients):
+        db = fresh_clients
+        with patch.object(db, "_create_client", side_effect=lambda *a, **k: MagicMock()):
+            first = db.get_supabase_admin()
+            db.close_supabase_clients()
+            second = db.get_supabase_admin()
+
+        assert first is not second
+
+
+class TestAsyncClientCaching:
+    """Async accessors mirror the sync caching."""
+
+    @pytest.mark.asyncio
+    async def test_async_admin_client_is_cached_and_pooled(self, fresh_clients):
+        db = fresh_clients
+        first = await db.get_async_supabase_admin()
+        second = await db.get_async_supabase()
+
+        assert first is second
+        assert first.postgrest.session._transport is db._shared_async_transport()
+        await db.aclose_supabase_clients()
+        assert db._async_transport is None
+
+    @pytest.mark.asyncio
+    async def test_async_user_clients_are_cached_per_jwt(self, fresh_clients):
+        db = fresh_clients
+
+        async def create(*_a, **_k):
+            client = MagicMock()
+
+            async def set_session(*_args):
+                return MagicMock(session=None)
+
+            client.auth.set_session = set_session
+            return client
+
+        with patch.object(db, "_create_async_client", side_effect=create) as factory:
+            a1 = await db.get_async_supabase_user("jwt-a")
+            a2 = await db.get_async_supabase("jwt-a")
+
+        assert a1 is a2
+        assert factory.call_count == 1
@@ -0,0 +1,436 @@
+"""
+Tests for GmailTools request fan-out and the message cache.
+"""
+
+import asyncio
+
+import pytest
+
+from app.agents.tools import gmail as gmail_mod
+from app.agents.tools.gmail import GmailTools
+
+
+def _message(message_id, subject="Hello", labels=("INBOX",)):
+    return {
+        "id": message_id,
+        "threadId": f"thread-{message_id}",
+        "snippet": "snippet",
+        "labelIds": list(labels),
+        "payload": {"headers": [{"name": "Subject", "value": subject}]},
+    }
+
+
+class FakeGmailApi:
+    """Stands in for GmailTools._make_request and tracks concurrency."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, method, endpoint, params=None, data=None):
+        self.calls.append((method, endpoint, params))
+        if endpoint == "messages":
+            return {"messages": [{"id": i} for i in self.ids]}
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        # Finish in reverse order to prove results keep list order.
+        await asyncio.sleep(0.001 * (len(self.ids) - self.ids.index(endpoint.split("/")[1])))
+        self.in_flight -= 1
+        return _message(endpoint.split("/")[1])
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    monkeypatch.setattr(gmail_mod.settings, "GMAIL_CACHE_ENABLED", False)
+    monkeypatch.setattr(gmail_mod, "_label_cache", {})
+    return GmailTools(user_id="user_1")
+
+
+class TestGetEmails:
+    @pytest.mark.asyncio
+    async def test_hydrates_messages_concurrently_in_order(self, tools, monkeypatch):
+        monkeypatch.setattr(gmail_mod, "GMAIL_FETCH_CONCURRENCY", 4)
+        api = FakeGmailApi([f"m{i}" for i in range(12)])
+        tools._make_request = api
+
+        result = await tools.get_emails(max_results=12)
+
+        assert [e["id"] for e in result["emails"]] == api.ids
+        assert 1 < api.peak <= 4
+
+    @pytest.mark.asyncio
+    async def test_skips_messages_that_fail(self, tools):
+        async def make_request(method, endpoint, params=None, data=None):
+            if endpoint == "messages":
+                return {"messages": [{"id": "ok"}, {"id": "gone"}]}
+            if endpoint.endswith("gone"):
+                return {"error": "Gmail API error: 404"}
+            return _message("ok")
+
+        tools._make_request = make_request
+
+        result = await tools.get_emails()
+
+        assert [e["id"] for e in result["emails"]] == ["ok"]
+
+
+class TestMetadataFormat:
+    @pytest.mark.asyncio
+    async def test_listing_fetches_metadata_only(self, tools):
+        api = FakeGmailApi(["m1", "m2"])
+        tools._make_request = api
+
+        result = await tools.get_emails()
+
+        list_call, *get_calls = api.calls
+        assert list_call[2]["fields"] == gmail_mod.LIST_FIELDS
+        for _method, _endpoint, params in get_calls:
+            assert params["format"] == "metadata"
+            assert params["metadataHeaders"] == gmail_mod.METADATA_HEADERS
+            assert params["fields"] == gmail_mod.METADATA_FIELDS
+        assert all("body" not in email for email in result["emails"])
+        assert result["emails"][0]["subject"] == "Hello"
+
+    @pytest.mark.asyncio
+    async def test_include_body_fetches_full_messages(self, tools):
+        api = FakeGmailApi(["m1"])
+        tools._make_request = api
+
+        result = await tools.get_emails(include_body=True)
+
+        assert api.calls[1][2] is None
+        assert result["emails"][0]["body"] == ""
+
+    @pytest.mark.asyncio
+    async def test_get_email_by_id_returns_decoded_body(self, tools):
+        import base64
+
+        seen = []
+
+        async def make_request(method, endpoint, params=None, data=None):
+            seen.append(params)
+            message = _message("m1")
+            message["payload"]["body"] = {"data": base64.urlsafe_b64encode(b"Hi there").decode()}
+            return message
+
+        tools._make_request = make_request
+
+        result = await tools.get_email_by_id("m1")
+
+        assert seen == [None]
+        assert result["email"]["body"] == "Hi there"
+
+
+class FakeCacheStore:
+    """In-memory stand-in for the gmail_* functions in app.core.store."""
+
+    def __init__(self, history_id=None, messages=None):
+        self.history_id = history_id
+        self.messages = dict(messages or {})
+        self.evicted = []
+
+    async def get_gmail_history_id(self, db, user_id):
+        return self.history_id
+
+    async def save_gmail_history_id(self, db, user_id, history_id):
+        self.history_id = history_id
+
+    async def get_cached_gmail_messages(self, db, user_id, message_ids):
+        return {i: self.messages[i] for i in message_ids if i in self.messages}
+
+    async def cache_gmail_messages(self, db, rows):
+        for row in rows:
+            self.messages[row["message_id"]] = row
+
+    async def evict_gmail_messages(self, db, user_id, message_ids=None):
+        self.evicted.append(message_ids)
+        if message_ids is None:
+            self.messages.clear()
+        for message_id in message_ids or []:
+            self.messages.pop(message_id, None)
+
+
+def _cached(message_id, subject="Cached", has_body=False):
+    email = {"id": message_id, "thread_id": f"thread-{message_id}", "subject": subject}
+    if has_body:
+        email["body"] = "cached body"
+    return {"message_id": message_id, "email": email, "has_body": has_body}
+
+
+@pytest.fixture
+def cache_store(monkeypatch):
+    fake = FakeCacheStore()
+    monkeypatch.setattr(gmail_mod, "store", fake)
+
+    async def get_db():
+        return object()
+
+    monkeypatch.setattr(gmail_mod, "get_async_supabase_admin", get_db)
+    monkeypatch.setattr(gmail_mod.settings, "GMAIL_CACHE_ENABLED", True)
+    return fake
+
+
+class TestMessageCache:
+    @pytest.mark.asyncio
+    async def test_cached_messages_skip_messages_get(self, cache_store):
+        cache_store.history_id = "100"
+        cache_store.messages = {"m1": _cached("m1")}
+        calls = []
+
+        async def make_request(method, endpoint, params=None, data=None):
+            calls.append(endpoint)
+            if endpoint == "history":
+                return {"historyId": "100"}
+            if endpoint == "messages":
+                return {"messages": [{"id": "m1"}, {"id": "m2"}]}
+            return _message(endpoint.split("/")[1])
+
+        tools = GmailTools(user_id="user_1")
+        tools._make_request = make_request
+
+        result = await tools.get_emails()
+
+        assert [e["subject"] for e in result["emails"]] == ["Cached", "Hello"]
+        assert calls == ["messages", "history", "messages/m2"]
+        assert "m2" in cache_store.messages
+
+    @pytest.mark.asyncio
+    async def test_history_evicts_changed_messages(self, cache_store):
+        cache_store.history_id = "100"
+        cache_store.messages = {"m1": _cached("m1"), "m2": _cached("m2")}
+
+        async def make_request(method, endpoint, params=None, data=None):
+            if endpoint == "history":
+                assert params["startHistoryId"] == "100"
+                return {"history": [{"messages": [{"id": "m2"}]}], "historyId": "105"}
+            return _message(endpoint.split("/")[1], subject="Fresh")
+
+        tools = GmailTools(user_id="user_1")
+        tools._make_request = make_request
+
+        result = await tools.get_email_by_id("m2")
+
+        assert cache_store.evicted == [["m2"]]
+        assert cache_store.history_id == "105"
+        assert result["email"]["subject"] == "Fresh"
+        assert set(cache_store.messages) == {"m1", "m2"}
+
+    @pytest.mark.asyncio
+    async def test_expired_history_id_resyncs_from_profile(self, cache_store):
+        cache_store.history_id = "1"
+        cache_store.messages = {"m1": _cached("m1")}
+
+        async def make_request(method, endpoint, params=None, data=None):
+            if endpoint == "history":
+                return {"error": "Gmail API error: 404", "status_code": 404}
+            if endpoint == "profile":
+                return {"historyId": "900"}
+            return _message(endpoint.split("/")[1])
+
+        tools = GmailTools(user_id="user_1")
+        tools._make_request = make_request
+
+        await tools.get_email_by_id("m1")
+
+        assert cache_store.evicted == [None]
+        assert cache_store.history_id == "900"
+
+    @pytest.mark.asyncio
+    async def test_body_requests_skip_metadata_only_rows(self, cache_store):
+        cache_store.history_id = "100"
+        cache_store.messages = {"m1": _cached("m1")}
+        fetched = []
+
+        async def make_request(method, endpoint, params=None, data=None):
+            if endpoint == "history":
+                return {"historyId": "100"}
+            fetched.append(endpoint)
+            return _message("m1")
+
+        tools = GmailTools(user_id="user_1")
+        tools._make_request = make_request
+
+        result = await tools.get_email_by_id("m1")
+
+        assert fetched == ["messages/m1"]
+        assert cache_store.messages["m1"]["has_body"] is True
+        assert "body" in result["email"]
+
+    @pytest.mark.asyncio
+    async def test_modifying_a_message_evicts_it(self, cache_store):
+        cache_store.history_id = "100"
+        cache_store.messages = {"m1": _cached("m1")}
+
+        async def make_request(method, endpoint, params=None, data=None):
+            if endpoint == "history":
+                return {"historyId": "100"}
+            return {"id": "m1"}
+
+        tools = GmailTools(user_id="user_1")
+        tools._make_request = make_request
+        await tools.get_email_by_id("m1")  # syncs the cache
+
+        await tools.mark_as_read("m1")
+
+        assert "m1" not in cache_store.messages
+
+    @pytest.mark.asyncio
+    async def test_fetch_racing_another_sync_skips_stale_writes(self, cache_store):
+        cache_store.history_id = "100"
+
+        async def make_request(method, endpoint, params=None, data=None):
+            if endpoint == "history":
+                return {"historyId": "100"}
+            if endpoint == "messages":
+                return {"messages": [{"id": "m1"}, {"id": "m2"}]}
+            message_id = endpoint.split("/")[1]
+            if message_id == "m2":
+                # Another run replays history (evicting m1) mid-fetch.
+                cache_store.history_id = "110"
+            message = _message(message_id)
+            message["historyId"] = {"m1": "95", "m2": "110"}[message_id]
+            return message
+
+        tools = GmailTools(user_id="user_1")
+        tools._make_request = make_request
+
+        result = await tools.get_emails()
+
+        assert result["count"] == 2
+        assert set(cache_store.messages) == {"m2"}
+
+
+class FakeLabelApi:
+    def __init__(self, labels=None):
+        self.labels = dict(labels or {"Clients": "Label_1"})
+        self.calls = []
+
+    async def __call__(self, method, endpoint, params=None, data=None):
+        self.calls.append((method, endpoint, data))
+        if endpoint == "labels" and method == "GET":
+            return {"labels": [{"id": i, "name": n} for n, i in self.labels.items()]}
+        if endpoint == "labels":
+            label_id = f"Label_{len(self.labels) + 1}"
+            self.labels[data["name"]] = label_id
+            return {"id": label_id, "name": data["name"]}
+        return {"success": True}
+
+
+class TestLabelCache:
+    @pytest.mark.asyncio
+    async def test_label_list_fetched_once_per_user(self, tools):
+        api = FakeLabelApi()
+        tools._make_request = api
+        other = GmailTools(user_id="user_1")
+        other._make_request = api
+
+        for email_id in ("m1", "m2"):
+            await tools.apply_label(email_id, "clients")
+        result = await other.apply_label("m3", "Clients")
+
+        lists = [c for c in api.calls if c[:2] == ("GET", "labels")]
+        assert len(lists) == 1
+        assert result["label_id"] == "Label_1"
+
+    @pytest.mark.asyncio
+    async def test_created_label_is_cached(self, tools):
+        api = FakeLabelApi()
+        tools._make_request = api
+
+        await tools.apply_label("m1", "Invoices")
+        await tools.apply_label("m2", "Invoices")
+
+        creates = [c for c in api.calls if c[:2] == ("POST", "labels")]
+        assert len(creates) == 1
+        assert len([c for c in api.calls if c[:2] == ("GET", "labels")]) == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_refetched(self, tools, monkeypatch):
+        monkeypatch.setattr(gmail_mod.settings, "GMAIL_LABEL_CACHE_TTL_SECONDS", 0)
+        api = FakeLabelApi()
+        tools._make_request = api
+
+        await tools.apply_label("m1", "Clients")
+        await tools.apply_label("m2", "Clients")
+
+        assert len([c for c in api.calls if c[:2] == ("GET", "labels")]) == 2
+
+    @pytest.mark.asyncio
+    async def test_label_named_error_is_not_a_failure(self, tools):
+        api = FakeLabelApi({"Error": "Label_1"})
+        tools._make_request = api
+
+        result = await tools.apply_label("m1", "Error")
+        modified = await tools.bulk_modify(["m2"], remove_labels=["error"])
+
+        assert result["label_id"] == "Label_1"
+        assert modified["status"] == "modified"
+        assert api.calls[-1][2]["removeLabelIds"] == ["Label_1"]
+
+    @pytest.mark.asyncio
+    async def test_label_list_failure_is_returned(self, tools):
+        async def make_request(method, endpoint, params=None, data=None):
+            return {"error": "Gmail API error: 503", "status_code": 503}
+
+        tools._make_request = make_request
+
+        result = await tools.apply_label("m1", "Clients")
+
+        assert result["error"] == "Gmail API error: 503"
+
+
+class TestBulkModify:
+    @pytest.mark.asyncio
+    async def test_archive_and_mark_read_in_one_request(self, tools):
+        api = FakeLabelApi()
+        tools._make_request = api
+        ids = [f"m{i}" for i in range(50)]
+
+        result = await tools.bulk_modify(ids, remove_labels=["INBOX", "unread"])
+
+        assert api.calls == [
+            ("POST", "messages/batchModify", {"ids": ids, "removeLabelIds": ["INBOX", "UNREAD"]})
+        ]
+        assert result["count"] == 50
+
+    @pytest.mark.asyncio
+    async def test_resolves_user_labels(self, tools):
+        api = FakeLabelApi({"Clients": "Label_1", "Old": "Label_9"})
+        tools._make_request = api
+
+        await tools.bulk_modify(
+            ["m1"], add_labels=["clients", "New"], remove_labels=["Old", "Gone"]
+        )
+
+        method, endpoint, data = api.calls[-1]
+        assert endpoint == "messages/batchModify"
+        assert data["addLabelIds"] == ["Label_1", "Label_3"]
+        assert data["removeLabelIds"] == ["Label_9"]
+
+    @pytest.mark.asyncio
+    async def test_chunks_at_batch_limit(self, tools, monkeypatch):
+        monkeypatch.setattr(gmail_mod, "BATCH_MODIFY_LIMIT", 2)
+        api = FakeLabelApi()
+        tools._make_request = api
+
+        await tools.bulk_modify(["a", "b", "c"], remove_labels=["UNREAD"])
+
+        assert [c[2]["ids"] for c in api.calls] == [["a", "b"], ["c"]]
+
+    @pytest.mark.asyncio
+    async def test_unknown_remove_labels_send_nothing(self, tools):
+        api = FakeLabelApi()
+        tools._make_request = api
+
+        result = await tools.bulk_modify(["m1"], remove_labels=["Gone"])
+
+        assert result["status"] == "nothing_to_modify"
+        assert not [c for c in api.calls if c[1] == "messages/batchModify"]
+
+    @pytest.mark.asyncio
+    async def test_requires_a_change(self, tools):
+        result = await tools.bulk_modify(["m1"])
+
+        assert "error" in result
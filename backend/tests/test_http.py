@@ -0,0 +1,47 @@
+"""
+Tests for the shared outbound HTTP client registry.
+"""
+
+import pytest
+
+from app.core import http
+
+
+@pytest.fixture(autouse=True)
+async def _reset_clients():
+    await http.close_http_clients()
+    yield
+    await http.close_http_clients()
+
+
+class TestGetHttpClient:
+    def test_reuses_one_client_per_origin(self):
+        a = http.get_http_client("https://gmail.googleapis.com/gmail/v1/users/me/messages")
+        b = http.get_http_client("https://gmail.googleapis.com/gmail/v1/users/me/labels")
+        c = http.get_http_client("https://www.googleapis.com/calendar/v3/calendars")
+
+        assert a is b
+        assert a is not c
+
+    def test_port_is_part_of_the_origin(self):
+        a = http.get_http_client("http://localhost:8000/x")
+        b = http.get_http_client("http://localhost:9000/x")
+
+        assert a is not b
+
+    def test_client_uses_configured_timeouts(self, monkeypatch):
+        monkeypatch.setattr(http.settings, "HTTP_TIMEOUT_SECONDS", 12.0)
+        monkeypatch.setattr(http.settings, "HTTP_CONNECT_TIMEOUT_SECONDS", 3.0)
+
+        client = http.get_http_client("https://api.example.com/")
+
+        assert client.timeout.read == 12.0
+        assert client.timeout.connect == 3.0
+
+    @pytest.mark.asyncio
+    async def test_close_replaces_clients(self):
+        first = http.get_http_client("https://api.example.com/")
+        await http.close_http_clients()
+
+        assert first.is_closed
+        assert http.get_http_client("https://api.example.com/") is not first
@@ -1,10 +1,12 @@
 """Tests for prompt versioning and system-prompt assembly."""
 
 import re
+from datetime import datetime, timezone
 
 from app.agents.prompts.agent_prompts import (
     AGENT_PROMPTS,
     PROMPT_VERSION,
+    _static_prompt,
     build_system_prompt,
 )
 from app.agents.registry import AgentType
@@ -30,3 +32,26 @@ def test_system_prompt_includes_agent_name_and_guidelines():
 def test_system_prompt_includes_current_utc_time():
     prompt = build_system_prompt(AgentType.BOOKKEEPER)
     assert "UTC" in prompt
+
+
+def test_system_prompt_is_stable_within_the_hour():
+    early = datetime(2026, 10, 17, 14, 1, 2, 345678, tzinfo=timezone.utc)
+    late = datetime(2026, 10, 17, 14, 59, 59, tzinfo=timezone.utc)
+    assert build_system_prompt(AgentType.BOOKKEEPER, now=early) == build_system_prompt(
+        AgentType.BOOKKEEPER, now=late
+    )
+
+
+def test_clock_is_the_trailing_section():
+    now = datetime(2026, 10, 17, 14, 30, tzinfo=timezone.utc)
+    prompt = build_system_prompt(AgentType.BOOKKEEPER, now=now)
+    static = _static_prompt(AgentType.BOOKKEEPER, PROMPT_VERSION)
+
+    assert prompt.startswith(static)
+    assert prompt[len(static) :].strip() == "Current date/hour (UTC): 2026-10-17T14:00Z"
+
+
+def test_static_prompt_is_memoized():
+    assert _static_prompt(AgentType.BOOKKEEPER, PROMPT_VERSION) is _static_prompt(
+        AgentType.BOOKKEEPER, PROMPT_VERSION
+    )
@@ -0,0 +1,524 @@
+"""
+Tests for QuickBooksTools caching, paged and mirrored reads, and bulk review tools.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.agents.tools import quickbooks as qb_mod
+from app.agents.tools.quickbooks import QuickBooksTools, invalidate_reference_data
+
+ACCOUNTS = [
+    {"Id": "1", "Name": "Travel", "AccountType": "Expense", "CurrentBalance": 10},
+    {"Id": "2", "Name": "Checking", "AccountType": "Bank", "CurrentBalance": 500},
+    {"Id": "3", "Name": "Meals", "AccountType": "Expense", "CurrentBalance": 5},
+]
+
+
+class FakeQuickBooksApi:
+    def __init__(self):
+        self.queries = []
+
+    async def __call__(self, method, endpoint, params=None, data=None):
+        query = params["query"]
+        self.queries.append(query)
+        entity = query.split(" FROM ")[1].split()[0]
+        rows = ACCOUNTS if entity == "Account" else [{"Id": "9", "DisplayName": "Acme"}]
+        return {"QueryResponse": {entity: rows}}
+
+
+@pytest.fixture(autouse=True)
+def _reset_cache(monkeypatch):
+    monkeypatch.setattr(qb_mod, "_reference_cache", {})
+
+
+def _tools(api, realm_id="realm_1"):
+    tools = QuickBooksTools(user_id="user_1")
+    tools._client_info = {"realm_id": realm_id, "base_url": "", "access_token": "t"}
+    tools._make_request = api
+    return tools
+
+
+class TestReferenceCache:
+    @pytest.mark.asyncio
+    async def test_accounts_fetched_once_per_realm(self):
+        api = FakeQuickBooksApi()
+
+        expense = await _tools(api).get_accounts(account_type="Expense")
+        bank = await _tools(api).get_accounts(account_type="Bank")
+
+        assert len(api.queries) == 1
+        assert [a["name"] for a in expense["accounts"]] == ["Meals", "Travel"]
+        assert [a["id"] for a in bank["accounts"]] == ["2"]
+
+    @pytest.mark.asyncio
+    async def test_realms_are_cached_separately(self):
+        api = FakeQuickBooksApi()
+
+        await _tools(api, "realm_1").get_accounts()
+        await _tools(api, "realm_2").get_accounts()
+
+        assert len(api.queries) == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_refetched(self, monkeypatch):
+        monkeypatch.setattr(qb_mod.settings, "QUICKBOOKS_REFERENCE_CACHE_TTL_SECONDS", 0)
+        api = FakeQuickBooksApi()
+
+        await _tools(api).get_accounts()
+        await _tools(api).get_accounts()
+
+        assert len(api.queries) == 2
+
+    @pytest.mark.asyncio
+    async def test_categorize_reuses_cached_accounts(self, monkeypatch):
+        api = FakeQuickBooksApi()
+        tools = _tools(api)
+        await tools.get_accounts()
+
+        result = await tools.categorize_transaction("txn_1", "Office Supplies")
+
+        assert len(api.queries) == 1
+        assert "Travel" in result["available_categories"]
+
+    @pytest.mark.asyncio
+    async def test_failed_lookup_returns_error_and_is_not_cached(self):
+        calls = []
+
+        async def failing(method, endpoint, params=None, data=None):
+            calls.append(endpoint)
+            return {"error": "QuickBooks API error: 503"}
+
+        tools = _tools(failing)
+
+        assert await tools.get_vendors() == {"error": "QuickBooks API error: 503"}
+        assert "error" in await tools.get_vendors()
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_webhook_changes_invalidate(self):
+        api = FakeQuickBooksApi()
+        tools = _tools(api)
+        await tools.get_accounts()
+        await tools.get_vendors()
+        await tools.get_customers()
+
+        invalidate_reference_data("realm_1", ["Vendor"])
+        await tools.get_accounts()
+        await tools.get_vendors()
+        await tools.get_customers()
+
+        # Accounts and vendors refetched; customers still cached.
+        assert len(api.queries) == 5
+
+
+def _purchase(i, amount=10.0, account="Travel"):
+    return {
+        "Id": str(i),
+        "TxnDate": "2026-09-01",
+        "TotalAmt": amount,
+        "AccountRef": {"name": account},
+    }
+
+
+class FakePagedApi:
+    """Serves `total` purchases for STARTPOSITION/MAXRESULTS queries."""
+
+    def __init__(self, total, fail_at=None):
+        self.total = total
+        self.fail_at = fail_at
+        self.pages = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, method, endpoint, params=None, data=None):
+        import asyncio
+        import re
+
+        start, size = map(
+            int, re.search(r"STARTPOSITION (\d+) MAXRESULTS (\d+)", params["query"]).groups()
+        )
+        self.pages.append(start)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        if self.fail_at == start:
+            return {"error": "QuickBooks API error: 429"}
+        ids = range(start, min(start + size, self.total + 1))
+        return {"QueryResponse": {"Purchase": [_purchase(i) for i in ids]}}
+
+
+class TestPagedTransactions:
+    @pytest.mark.asyncio
+    async def test_streams_every_page_in_order(self, monkeypatch):
+        monkeypatch.setattr(qb_mod.settings, "QUICKBOOKS_PAGE_PREFETCH", 3)
+        api = FakePagedApi(total=25)
+
+        ids = [t["id"] async for t in _tools(api).iter_transactions("a", "b", page_size=10)]
+
+        assert ids == [str(i) for i in range(1, 26)]
+        assert 1 < api.peak <= 3
+
+    @pytest.mark.asyncio
+    async def test_error_page_raises(self):
+        api = FakePagedApi(total=30, fail_at=11)
+
+        with pytest.raises(qb_mod.QuickBooksAPIError):
+            async for _ in _tools(api).iter_transactions("a", "b", page_size=10):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_get_transactions_reports_truncation(self):
+        api = FakePagedApi(total=500)
+
+        result = await _tools(api).get_transactions("a", "b", max_results=100)
+
+        assert result["count"] == 100
+        assert result["truncated"] is True
+        assert api.pages == [1]
+
+    @pytest.mark.asyncio
+    async def test_get_transactions_clamps_max_results(self, monkeypatch):
+        monkeypatch.setattr(qb_mod, "MAX_TRANSACTIONS_PER_CALL", 20)
+
+        negative = await _tools(FakePagedApi(total=50)).get_transactions("a", "b", max_results=-5)
+        huge = await _tools(FakePagedApi(total=50)).get_transactions("a", "b", max_results=10**6)
+
+        assert (negative["count"], negative["truncated"]) == (1, True)
+        assert (huge["count"], huge["truncated"]) == (20, True)
+
+    @pytest.mark.asyncio
+    async def test_expense_report_covers_all_pages(self, monkeypatch):
+        monkeypatch.setattr(qb_mod.settings, "QUICKBOOKS_PAGE_SIZE", 100)
+        monkeypatch.setattr(qb_mod, "REPORT_TRANSACTIONS_PER_GROUP", 5)
+        api = FakePagedApi(total=350)
+
+        report = await _tools(api).create_expense_report("a", "b")
+
+        assert report["transaction_count"] == 350
+        assert report["total_expenses"] == 3500.0
+        group = report["grouped_data"]["Travel"]
+        assert group["count"] == 350
+        assert len(group["transactions"]) == 5
+
+    @pytest.mark.asyncio
+    async def test_expense_report_returns_api_errors(self):
+        api = FakePagedApi(total=10, fail_at=1)
+
+        report = await _tools(api).create_expense_report("a", "b")
+
+        assert report == {"error": "QuickBooks API error: 429"}
+
+
+class TestFlowTotals:
+    @pytest.mark.asyncio
+    async def test_splits_inflows_and_outflows(self):
+        async def stream():
+            for amount in (10, -4, 6, -1):
+                yield {"amount": amount}
+
+        totals = await qb_mod.flow_totals(stream())
+
+        assert totals == {"inflow": 5.0, "inflow_count": 2, "outflow": 16.0, "outflow_count": 2}
+
+
+class FakeLedgerStore:
+    def __init__(self, rows, backfilled=True, synced_minutes_ago=1):
+        self.rows = rows
+        self.backfilled = backfilled
+        self.synced_through = datetime.now(timezone.utc) - timedelta(minutes=synced_minutes_ago)
+        self.calls = []
+
+    async def get_quickbooks_sync_state(self, db, realm_id):
+        if not self.backfilled:
+            return None
+        return {
+            "backfilled_at": "2026-10-17T00:00:00+00:00",
+            "synced_through": self.synced_through.isoformat(),
+        }
+
+    async def list_ledger_rows(self, db, realm_id, entity_type, *, offset, limit, **filters):
+        self.calls.append((entity_type, offset, filters))
+        rows = [r for r in self.rows if r["entity_type"] == entity_type]
+        return [{"entity_id": r["Id"], "data": r} for r in rows[offset : offset + limit]]
+
+
+class TestLedgerMirror:
+    @pytest.fixture
+    def ledger(self, monkeypatch):
+        monkeypatch.setattr(qb_mod.settings, "QUICKBOOKS_MIRROR_ENABLED", True)
+
+        async def get_db():
+            return object()
+
+        monkeypatch.setattr(qb_mod, "get_async_supabase_admin", get_db)
+
+        def install(rows, **state):
+            fake = FakeLedgerStore(rows, **state)
+            monkeypatch.setattr(qb_mod, "store", fake)
+            return fake
+
+        return install
+
+    @pytest.mark.asyncio
+    async def test_transactions_are_read_from_the_mirror(self, ledger):
+        fake = ledger([{**_purchase(i), "entity_type": "Purchase"} for i in range(5)])
+        api = FakePagedApi(total=0)
+
+        ids = [
+            t["id"]
+            async for t in _tools(api).iter_transactions("2026-09-01", "2026-09-30", page_size=2)
+        ]
+
+        assert ids == ["0", "1", "2", "3", "4"]
+        assert api.pages == []
+        assert [offset for _, offset, _ in fake.calls] == [0, 2, 4]
+        assert fake.calls[0][2]["start_date"] == "2026-09-01"
+        assert fake.calls[0][2]["desc"] is True
+
+    @pytest.mark.asyncio
+    async def test_open_balances_and_accounts_use_the_mirror(self, ledger):
+        fake = ledger(
+            [
+                {"Id": "i1", "Balance": 10, "entity_type": "Invoice"},
+                {"Id": "a1", "Name": "Checking", "AccountType": "Bank", "entity_type": "Account"},
+            ]
+        )
+        api = FakeQuickBooksApi()
+        tools = _tools(api)
+
+        invoices = await tools.open_balances("Invoice")
+        accounts = await tools.get_accounts(account_type="Bank")
+
+        assert [r["Id"] for r in invoices["rows"]] == ["i1"]
+        assert [a["id"] for a in accounts["accounts"]] == ["a1"]
+        assert api.queries == []
+        assert fake.calls[0][2] == {"open_only": True, "order": "due_date"}
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_api_until_backfilled(self, ledger):
+        ledger([], backfilled=False)
+        api = FakeQuickBooksApi()
+
+        await _tools(api).get_accounts()
+
+        assert len(api.queries) == 1
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_api_when_mirror_is_stale(self, ledger, monkeypatch):
+        monkeypatch.setattr(qb_mod.settings, "QUICKBOOKS_MIRROR_MAX_STALENESS_SECONDS", 900)
+        fake = ledger([], synced_minutes_ago=60)
+        api = FakeQuickBooksApi()
+
+        await _tools(api).get_accounts()
+
+        assert len(api.queries) == 1
+        assert fake.calls == []
+
+
+class FakeReviewStore:
+    def __init__(self, approved=()):
+        self.approved = list(approved)
+        self.inserts = []
+        self.updates = []
+
+    async def insert_pending_categorizations(self, db, rows):
+        self.inserts.append(("pending_categorizations", rows))
+        return rows
+
+    async def insert_flagged_transactions(self, db, rows):
+        self.inserts.append(("flagged_transactions", rows))
+        return [{**row, "id": f"f{i}"} for i, row in enumerate(rows)]
+
+    async def list_pending_categorizations(self, db, user_id, status, limit=1000):
+        return self.approved if status == "approved" else []
+
+    async def update_pending_categorizations(self, db, ids, fields):
+        if ids:
+            self.updates.append((sorted(ids), fields["status"]))
+
+
+def _expense(txn_id, account="Travel"):
+    return {
+        "Id": txn_id,
+        "SyncToken": "3",
+        "Line": [
+            {
+                "Amount": 10,
+                "DetailType": "AccountBasedExpenseLineDetail",
+                "AccountBasedExpenseLineDetail": {"AccountRef": {"value": "1", "name": account}},
+            }
+        ],
+    }
+
+
+class FakeBatchApi(FakeQuickBooksApi):
+    def __init__(self, purchases, faults=()):
+        super().__init__()
+        self.purchases = purchases
+        self.faults = set(faults)
+        self.batches = []
+
+    async def __call__(self, method, endpoint, params=None, data=None):
+        if endpoint == "batch":
+            items = data["BatchItemRequest"]
+            self.batches.append(items)
+            return {
+                "BatchItemResponse": [
+                    {"bId": i["bId"], "Fault": {"Error": [{"Message": "Stale object"}]}}
+                    if i["bId"] in self.faults
+                    else {"bId": i["bId"], "Purchase": i["Purchase"]}
+                    for i in items
+                ]
+            }
+        if "FROM Purchase" in params["query"]:
+            self.queries.append(params["query"])
+            return {"QueryResponse": {"Purchase": self.purchases}}
+        return await super().__call__(method, endpoint, params, data)
+
+
+class TestBulkReview:
+    @pytest.fixture
+    def review_store(self, monkeypatch):
+        async def get_db():
+            return object()
+
+        monkeypatch.setattr(qb_mod, "get_async_supabase_admin", get_db)
+
+        def install(approved=()):
+            fake = FakeReviewStore(approved)
+            monkeypatch.setattr(qb_mod, "store", fake)
+            return fake
+
+        return install
+
+    @pytest.mark.asyncio
+    async def test_categorize_bulk_uses_one_lookup_and_one_insert(self, review_store):
+        fake = review_store()
+        api = FakeQuickBooksApi()
+
+        result = await _tools(api).categorize_transactions_bulk(
+            [
+                {"transaction_id": "t1", "category": "travel", "memo": "Flight"},
+                {"transaction_id": "t2", "category": "Meals"},
+                {"transaction_id": "t3", "category": "Rent"},
+            ]
+        )
+
+        assert len(api.queries) == 1
+        [(table, rows)] = fake.inserts
+        assert table == "pending_categorizations"
+        assert [(r["transaction_id"], r["account_id"]) for r in rows] == [("t1", "1"), ("t2", "3")]
+        assert rows[0]["new_category"] == "Travel"
+        assert result["queued"] == 2
+        assert result["not_found"] == [{"transaction_id": "t3", "category": "Rent"}]
+
+    @pytest.mark.asyncio
+    async def test_categorize_bulk_skips_duplicate_transactions(self, review_store):
+        fake = review_store()
+
+        result = await _tools(FakeQuickBooksApi()).categorize_transactions_bulk(
+            [
+                {"transaction_id": "t1", "category": "Travel"},
+                {"transaction_id": "t1", "category": "Meals"},
+            ]
+        )
+
+        [(_, rows)] = fake.inserts
+        assert [r["new_category"] for r in rows] == ["Travel"]
+        assert result["duplicates_skipped"] == ["t1"]
+
+    @pytest.mark.asyncio
+    async def test_flag_bulk_inserts_once(self, review_store):
+        fake = review_store()
+
+        result = await _tools(FakeQuickBooksApi()).flag_transactions_bulk(
+            [
+                {"transaction_id": "t1", "reason": "Duplicate"},
+                {"transaction_id": "t2", "reason": "Large", "suggested_action": "Check receipt"},
+            ]
+        )
+
+        [(table, rows)] = fake.inserts
+        assert table == "flagged_transactions"
+        assert [r["transaction_id"] for r in rows] == ["t1", "t2"]
+        assert result["flag_ids"] == ["f0", "f1"]
+
+    @pytest.mark.asyncio
+    async def test_apply_approved_uses_batch_requests(self, review_store):
+        approved = [
+            {"id": f"c{i}", "transaction_id": str(i), "account_id": "3", "new_category": "Meals"}
+            for i in range(35)
+        ]
+        fake = review_store(approved)
+        api = FakeBatchApi([_expense(str(i)) for i in range(35)])
+
+        result = await _tools(api).apply_approved_categorizations()
+
+        assert [len(batch) for batch in api.batches] == [30, 5]
+        update = api.batches[0][0]
+        assert update["operation"] == "update"
+        assert update["Purchase"]["SyncToken"] == "3"
+        line = update["Purchase"]["Line"][0]["AccountBasedExpenseLineDetail"]
+        assert line["AccountRef"] == {"value": "3", "name": "Meals"}
+        assert result["applied"] == 35
+        assert fake.updates == [(sorted(r["id"] for r in approved), "applied")]
+
+    @pytest.mark.asyncio
+    async def test_apply_approved_reports_faults_and_missing(self, review_store):
+        approved = [
+            {"id": "c1", "transaction_id": "1", "account_id": "3", "new_category": "Meals"},
+            {"id": "c2", "transaction_id": "2", "account_id": "3", "new_category": "Meals"},
+            {"id": "c3", "transaction_id": "3", "account_id": "1", "new_category": "Travel"},
+            {"id": "c4", "transaction_id": "1", "account_id": "1", "new_category": "Travel"},
+        ]
+        fake = review_store(approved)
+        api = FakeBatchApi([_expense("1"), _expense("2")], faults={"2"})
+
+        result = await _tools(api).apply_approved_categorizations()
+
+        # The later categorization of transaction 1 wins.
+        [batch] = api.batches
+        assert (
+            batch[0]["Purchase"]["Line"][0]["AccountBasedExpenseLineDetail"]["AccountRef"]["value"]
+            == "1"
+        )
+        assert result["applied"] == 2
+        assert result["failed"] == [
+            {"transaction_id": "2", "error": "Stale object"},
+            {"transaction_id": "3", "error": "Transaction not found"},
+        ]
+        assert fake.updates == [(["c1", "c4"], "applied"), (["c2", "c3"], "failed")]
+
+    @pytest.mark.asyncio
+    async def test_apply_refuses_split_purchases(self, review_store):
+        approved = [{"id": "c1", "transaction_id": "1", "account_id": "3", "new_category": "Meals"}]
+        fake = review_store(approved)
+        split = _expense("1")
+        split["Line"].append(
+            {
+                "Amount": 4,
+                "DetailType": "AccountBasedExpenseLineDetail",
+                "AccountBasedExpenseLineDetail": {"AccountRef": {"value": "7", "name": "Rent"}},
+            }
+        )
+        api = FakeBatchApi([split])
+
+        result = await _tools(api).apply_approved_categorizations()
+
+        assert api.batches == []
+        assert result["applied"] == 0
+        assert "single expense line" in result["failed"][0]["error"]
+        assert fake.updates == [(["c1"], "failed")]
+
+    @pytest.mark.asyncio
+    async def test_apply_with_nothing_approved_makes_no_requests(self, review_store):
+        review_store()
+        api = FakeBatchApi([])
+
+        result = await _tools(api).apply_approved_categorizations()
+
+        assert result["applied"] == 0
+        assert api.batches == [] and api.queries == []
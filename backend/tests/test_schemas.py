@@ -0,0 +1,46 @@
+"""Tests for the compiled tool-schema registry."""
+
+import json
+
+import pytest
+
+from app.agents.registry import AgentType
+from app.agents.schemas import (
+    COMPILED_SCHEMAS,
+    SCHEMA_REGISTRY,
+    get_compiled_schemas,
+    get_tools_schema,
+    get_tools_schema_hash,
+)
+
+
+def test_every_agent_is_compiled():
+    for agent_type in SCHEMA_REGISTRY:
+        assert agent_type in COMPILED_SCHEMAS
+
+
+def test_compiled_tools_match_factory_output():
+    compiled = get_compiled_schemas(AgentType.BOOKKEEPER)
+    assert json.loads(json.dumps(compiled.tools)) == SCHEMA_REGISTRY[AgentType.BOOKKEEPER]()
+
+
+def test_schemas_are_not_rebuilt_per_call():
+    first = get_tools_schema(AgentType.INBOX_COMMANDER)
+    second = get_tools_schema(AgentType.INBOX_COMMANDER)
+    assert all(a is b for a, b in zip(first, second))
+
+
+def test_compiled_schemas_are_immutable():
+    tool = get_tools_schema(AgentType.BOOKKEEPER)[0]
+    with pytest.raises(TypeError):
+        tool["name"] = "hijacked"
+    with pytest.raises(TypeError):
+        tool["input_schema"]["properties"].pop("start_date")
+    assert isinstance(tool["input_schema"]["required"], tuple)
+
+
+def test_hash_is_stable_and_per_agent():
+    bookkeeper = get_tools_schema_hash(AgentType.BOOKKEEPER)
+    assert bookkeeper == get_tools_schema_hash(AgentType.BOOKKEEPER)
+    assert len(bookkeeper) == 64
+    assert bookkeeper != get_tools_schema_hash(AgentType.INBOX_COMMANDER)
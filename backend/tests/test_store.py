@@ -0,0 +1,179 @@
+"""
+Tests for the async data-access layer.
+"""
+
+import pytest
+
+from app.core import store
+
+
+class FakeResponse:
+    def __init__(self, data=None):
+        self.data = data
+
+
+class FakeQuery:
+    """Records the PostgREST call chain and replays canned rows."""
+
+    def __init__(self, client, table):
+        self._client = client
+        self.table = table
+        self.calls = []
+
+    def __getattr__(self, name):
+        def step(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return step
+
+    async def execute(self):
+        self._client.executed.append(self)
+        return FakeResponse(self._client.rows.get(self.table))
+
+
+class FakeAsyncClient:
+    def __init__(self, rows=None):
+        self.rows = rows or {}
+        self.executed = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        query = FakeQuery(self, f"rpc:{name}")
+        query.calls.append(("rpc", (name, params), {}))
+        return query
+
+
+class TestTasks:
+    @pytest.mark.asyncio
+    async def test_get_task_returns_row_or_none(self):
+        db = FakeAsyncClient({"agent_tasks": [{"id": "t1"}]})
+        assert await store.get_task(db, "t1") == {"id": "t1"}
+
+        assert await store.get_task(FakeAsyncClient({"agent_tasks": []}), "t1") is None
+
+    @pytest.mark.asyncio
+    async def test_list_tasks_filters_by_status(self):
+        db = FakeAsyncClient({"agent_tasks": [{"id": "t1"}]})
+
+        rows = await store.list_tasks(db, status="awaiting_approval")
+
+        assert rows == [{"id": "t1"}]
+        assert ("eq", ("status", "awaiting_approval"), {}) in db.executed[0].calls
+
+    @pytest.mark.asyncio
+    async def test_enqueue_task_defaults_to_queued(self):
+        db = FakeAsyncClient()
+
+        await store.enqueue_task(db, "t1", created_at="now")
+
+        query = db.executed[0]
+        assert query.table == "agent_task_queue"
+        assert query.calls[0] == (
+            "insert",
+            ({"task_id": "t1", "status": "queued", "created_at": "now"},),
+            {},
+        )
+
+
+class TestQueueAndEvents:
+    @pytest.mark.asyncio
+    async def test_claim_queue_records_calls_rpc(self):
+        db = FakeAsyncClient({"rpc:claim_tasks": [{"id": "q1"}]})
+
+        rows = await store.claim_queue_records(db, "w1", 3, "600 seconds")
+
+        assert rows == [{"id": "q1"}]
+        assert db.executed[0].calls[0][1] == (
+            "claim_tasks",
+            {"p_worker_id": "w1", "p_limit": 3, "p_stale_after": "600 seconds"},
+        )
+
+    @pytest.mark.asyncio
+    async def test_insert_task_events_skips_empty_batches(self):
+        db = FakeAsyncClient()
+
+        await store.insert_task_events(db, [])
+        assert db.executed == []
+
+        await store.insert_task_events(db, [{"event_type": "a"}, {"event_type": "b"}])
+        assert len(db.executed) == 1
+
+
+class TestIntegrations:
+    @pytest.mark.asyncio
+    async def test_save_integration_upserts_on_user_and_type(self):
+        db = FakeAsyncClient()
+        row = {"user_id": "u1", "integration_type": "gmail", "status": "active"}
+
+        await store.save_integration(db, row)
+
+        assert db.executed[0].calls == [
+            ("upsert", (row,), {"on_conflict": "user_id,integration_type"})
+        ]
+
+    @pytest.mark.asyncio
+    async def test_update_integration_scopes_to_user_when_given(self):
+        db = FakeAsyncClient()
+
+        await store.update_integration(db, "gmail", {"status": "expired"}, user_id="u1")
+        await store.update_integration(db, "gmail", {"status": "disconnected"})
+
+        admin_calls, rls_calls = db.executed[0].calls, db.executed[1].calls
+        assert ("eq", ("user_id", "u1"), {}) in admin_calls
+        assert all(call[1][0] != "user_id" for call in rls_calls if call[0] == "eq")
+
+    @pytest.mark.asyncio
+    async def test_pop_oauth_state_deletes_and_returns_row(self):
+        db = FakeAsyncClient({"oauth_states": [{"state": "s1", "user_id": "u1"}]})
+
+        row = await store.pop_oauth_state(db, "s1")
+
+        assert row == {"state": "s1", "user_id": "u1"}
+        assert db.executed[0].calls[0][0] == "delete"
+
+
+class TestWebhookWrites:
+    @pytest.mark.asyncio
+    async def test_get_user_by_stripe_customer_returns_row_or_none(self):
+        db = FakeAsyncClient({"users": [{"id": "u1", "email": "a@b.c"}]})
+        assert await store.get_user_by_stripe_customer(db, "cus_1") == {
+            "id": "u1",
+            "email": "a@b.c",
+        }
+        assert ("eq", ("stripe_customer_id", "cus_1"), {}) in db.executed[0].calls
+
+        assert await store.get_user_by_stripe_customer(FakeAsyncClient(), "cus_1") is None
+
+    @pytest.mark.asyncio
+    async def test_cancel_subscriptions_only_touches_active_rows(self):
+        db = FakeAsyncClient()
+
+        await store.cancel_subscriptions(db, "u1")
+
+        calls = db.executed[0].calls
+        assert calls[0] == ("update", ({"status": "cancelled"},), {})
+        assert ("eq", ("status", "active"), {}) in calls
+
+    @pytest.mark.asyncio
+    async def test_insert_webhook_events_batches_and_skips_empty(self):
+        db = FakeAsyncClient()
+
+        await store.insert_webhook_events(db, [])
+        assert db.executed == []
+
+        await store.insert_webhook_events(db, [{"entity_id": "1"}, {"entity_id": "2"}])
+        assert len(db.executed) == 1
+
+    @pytest.mark.asyncio
+    async def test_list_webhook_events_since_includes_processed_rows(self):
+        db = FakeAsyncClient({"webhook_events": [{"realm_id": "r1", "entity_type": "Vendor"}]})
+
+        rows = await store.list_webhook_events_since(db, "quickbooks", "2026-10-17T00:00:00")
+
+        calls = db.executed[0].calls
+        assert rows == [{"realm_id": "r1", "entity_type": "Vendor"}]
+        assert ("gte", ("created_at", "2026-10-17T00:00:00"), {}) in calls
+        assert all(call[1][0] != "processed" for call in calls if call[0] == "eq")
@@ -0,0 +1,95 @@
+"""Tests for the buffered agent_task_events writer."""
+
+import asyncio
+
+import pytest
+
+from app.agents.events import TaskEventSink
+
+
+class FakeInsert:
+    def __init__(self, client, rows):
+        self._client = client
+        self._rows = rows
+
+    async def execute(self):
+        if self._client.fail:
+            raise RuntimeError("supabase down")
+        self._client.batches.append(list(self._rows))
+
+
+class FakeTable:
+    def __init__(self, client):
+        self._client = client
+
+    def insert(self, rows):
+        return FakeInsert(self._client, rows)
+
+
+def _returns(client):
+    async def get_client():
+        return client
+
+    return get_client
+
+
+class FakeClient:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def table(self, name):
+        assert name == "agent_task_events"
+        return FakeTable(self)
+
+
+@pytest.mark.asyncio
+async def test_close_writes_buffered_events_as_one_insert():
+    client = FakeClient()
+    sink = TaskEventSink("t1", "u1", _returns(client), max_batch=50, flush_interval=60)
+
+    for i in range(3):
+        sink.emit("tool_called", {"i": i})
+    assert client.batches == []
+
+    await sink.close()
+
+    assert len(client.batches) == 1
+    assert [row["payload"]["i"] for row in client.batches[0]] == [0, 1, 2]
+    assert all(row["task_id"] == "t1" and row["user_id"] == "u1" for row in client.batches[0])
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_batch_is_full():
+    client = FakeClient()
+    sink = TaskEventSink("t1", "u1", _returns(client), max_batch=2, flush_interval=60)
+
+    sink.emit("a")
+    sink.emit("b")
+    sink.emit("c")
+    await asyncio.sleep(0.05)
+
+    # Events emitted before the background flush runs ride along with it.
+    assert [[r["event_type"] for r in batch] for batch in client.batches] == [["a", "b", "c"]]
+    await sink.close()
+    assert len(client.batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_flushes_after_interval():
+    client = FakeClient()
+    sink = TaskEventSink("t1", "u1", _returns(client), max_batch=50, flush_interval=0.01)
+
+    sink.emit("task_started")
+    await asyncio.sleep(0.1)
+
+    assert len(client.batches) == 1
+    await sink.close()
+    assert len(client.batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_swallowed():
+    sink = TaskEventSink("t1", "u1", _returns(FakeClient(fail=True)))
+    sink.emit("task_started")
+    await sink.close()  # must not raise
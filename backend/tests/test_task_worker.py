@@ -2,13 +2,17 @@
 Tests for the task worker.
 """
 
+import asyncio
+
 import pytest
 from datetime import datetime, timezone
 
 from app.workers.task_worker import (
     claim_next_queue_record,
+    claim_queue_records,
     process_queue_record,
     worker_id,
+    worker_loop,
 )
 from app.agents.registry import AgentType
 
@@ -59,7 +63,7 @@ class FakeSupabaseQuery:
         self._single = True
         return self
 
-    def execute(self):
+    async def execute(self):
         if self._operation == "insert":
             self._table.rows.append(dict(self._payload))
             return FakeSupabaseResponse(self._payload)
@@ -91,9 +95,38 @@ class FakeSupabaseTable:
         return FakeSupabaseQuery(self, "update").update(data)
 
 
+class FakeRpcCall:
+    def __init__(self, client, name, params):
+        self._client = client
+        self._name = name
+        self._params = params
+
+    async def execute(self):
+        self._client.rpc_calls.append((self._name, self._params))
+        if self._name != "claim_tasks":
+            return FakeSupabaseResponse(None)
+        # Mimic the SQL function: claim queued rows in order, up to the limit.
+        queue = self._client.table("agent_task_queue").rows
+        claimed = []
+        for row in queue:
+            if len(claimed) >= self._params["p_limit"]:
+                break
+            if row.get("status") == "queued" and row.get("locked_at") is None:
+                row.update(
+                    {
+                        "status": "processing",
+                        "locked_at": datetime.now(timezone.utc).isoformat(),
+                        "locked_by": self._params["p_worker_id"],
+                    }
+                )
+                claimed.append(dict(row))
+        return FakeSupabaseResponse(claimed)
+
+
 class FakeSupabaseClient:
     def __init__(self, tables=None):
         self._tables = {}
+        self.rpc_calls = []
         if tables:
             for name, rows in tables.items():
                 self._tables[name] = FakeSupabaseTable(list(rows))
@@ -103,6 +136,18 @@ class FakeSupabaseClient:
             self._tables[name] = FakeSupabaseTable()
         return self._tables[name]
 
+    def rpc(self, name, params):
+        return FakeRpcCall(self, name, params)
+
+
+def _returns(client):
+    """Stand-in for get_async_supabase_admin."""
+
+    async def get_client():
+        return client
+
+    return get_client
+
 
 # === Tests ===
 
@@ -121,11 +166,39 @@ class TestClaimQueueRecord:
     @pytest.mark.asyncio
     async def test_claim_returns_none_when_empty(self, monkeypatch):
         fake_sb = FakeSupabaseClient({"agent_task_queue": []})
-        monkeypatch.setattr("app.workers.task_worker.get_supabase_admin", lambda: fake_sb)
+        monkeypatch.setattr("app.workers.task_worker.get_async_supabase_admin", _returns(fake_sb))
 
         record = await claim_next_queue_record()
         assert record is None
 
+    @pytest.mark.asyncio
+    async def test_claim_uses_single_rpc_round_trip(self, monkeypatch):
+        queue = [
+            {"id": "q1", "status": "queued", "locked_at": None},
+            {"id": "q2", "status": "queued", "locked_at": None},
+            {"id": "q3", "status": "processing", "locked_at": "2026-01-01T00:00:00+00:00"},
+            {"id": "q4", "status": "queued", "locked_at": None},
+        ]
+        fake_sb = FakeSupabaseClient({"agent_task_queue": queue})
+        monkeypatch.setattr("app.workers.task_worker.get_async_supabase_admin", _returns(fake_sb))
+
+        records = await claim_queue_records(2)
+
+        assert [r["id"] for r in records] == ["q1", "q2"]
+        assert all(r["locked_by"] == worker_id() for r in records)
+        assert len(fake_sb.rpc_calls) == 1
+        name, params = fake_sb.rpc_calls[0]
+        assert name == "claim_tasks"
+        assert params["p_limit"] == 2
+
+    @pytest.mark.asyncio
+    async def test_claim_with_zero_limit_skips_rpc(self, monkeypatch):
+        fake_sb = FakeSupabaseClient({"agent_task_queue": []})
+        monkeypatch.setattr("app.workers.task_worker.get_async_supabase_admin", _returns(fake_sb))
+
+        assert await claim_queue_records(0) == []
+        assert fake_sb.rpc_calls == []
+
 
 class TestProcessQueueRecord:
     @pytest.mark.asyncio
@@ -133,7 +206,7 @@ class TestProcessQueueRecord:
         queue_record = {"id": "q1", "task_id": None, "status": "processing"}
 
         fake_sb = FakeSupabaseClient({"agent_task_queue": [queue_record], "agent_tasks": []})
-        monkeypatch.setattr("app.workers.task_worker.get_supabase_admin", lambda: fake_sb)
+        monkeypatch.setattr("app.workers.task_worker.get_async_supabase_admin", _returns(fake_sb))
 
         await process_queue_record(queue_record)
 
@@ -145,7 +218,7 @@ class TestProcessQueueRecord:
         queue_record = {"id": "q1", "task_id": "t_nonexistent", "status": "processing"}
 
         fake_sb = FakeSupabaseClient({"agent_task_queue": [queue_record], "agent_tasks": []})
-        monkeypatch.setattr("app.workers.task_worker.get_supabase_admin", lambda: fake_sb)
+        monkeypatch.setattr("app.workers.task_worker.get_async_supabase_admin", _returns(fake_sb))
 
         await process_queue_record(queue_record)
 
@@ -178,7 +251,7 @@ class TestProcessQueueRecord:
                 "agent_task_events": [],
             }
         )
-        monkeypatch.setattr("app.workers.task_worker.get_supabase_admin", lambda: fake_sb)
+        monkeypatch.setattr("app.workers.task_worker.get_async_supabase_admin", _returns(fake_sb))
 
         class FakeRuntime:
             def __init__(self, agent_type, user_id):
@@ -222,10 +295,118 @@ class TestProcessQueueRecord:
                 "agent_task_events": [],
             }
         )
-        monkeypatch.setattr("app.workers.task_worker.get_supabase_admin", lambda: fake_sb)
+        monkeypatch.setattr("app.workers.task_worker.get_async_supabase_admin", _returns(fake_sb))
 
         await process_queue_record(queue_record)
 
         t = fake_sb.table("agent_tasks").rows[0]
         assert t["status"] == "failed"
         assert t["failure_code"] == "UNKNOWN_AGENT"
+
+
+class TestWorkerLoopConcurrency:
+    @pytest.mark.asyncio
+    async def test_runs_up_to_concurrency_records_at_once(self, monkeypatch):
+        pending = [{"id": f"q{i}"} for i in range(6)]
+        stop = asyncio.Event()
+        active = 0
+        peak = 0
+        done = []
+
+        async def fake_claim(limit=1):
+            claimed = pending[:limit]
+            del pending[:limit]
+            return claimed
+
+        async def fake_process(record):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            done.append(record["id"])
+            if len(done) == 6:
+                stop.set()
+
+        monkeypatch.setattr("app.workers.task_worker.claim_queue_records", fake_claim)
+        monkeypatch.setattr("app.workers.task_worker.process_queue_record", fake_process)
+
+        await asyncio.wait_for(worker_loop(poll_interval=0.01, concurrency=3, stop=stop), timeout=2)
+
+        assert sorted(done) == [f"q{i}" for i in range(6)]
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_claims_a_batch_sized_to_free_slots(self, monkeypatch):
+        pending = [{"id": f"q{i}"} for i in range(4)]
+        stop = asyncio.Event()
+        limits = []
+        done = []
+
+        async def fake_claim(limit=1):
+            limits.append(limit)
+            claimed = pending[:limit]
+            del pending[:limit]
+            return claimed
+
+        async def fake_process(record):
+            await asyncio.sleep(0.01)
+            done.append(record["id"])
+            if len(done) == 4:
+                stop.set()
+
+        monkeypatch.setattr("app.workers.task_worker.claim_queue_records", fake_claim)
+        monkeypatch.setattr("app.workers.task_worker.process_queue_record", fake_process)
+
+        await asyncio.wait_for(worker_loop(poll_interval=0.01, concurrency=4, stop=stop), timeout=2)
+
+        assert limits[0] == 4
+        assert sorted(done) == ["q0", "q1", "q2", "q3"]
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_in_flight_records(self, monkeypatch):
+        pending = [{"id": "q1"}, {"id": "q2"}]
+        stop = asyncio.Event()
+        finished = []
+
+        async def fake_claim(limit=1):
+            claimed = pending[:limit]
+            del pending[:limit]
+            return claimed
+
+        async def fake_process(record):
+            stop.set()
+            await asyncio.sleep(0.02)
+            finished.append(record["id"])
+
+        monkeypatch.setattr("app.workers.task_worker.claim_queue_records", fake_claim)
+        monkeypatch.setattr("app.workers.task_worker.process_queue_record", fake_process)
+
+        await asyncio.wait_for(worker_loop(poll_interval=0.01, concurrency=2, stop=stop), timeout=2)
+
+        assert finished
+        assert set(finished) <= {"q1", "q2"}
+
+    @pytest.mark.asyncio
+    async def test_crashing_record_frees_its_slot(self, monkeypatch):
+        pending = [{"id": "q1"}, {"id": "q2"}]
+        stop = asyncio.Event()
+        seen = []
+
+        async def fake_claim(limit=1):
+            claimed = pending[:limit]
+            del pending[:limit]
+            return claimed
+
+        async def fake_process(record):
+            seen.append(record["id"])
+            if record["id"] == "q1":
+                raise RuntimeError("boom")
+            stop.set()
+
+        monkeypatch.setattr("app.workers.task_worker.claim_queue_records", fake_claim)
+        monkeypatch.setattr("app.workers.task_worker.process_queue_record", fake_process)
+
+        await asyncio.wait_for(worker_loop(poll_interval=0.01, concurrency=1, stop=stop), timeout=2)
+
+        assert seen == ["q1", "q2"]
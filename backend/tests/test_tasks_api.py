@@ -21,3 +21,74 @@ class TestTasksEndpoints:
     def test_approve_task_requires_auth(self, client):
         response = client.post("/api/tasks/task_123/approve", json={"approved": True})
         assert response.status_code == 401
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._op = "select"
+        self._payload = None
+
+    def __getattr__(self, name):
+        def step(*args, **kwargs):
+            if name in ("insert", "update"):
+                self._op, self._payload = name, args[0]
+            return self
+
+        return step
+
+    async def execute(self):
+        self._client.writes.append((self._table, self._op, self._payload))
+
+        class Response:
+            data = self._client.rows.get(self._table, [])
+
+        return Response()
+
+
+class FakeAsyncClient:
+    def __init__(self, rows):
+        self.rows = rows
+        self.writes = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+@pytest.fixture
+def authed(monkeypatch):
+    from app.core.auth import CurrentUser, get_current_user
+
+    db = FakeAsyncClient(
+        {"agent_tasks": [{"id": "task_123", "status": "awaiting_approval"}]},
+    )
+
+    async def get_client(_token):
+        return db
+
+    monkeypatch.setattr("app.api.tasks.get_async_supabase_user", get_client)
+    app.dependency_overrides[get_current_user] = lambda: CurrentUser(
+        id="user_1", email=None, role="authenticated", token="jwt"
+    )
+    yield db
+    app.dependency_overrides.clear()
+
+
+class TestTasksEndpointsWithStore:
+    def test_pending_tasks_lists_awaiting_approval(self, client, authed):
+        response = client.get("/api/tasks/pending")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "pending_tasks": [{"id": "task_123", "status": "awaiting_approval"}]
+        }
+
+    def test_approve_task_enqueues_it(self, client, authed):
+        response = client.post("/api/tasks/task_123/approve", json={"approved": True})
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "approved"}
+        queued = [w for w in authed.writes if w[0] == "agent_task_queue"]
+        assert queued and queued[0][1] == "insert"
+        assert queued[0][2]["task_id"] == "task_123"
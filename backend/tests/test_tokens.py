@@ -0,0 +1,191 @@
+"""
+Tests for the process-wide OAuth token cache.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core import tokens
+from app.core.tokens import TokenCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(tokens.settings, "OAUTH_TOKEN_CACHE_TTL_SECONDS", 300)
+    monkeypatch.setattr(tokens.settings, "OAUTH_TOKEN_REFRESH_MARGIN_SECONDS", 60)
+    return TokenCache()
+
+
+class CountingLoader:
+    def __init__(self, lifetime=3600, delay=0):
+        self.lifetime = lifetime
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"access_token": f"token-{self.calls}"}, time.time() + self.lifetime
+
+
+class TestTokenCache:
+    async def test_reuses_entry_until_ttl(self, cache):
+        loader = CountingLoader()
+
+        first = await cache.get("u1", "gmail", loader)
+        second = await cache.get("u1", "gmail", loader)
+
+        assert first is second
+        assert loader.calls == 1
+
+    async def test_keys_by_user_and_integration(self, cache):
+        loader = CountingLoader()
+
+        await cache.get("u1", "gmail", loader)
+        await cache.get("u1", "google_calendar", loader)
+        await cache.get("u2", "gmail", loader)
+
+        assert loader.calls == 3
+
+    async def test_concurrent_loads_collapse(self, cache):
+        loader = CountingLoader(delay=0.01)
+
+        results = await asyncio.gather(*(cache.get("u1", "gmail", loader) for _ in range(5)))
+
+        assert loader.calls == 1
+        assert {r["access_token"] for r in results} == {"token-1"}
+
+    async def test_refreshes_in_background_near_expiry(self, cache):
+        # Inside the refresh margin but not yet expired.
+        loader = CountingLoader(lifetime=45)
+
+        await cache.get("u1", "gmail", loader)
+        stale = await cache.get("u1", "gmail", loader)
+        await asyncio.sleep(0)
+
+        assert stale["access_token"] == "token-1"
+        assert loader.calls == 2
+
+    async def test_expired_entry_waits_for_reload(self, cache):
+        loader = CountingLoader(lifetime=0)
+
+        await cache.get("u1", "gmail", loader)
+        fresh = await cache.get("u1", "gmail", loader)
+
+        assert fresh["access_token"] == "token-2"
+
+    async def test_failures_are_not_cached(self, cache):
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            raise RuntimeError("refresh failed")
+
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await cache.get("u1", "gmail", failing)
+
+        assert len(calls) == 2
+
+    async def test_invalidate_forces_reload(self, cache):
+        loader = CountingLoader()
+
+        await cache.get("u1", "gmail", loader)
+        cache.invalidate("u1", "gmail")
+        await cache.get("u1", "gmail", loader)
+
+        assert loader.calls == 2
+
+    async def test_invalidate_discards_in_flight_load(self, cache):
+        loader = CountingLoader(delay=0.01)
+
+        pending = asyncio.ensure_future(cache.get("u1", "gmail", loader))
+        await asyncio.sleep(0)
+        cache.invalidate("u1", "gmail")
+        stale = await pending
+        fresh = await cache.get("u1", "gmail", loader)
+
+        assert stale["access_token"] == "token-1"
+        assert fresh["access_token"] == "token-2"
+        assert (await cache.get("u1", "gmail", loader)) is fresh
+
+    async def test_instance_ttl_overrides_setting(self):
+        cache = TokenCache(ttl=0)
+        loader = CountingLoader()
+
+        await cache.get("u1", "gmail", loader)
+        await cache.get("u1", "gmail", loader)
+        await asyncio.sleep(0)
+
+        # Not reused: the second call started a reload.
+        assert loader.calls == 2
+
+
+class TestNeedsRefresh:
+    def test_within_margin(self, monkeypatch):
+        monkeypatch.setattr(tokens.settings, "OAUTH_TOKEN_REFRESH_MARGIN_SECONDS", 300)
+
+        assert tokens.needs_refresh(time.time() + 120)
+        assert not tokens.needs_refresh(time.time() + 3600)
+
+    @pytest.fixture
+    def non_utc_tz(self, monkeypatch):
+        # UTC+5: a naive utcnow().timestamp() would land five hours in the past.
+        monkeypatch.setenv("TZ", "Etc/GMT-5")
+        time.tzset()
+        yield
+        monkeypatch.undo()
+        time.tzset()
+
+    @pytest.mark.asyncio
+    async def test_refreshed_token_is_fresh_outside_utc(self, monkeypatch, non_utc_tz):
+        from app.api import integrations
+
+        saved = {}
+
+        class FakeStore:
+            async def get_active_integration(self, db, user_id, integration_type):
+                return {
+                    "access_token": "old",
+                    "refresh_token": "refresh",
+                    "token_expires_at": 0,
+                    "realm_id": "realm_1",
+                }
+
+            async def update_integration(self, db, integration_type, fields, user_id=None):
+                saved.update(fields)
+
+        class FakeCrypto:
+            def decrypt_many(self, values):
+                return values
+
+            def encrypt(self, value):
+                return value
+
+        class FakeResponse:
+            status_code = 200
+
+            def json(self):
+                return {"access_token": "new", "expires_in": 3600}
+
+        class FakeHttp:
+            async def post(self, *args, **kwargs):
+                return FakeResponse()
+
+        async def get_db():
+            return object()
+
+        monkeypatch.setattr(integrations, "store", FakeStore())
+        monkeypatch.setattr(integrations, "encryption_service", FakeCrypto())
+        monkeypatch.setattr(integrations, "get_http_client", lambda url: FakeHttp())
+        monkeypatch.setattr(integrations, "get_async_supabase_admin", get_db)
+        monkeypatch.setattr(tokens.settings, "OAUTH_TOKEN_REFRESH_MARGIN_SECONDS", 300)
+
+        info, expires_at = await integrations._load_quickbooks_client("user_1")
+
+        assert info["access_token"] == "new"
+        assert saved["token_expires_at"] == expires_at
+        assert abs(expires_at - (time.time() + 3600)) < 5
+        assert not tokens.needs_refresh(expires_at)
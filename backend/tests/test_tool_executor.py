@@ -4,6 +4,7 @@ Tests for the tool executor.
 Tests tool routing and execution for different agent types.
 """
 
+import asyncio
 import pytest
 from unittest.mock import MagicMock, AsyncMock
 
@@ -56,6 +57,32 @@ class TestBookkeeperToolExecution:
             start_date="2026-01-01", end_date="2026-01-31"
         )
 
+    @pytest.mark.asyncio
+    async def test_get_vendors_routes_correctly(self):
+        """get_vendors tool routes to QuickBooks tools."""
+        mock_qb_tools = MagicMock()
+        mock_qb_tools.get_vendors = AsyncMock(return_value={"vendors": [], "count": 0})
+
+        executor = ToolExecutor(AgentType.BOOKKEEPER, {"quickbooks": mock_qb_tools})
+
+        result = await executor.execute("get_vendors", {})
+
+        assert result == {"vendors": [], "count": 0}
+        mock_qb_tools.get_vendors.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_categorize_transactions_bulk_routes_correctly(self):
+        """categorize_transactions_bulk tool routes to QuickBooks tools."""
+        mock_qb_tools = MagicMock()
+        mock_qb_tools.categorize_transactions_bulk = AsyncMock(return_value={"queued": 1})
+
+        executor = ToolExecutor(AgentType.BOOKKEEPER, {"quickbooks": mock_qb_tools})
+
+        items = [{"transaction_id": "1", "category": "Travel"}]
+        await executor.execute("categorize_transactions_bulk", {"categorizations": items})
+
+        mock_qb_tools.categorize_transactions_bulk.assert_called_once_with(categorizations=items)
+
     @pytest.mark.asyncio
     async def test_unknown_tool_returns_error(self):
         """Unknown tool name returns error."""
@@ -104,6 +131,20 @@ class TestInboxCommanderToolExecution:
 
         mock_gmail.send_email.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_bulk_modify_routes_correctly(self):
+        """bulk_modify tool routes to Gmail tools."""
+        mock_gmail = MagicMock()
+        mock_gmail.bulk_modify = AsyncMock(return_value={"count": 2})
+
+        executor = ToolExecutor(AgentType.INBOX_COMMANDER, {"gmail": mock_gmail})
+
+        await executor.execute("bulk_modify", {"email_ids": ["a", "b"], "remove_labels": ["INBOX"]})
+
+        mock_gmail.bulk_modify.assert_called_once_with(
+            email_ids=["a", "b"], remove_labels=["INBOX"]
+        )
+
 
 class TestAppointmentToolExecution:
     """Tests for appointment setter agent tool execution."""
@@ -135,3 +176,92 @@ class TestAppointmentToolExecution:
         )
 
         mock_calendar.find_available_slots.assert_called_once()
+
+
+class TestReadOnlyMemo:
+    """Tests for per-task memoization of read-only tools."""
+
+    def _executor(self):
+        mock_qb = MagicMock()
+        mock_qb.get_accounts = AsyncMock(return_value={"accounts": []})
+        mock_qb.categorize_transaction = AsyncMock(return_value={"status": "categorized"})
+        return ToolExecutor(AgentType.BOOKKEEPER, {"quickbooks": mock_qb}), mock_qb
+
+    @pytest.mark.asyncio
+    async def test_identical_read_is_memoized(self):
+        executor, mock_qb = self._executor()
+
+        await executor.execute("get_accounts", {"account_type": "Expense"})
+        result = await executor.execute("get_accounts", {"account_type": "Expense"})
+
+        assert result == {"accounts": []}
+        mock_qb.get_accounts.assert_called_once()
+        assert executor.recall("get_accounts", {"account_type": "Expense"}) == (True, result)
+
+    @pytest.mark.asyncio
+    async def test_different_input_is_a_miss(self):
+        executor, mock_qb = self._executor()
+
+        await executor.execute("get_accounts", {"account_type": "Expense"})
+        await executor.execute("get_accounts", {"account_type": "Income"})
+
+        assert mock_qb.get_accounts.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_write_tool_invalidates(self):
+        executor, mock_qb = self._executor()
+
+        await executor.execute("get_accounts", {})
+        await executor.execute("categorize_transaction", {"transaction_id": "1"})
+        await executor.execute("get_accounts", {})
+
+        assert mock_qb.get_accounts.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_read_overlapping_a_write_is_not_memoized(self):
+        executor, mock_qb = self._executor()
+        release = asyncio.Event()
+
+        async def slow_read(**_):
+            await release.wait()
+            return {"accounts": ["before write"]}
+
+        mock_qb.get_accounts.side_effect = slow_read
+        read = asyncio.ensure_future(executor.execute("get_accounts", {}))
+        await asyncio.sleep(0)
+        await executor.execute("categorize_transaction", {"transaction_id": "1"})
+        release.set()
+        await read
+
+        assert executor.recall("get_accounts", {}) == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_partially_failed_write_invalidates(self):
+        executor, mock_qb = self._executor()
+        # e.g. early batches committed, then a later one failed.
+        mock_qb.categorize_transaction.return_value = {"error": "QuickBooks API error: 500"}
+
+        await executor.execute("get_accounts", {})
+        await executor.execute("categorize_transaction", {"transaction_id": "1"})
+        await executor.execute("get_accounts", {})
+
+        assert mock_qb.get_accounts.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_memoized(self):
+        executor, mock_qb = self._executor()
+        mock_qb.get_accounts.return_value = {"error": "QuickBooks API error: 503"}
+
+        await executor.execute("get_accounts", {})
+        await executor.execute("get_accounts", {})
+
+        assert mock_qb.get_accounts.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_write_tools_are_never_memoized(self):
+        executor, mock_qb = self._executor()
+
+        await executor.execute("categorize_transaction", {"transaction_id": "1"})
+        await executor.execute("categorize_transaction", {"transaction_id": "1"})
+
+        assert mock_qb.categorize_transaction.call_count == 2
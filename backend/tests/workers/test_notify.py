@@ -0,0 +1,80 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from app.workers.backoff import utc_now
+from app.workers.notify import QueueNotifier, _seconds_until_ready
+from app.workers.task_worker import worker_loop
+
+
+def _payload(next_run_at=None):
+    return json.dumps({"id": "q1", "next_run_at": next_run_at})
+
+
+def test_ready_row_has_no_delay():
+    assert _seconds_until_ready(_payload(utc_now().isoformat())) <= 0
+    assert _seconds_until_ready(_payload()) == 0
+    assert _seconds_until_ready("not json") == 0
+
+
+def test_future_row_reports_delay():
+    delay = _seconds_until_ready(_payload((utc_now() + timedelta(seconds=60)).isoformat()))
+    assert 55 < delay <= 60
+
+
+async def test_start_without_dsn_is_disabled():
+    notifier = QueueNotifier("")
+    assert await notifier.start() is False
+    assert notifier.connected is False
+
+
+async def test_notify_for_ready_row_wakes_immediately():
+    notifier = QueueNotifier("postgresql://unused")
+    notifier._on_notify(None, 1, "agent_task_queue", _payload(utc_now().isoformat()))
+    assert notifier.wakeup.is_set()
+
+
+async def test_notify_for_future_row_wakes_when_due():
+    notifier = QueueNotifier("postgresql://unused")
+    soon = (utc_now() + timedelta(milliseconds=50)).isoformat()
+    notifier._on_notify(None, 1, "agent_task_queue", _payload(soon))
+
+    assert not notifier.wakeup.is_set()
+    await asyncio.wait_for(notifier.wakeup.wait(), timeout=1)
+    await notifier.close()
+
+
+class _ConnectedNotifier(QueueNotifier):
+    async def ensure_connected(self) -> bool:
+        return True
+
+
+async def test_worker_loop_claims_on_wakeup(monkeypatch):
+    monkeypatch.setattr("app.workers.task_worker.settings.WORKER_SAFETY_POLL_SECONDS", 60.0)
+    notifier = _ConnectedNotifier("postgresql://unused")
+    stop = asyncio.Event()
+    pending = []
+    claims = 0
+
+    async def fake_claim(limit=1):
+        nonlocal claims
+        claims += 1
+        claimed = pending[:limit]
+        del pending[:limit]
+        return claimed
+
+    async def fake_process(record):
+        stop.set()
+
+    monkeypatch.setattr("app.workers.task_worker.claim_queue_records", fake_claim)
+    monkeypatch.setattr("app.workers.task_worker.process_queue_record", fake_process)
+
+    loop_task = asyncio.create_task(worker_loop(stop=stop, notifier=notifier))
+    await asyncio.sleep(0.05)
+    assert claims == 1  # idle: parked on the notifier, not polling
+
+    pending.append({"id": "q1"})
+    notifier.wakeup.set()
+    await asyncio.wait_for(loop_task, timeout=1)
+
+    assert claims == 2
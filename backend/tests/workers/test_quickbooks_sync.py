@@ -0,0 +1,281 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.workers import quickbooks_sync
+
+
+class FakeStore:
+    def __init__(self, state=None, pending=("u1",), stale=()):
+        self.state = state
+        self.pending = list(pending)
+        self.stale = list(stale)
+        self.excluded = []
+        self.ledger = {}
+        self.processed = []
+
+    async def list_pending_webhook_users(self, db, integration_type, exclude, limit):
+        self.excluded.append(list(exclude))
+        return [u for u in self.pending if u not in exclude]
+
+    async def list_quickbooks_sync_users(self, db, synced_before, limit):
+        return self.stale
+
+    async def mark_webhook_events_processed(self, db, integration_type, user_id, before):
+        self.processed.append(user_id)
+
+    async def get_quickbooks_sync_state(self, db, realm_id):
+        return self.state
+
+    async def save_quickbooks_sync_state(self, db, row):
+        self.state = row
+
+    async def upsert_ledger_rows(self, db, rows):
+        for row in rows:
+            self.ledger[(row["entity_type"], row["entity_id"])] = row
+
+    async def delete_ledger_rows(self, db, realm_id, entity_type, entity_ids):
+        for entity_id in entity_ids:
+            self.ledger.pop((entity_type, entity_id), None)
+
+    async def delete_ledger_rows_before(self, db, realm_id, before):
+        for key, row in list(self.ledger.items()):
+            if row["updated_at"] < before:
+                del self.ledger[key]
+
+
+class FakeTools:
+    cdc = {}
+    rows = {}
+    requests = []
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    async def _get_client(self):
+        return {"realm_id": "realm_1"}
+
+    async def _iter_query(self, query, entity, page_size=None, prefetch=None):
+        for row in self.rows.get(entity, []):
+            yield row
+
+    async def _make_request(self, method, endpoint, params=None, data=None):
+        FakeTools.requests.append((endpoint, params))
+        return FakeTools.cdc
+
+
+@pytest.fixture
+def fake_store(monkeypatch):
+    fake = FakeStore()
+    monkeypatch.setattr(quickbooks_sync, "store", fake)
+    monkeypatch.setattr(quickbooks_sync, "_failures", {})
+    monkeypatch.setattr(quickbooks_sync, "QuickBooksTools", FakeTools)
+
+    async def get_db():
+        return object()
+
+    monkeypatch.setattr(quickbooks_sync, "get_async_supabase_admin", get_db)
+    FakeTools.cdc, FakeTools.rows, FakeTools.requests = {}, {}, []
+    return fake
+
+
+def _recent_state(hours=1):
+    at = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+    return {"realm_id": "realm_1", "synced_through": at, "backfilled_at": at}
+
+
+async def test_first_sync_backfills_every_entity(fake_store):
+    FakeTools.rows = {
+        "Purchase": [{"Id": "p1", "TxnDate": "2026-10-01", "TotalAmt": 12.5}],
+        "Account": [{"Id": "a1", "AccountType": "Bank", "CurrentBalance": 90, "Active": False}],
+    }
+
+    assert await quickbooks_sync.sync_pending_realms() == 1
+
+    assert fake_store.ledger[("Purchase", "p1")]["txn_date"] == "2026-10-01"
+    account = fake_store.ledger[("Account", "a1")]
+    assert (account["balance"], account["active"]) == (90, False)
+    assert fake_store.state["backfilled_at"] == fake_store.state["synced_through"]
+    assert fake_store.processed == ["u1"]
+    assert FakeTools.requests == []
+
+
+async def test_incremental_sync_applies_cdc(fake_store):
+    fake_store.state = _recent_state()
+    fake_store.ledger[("Bill", "b1")] = {"entity_id": "b1", "updated_at": ""}
+    FakeTools.cdc = {
+        "CDCResponse": [
+            {
+                "QueryResponse": [
+                    {"Invoice": [{"Id": "i1", "Balance": 40, "DueDate": "2026-11-01"}]},
+                    {"Bill": [{"Id": "b1", "status": "Deleted"}]},
+                ]
+            }
+        ]
+    }
+
+    await quickbooks_sync.sync_pending_realms()
+
+    endpoint, params = FakeTools.requests[0]
+    assert endpoint == "cdc"
+    assert params["entities"] == "Purchase,Invoice,Bill,Account"
+    assert fake_store.ledger[("Invoice", "i1")]["balance"] == 40
+    assert ("Bill", "b1") not in fake_store.ledger
+    assert fake_store.processed == ["u1"]
+
+
+async def test_failed_cdc_leaves_events_for_retry(fake_store):
+    fake_store.state = _recent_state()
+    FakeTools.cdc = {"error": "QuickBooks API error: 503"}
+
+    assert await quickbooks_sync.sync_pending_realms() == 0
+
+    assert fake_store.processed == []
+
+
+async def test_stale_state_is_backfilled_again(fake_store):
+    fake_store.state = _recent_state(hours=24 * 40)
+    fake_store.ledger[("Invoice", "gone")] = {"entity_id": "gone", "updated_at": "2026-01-01"}
+    FakeTools.rows = {"Invoice": [{"Id": "i1", "Balance": 5}]}
+
+    await quickbooks_sync.sync_pending_realms()
+
+    assert FakeTools.requests == []
+    assert list(fake_store.ledger) == [("Invoice", "i1")]
+
+
+async def test_cdc_at_object_limit_falls_back_to_backfill(fake_store, monkeypatch):
+    monkeypatch.setattr(quickbooks_sync, "CDC_MAX_OBJECTS", 2)
+    fake_store.state = _recent_state()
+    FakeTools.cdc = {
+        "CDCResponse": [{"QueryResponse": [{"Purchase": [{"Id": "p1"}, {"Id": "p2"}]}]}]
+    }
+    FakeTools.rows = {"Purchase": [{"Id": "p1"}, {"Id": "p2"}, {"Id": "p3"}]}
+
+    await quickbooks_sync.sync_pending_realms()
+
+    assert len(FakeTools.requests) == 1
+    assert {key[1] for key in fake_store.ledger} == {"p1", "p2", "p3"}
+    assert fake_store.state["backfilled_at"] == fake_store.state["synced_through"]
+
+
+async def test_failing_user_backs_off_without_blocking_others(fake_store, monkeypatch):
+    fake_store.pending = ["bad", "u1"]
+    real_sync = quickbooks_sync.sync_realm
+
+    async def sync_realm(user_id):
+        if user_id == "bad":
+            raise RuntimeError("boom")
+        return await real_sync(user_id)
+
+    monkeypatch.setattr(quickbooks_sync, "sync_realm", sync_realm)
+
+    assert await quickbooks_sync.sync_pending_realms() == 1
+    assert fake_store.processed == ["u1"]
+
+    await quickbooks_sync.sync_pending_realms()
+    assert fake_store.excluded[-1] == ["bad"]
+
+
+async def test_events_are_dropped_after_repeated_failures(fake_store, monkeypatch):
+    fake_store.pending = ["bad"]
+    monkeypatch.setattr(quickbooks_sync, "MAX_SYNC_FAILURES", 2)
+
+    async def sync_realm(user_id):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(quickbooks_sync, "sync_realm", sync_realm)
+
+    await quickbooks_sync.sync_pending_realms()
+    assert fake_store.processed == []
+    quickbooks_sync._failures["bad"] = (1, 0.0)  # backoff elapsed
+    await quickbooks_sync.sync_pending_realms()
+    assert fake_store.processed == ["bad"]
+
+
+async def test_stale_realms_are_refreshed_without_events(fake_store):
+    fake_store.pending = []
+    fake_store.stale = ["u1"]
+    fake_store.state = _recent_state()
+    FakeTools.cdc = {"CDCResponse": []}
+
+    assert await quickbooks_sync.sync_pending_realms() == 1
+    assert FakeTools.requests[0][0] == "cdc"
+
+
+class FakeWebhookStore:
+    """webhook_events shared by the API handler and the worker."""
+
+    def __init__(self):
+        self.events = []
+
+    async def get_active_integration_by_realm(self, db, realm_id, integration_type="quickbooks"):
+        return {"user_id": "u1", "realm_id": realm_id}
+
+    async def insert_webhook_events(self, db, rows):
+        for row in rows:
+            created_at = datetime.now(timezone.utc).isoformat()
+            self.events.append({**row, "created_at": created_at})
+
+    async def list_webhook_events_since(self, db, integration_type, since, limit=1000):
+        return [e for e in self.events if e["created_at"] >= since][:limit]
+
+
+async def test_webhook_invalidates_worker_reference_cache(monkeypatch):
+    import json
+
+    from app.agents.tools import quickbooks as qb_mod
+    from app.api import webhooks
+
+    fake = FakeWebhookStore()
+
+    async def get_db():
+        return object()
+
+    for module in (webhooks, quickbooks_sync):
+        monkeypatch.setattr(module, "store", fake)
+        monkeypatch.setattr(module, "get_async_supabase_admin", get_db)
+    monkeypatch.setattr(webhooks, "verify_quickbooks_signature", lambda *args: True)
+    monkeypatch.setattr(qb_mod, "_reference_cache", {})
+    since = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    monkeypatch.setattr(quickbooks_sync, "_events_seen_through", since)
+
+    vendors = [{"Id": "9", "DisplayName": "Acme"}]
+    queries = []
+
+    async def make_request(method, endpoint, params=None, data=None):
+        queries.append(params["query"])
+        return {"QueryResponse": {"Vendor": list(vendors)}}
+
+    tools = qb_mod.QuickBooksTools(user_id="u1")
+    tools._client_info = {"realm_id": "realm_1", "base_url": "", "access_token": "t"}
+    tools._make_request = make_request
+
+    assert (await tools.get_vendors())["vendors"][0]["name"] == "Acme"
+    # Nothing recorded yet: the worker pass leaves the cache alone.
+    await quickbooks_sync.invalidate_changed_reference_data()
+    await tools.get_vendors()
+    assert len(queries) == 1
+
+    vendors[0] = {"Id": "9", "DisplayName": "Acme Corp"}
+    payload = {
+        "eventNotifications": [
+            {
+                "realmId": "realm_1",
+                "dataChangeEvent": {
+                    "entities": [{"name": "Vendor", "id": "9", "operation": "Update"}]
+                },
+            }
+        ]
+    }
+
+    class FakeRequest:
+        async def body(self):
+            return json.dumps(payload).encode()
+
+    await webhooks.quickbooks_webhook(FakeRequest(), intuit_signature="sig")
+    assert fake.events[0]["realm_id"] == "realm_1"
+
+    assert await quickbooks_sync.invalidate_changed_reference_data() == 1
+    assert (await tools.get_vendors())["vendors"][0]["name"] == "Acme Corp"
+    assert len(queries) == 2
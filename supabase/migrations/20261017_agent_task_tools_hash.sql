@@ -0,0 +1,14 @@
+-- Record which prompt revision and tool-schema set produced each task.
+--
+-- The runtime writes these on completion: prompt_version is
+-- agent_prompts.PROMPT_VERSION and tools_hash is the sha256 of the agent's
+-- canonical tool-schema JSON (app.agents.schemas.get_tools_schema_hash), so
+-- behavioral changes can be attributed to a prompt or tool revision.
+
+alter table public.agent_tasks
+  add column if not exists prompt_version text,
+  add column if not exists tools_hash text;
+
+INSERT INTO public.schema_migrations (version, name)
+VALUES ('20261017_agent_task_tools_hash', 'Record prompt version and tools hash on agent_tasks')
+ON CONFLICT (version) DO NOTHING;
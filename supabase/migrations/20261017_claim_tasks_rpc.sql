@@ -0,0 +1,47 @@
+-- Atomic batch claim for agent_task_queue.
+--
+-- Replaces the worker's select -> conditional update -> re-read loop with a
+-- single round-trip. FOR UPDATE SKIP LOCKED lets concurrent workers claim
+-- disjoint rows without blocking on (or racing for) each other.
+--
+-- Usage (supabase-py):
+--   sb.rpc("claim_tasks", {"p_worker_id": wid, "p_limit": 5}).execute()
+
+create or replace function public.claim_tasks(
+  p_worker_id text,
+  p_limit int default 1,
+  p_stale_after interval default interval '10 minutes'
+)
+returns setof public.agent_task_queue
+language sql
+volatile
+as $$
+  update public.agent_task_queue q
+  set status = 'processing',
+      locked_at = now(),
+      locked_by = p_worker_id
+  where q.id in (
+    select c.id
+    from public.agent_task_queue c
+    where c.status = 'queued'
+      and c.next_run_at <= now()
+      and (c.locked_at is null or c.locked_at < now() - p_stale_after)
+    order by c.created_at
+    limit greatest(p_limit, 0)
+    for update skip locked
+  )
+  returning q.*;
+$$;
+
+-- Only the service role (worker) may claim work.
+revoke execute on function public.claim_tasks(text, int, interval) from public, anon, authenticated;
+grant execute on function public.claim_tasks(text, int, interval) to service_role;
+
+-- Supports the ready-queue scan in claim_tasks.
+create index if not exists idx_agent_task_queue_queued_created
+  on public.agent_task_queue (created_at)
+  where status = 'queued';
+
+INSERT INTO public.schema_migrations (version, name)
+VALUES ('20261017_claim_tasks_rpc', 'Atomic batch claim via claim_tasks RPC')
+ON CONFLICT (version) DO NOTHING;
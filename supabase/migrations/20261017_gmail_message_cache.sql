@@ -0,0 +1,32 @@
+-- Per-user Gmail mailbox cache for incremental sync.
+--
+-- gmail_sync_state holds the last Gmail historyId seen for each user;
+-- gmail_message_cache holds parsed messages (headers/snippet/labels, plus
+-- the decoded body once something has needed it). On each run GmailTools
+-- replays users.history.list from the stored historyId and evicts only the
+-- messages that changed, so unchanged mail is served from here instead of
+-- messages.get. Only the service role (agent tools) reads or writes these.
+
+create table if not exists public.gmail_sync_state (
+  user_id uuid primary key references public.users(id) on delete cascade,
+  history_id text not null,
+  synced_at timestamptz not null default now()
+);
+
+create table if not exists public.gmail_message_cache (
+  user_id uuid not null references public.users(id) on delete cascade,
+  message_id text not null,
+  thread_id text,
+  history_id text,
+  email jsonb not null,
+  has_body boolean not null default false,
+  updated_at timestamptz not null default now(),
+  primary key (user_id, message_id)
+);
+
+alter table public.gmail_sync_state enable row level security;
+alter table public.gmail_message_cache enable row level security;
+
+INSERT INTO public.schema_migrations (version, name)
+VALUES ('20261017_gmail_message_cache', 'Gmail historyId sync state and per-user message cache')
+ON CONFLICT (version) DO NOTHING;
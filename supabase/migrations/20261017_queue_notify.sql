@@ -0,0 +1,30 @@
+-- Wake workers via LISTEN/NOTIFY instead of relying on polling alone.
+--
+-- Every time a queue row becomes (or is re-)queued, Postgres notifies the
+-- `agent_task_queue` channel with the row id and next_run_at. Workers with a
+-- direct DATABASE_URL connection LISTEN on it (app/workers/notify.py) and
+-- claim immediately; polling stays on as a slow safety net.
+
+create or replace function public.notify_agent_task_queue()
+returns trigger
+language plpgsql
+as $$
+begin
+  if new.status = 'queued' then
+    perform pg_notify(
+      'agent_task_queue',
+      json_build_object('id', new.id, 'next_run_at', new.next_run_at)::text
+    );
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists trg_agent_task_queue_notify on public.agent_task_queue;
+create trigger trg_agent_task_queue_notify
+  after insert or update of status, next_run_at on public.agent_task_queue
+  for each row execute function public.notify_agent_task_queue();
+
+INSERT INTO public.schema_migrations (version, name)
+VALUES ('20261017_queue_notify', 'NOTIFY workers when agent_task_queue rows are queued')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,53 @@
+-- Per-realm mirror of QuickBooks ledger entities.
+--
+-- The task worker backfills each realm once (paged queries), then keeps it
+-- current from QuickBooks' Change Data Capture endpoint whenever
+-- quickbooks_webhook records unprocessed webhook_events for the realm.
+-- QuickBooksTools reads Purchases, Invoices, Bills and Accounts from here
+-- once quickbooks_sync_state.backfilled_at is set. The columns pulled out
+-- of `data` are the ones the read tools filter and sort on.
+-- Only the service role (worker, agent tools) reads or writes these.
+
+create table if not exists public.quickbooks_sync_state (
+  realm_id text primary key,
+  user_id uuid not null references public.users(id) on delete cascade,
+  -- CDC has been applied up to this instant (the start of the last sync).
+  synced_through timestamptz not null,
+  backfilled_at timestamptz,
+  updated_at timestamptz not null default now()
+);
+
+create table if not exists public.quickbooks_ledger (
+  realm_id text not null,
+  entity_type text not null,
+  entity_id text not null,
+  user_id uuid not null references public.users(id) on delete cascade,
+  txn_date date,
+  due_date date,
+  total_amt numeric,
+  balance numeric,
+  account_ref text,
+  account_type text,
+  active boolean,
+  data jsonb not null,
+  updated_at timestamptz not null default now(),
+  primary key (realm_id, entity_type, entity_id)
+);
+
+create index if not exists idx_quickbooks_ledger_txn_date
+  on public.quickbooks_ledger (realm_id, entity_type, txn_date desc, entity_id);
+
+create index if not exists idx_quickbooks_ledger_open
+  on public.quickbooks_ledger (realm_id, entity_type, due_date)
+  where balance > 0;
+
+create index if not exists idx_webhook_events_unprocessed
+  on public.webhook_events (integration_type, created_at)
+  where processed = false;
+
+alter table public.quickbooks_sync_state enable row level security;
+alter table public.quickbooks_ledger enable row level security;
+
+INSERT INTO public.schema_migrations (version, name)
+VALUES ('20261017_quickbooks_ledger_mirror', 'QuickBooks CDC sync state and per-realm ledger mirror')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,42 @@
+-- Distinct users with unprocessed webhook events, for the QuickBooks sync.
+--
+-- The sync used to read the oldest N unprocessed webhook_events rows, so one
+-- user whose sync kept failing could fill every pass with their events and
+-- starve every other realm. pending_webhook_users returns each user once,
+-- oldest pending event first, skipping users the worker is backing off.
+--
+-- Usage (supabase-py):
+--   sb.rpc("pending_webhook_users",
+--          {"p_integration_type": "quickbooks", "p_exclude": [], "p_limit": 100}).execute()
+
+create or replace function public.pending_webhook_users(
+  p_integration_type text,
+  p_exclude uuid[] default '{}',
+  p_limit int default 100
+)
+returns table (user_id uuid)
+language sql
+stable
+as $$
+  select e.user_id
+  from public.webhook_events e
+  where e.integration_type = p_integration_type
+    and e.processed = false
+    and e.user_id is not null
+    and not (e.user_id = any(p_exclude))
+  group by e.user_id
+  order by min(e.created_at)
+  limit greatest(p_limit, 0);
+$$;
+
+-- Only the service role (worker) reads other users' events.
+revoke execute on function public.pending_webhook_users(text, uuid[], int) from public, anon, authenticated;
+grant execute on function public.pending_webhook_users(text, uuid[], int) to service_role;
+
+-- Supports the sweep of rows a re-backfill did not rewrite.
+create index if not exists idx_quickbooks_ledger_updated
+  on public.quickbooks_ledger (realm_id, updated_at);
+
+INSERT INTO public.schema_migrations (version, name)
+VALUES ('20261017_quickbooks_sync_pending_users', 'Distinct pending webhook users for QuickBooks sync')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,16 @@
+-- Record the QuickBooks realm on webhook_events and index them by time.
+--
+-- quickbooks_webhook runs in the API process, but the per-realm reference
+-- cache it has to invalidate lives in each task worker. Workers now replay
+-- webhook_events newer than the last row they saw (processed or not) and
+-- drop the cached reference data of each realm_id in them.
+
+alter table public.webhook_events
+  add column if not exists realm_id text;
+
+create index if not exists idx_webhook_events_created
+  on public.webhook_events (integration_type, created_at);
+
+INSERT INTO public.schema_migrations (version, name)
+VALUES ('20261017_webhook_events_realm', 'Realm id and created_at index on webhook_events')
+ON CONFLICT (version) DO NOTHING;